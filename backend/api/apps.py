@@ -1,6 +1,37 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .stats import connect_signals as connect_stats_signals
+        connect_stats_signals()
+        from .response_cache import connect_signals as connect_response_cache_signals
+        connect_response_cache_signals()
+        from .background_index import serving_requests
+        if getattr(settings, 'SEARCH_INDEX_ENABLED', False):
+            from .search_index import connect_signals, start_background_build
+            connect_signals()
+            if serving_requests():
+                start_background_build()
+        if getattr(settings, 'FULLTEXT_SEARCH_BACKEND', 'bm25') == 'bm25':
+            from .fulltext import connect_signals as connect_fulltext_signals
+            from .fulltext import start_background_build as start_fulltext_build
+            connect_fulltext_signals()
+            if serving_requests():
+                start_fulltext_build()
+        from .tag_suggest import connect_signals as connect_tag_suggest_signals
+        from .tag_suggest import start_background_build as start_tag_suggest_build
+        connect_tag_suggest_signals()
+        if serving_requests():
+            start_tag_suggest_build()
+            from .response_cache import response_cache_enabled
+            if settings.RESPONSE_CACHE_TTL > 0 and not response_cache_enabled():
+                print("Response cache disabled: LocMemCache is per process and WEB_CONCURRENCY > 1")
+            from .tasks import schedule_s3_deletion_drain, start_upload_job_recovery
+            start_upload_job_recovery()
+            # Entries that came due while no process was running
+            schedule_s3_deletion_drain()
@@ -119,17 +119,19 @@ class DeleteUserView(APIView):
             
             # Create user folder prefix
             user_prefix = f"user_{user.id}/"
-            print(f"Deleting all S3 content with prefix: {user_prefix}")
-            
-            # Delete all user content from S3
-            deleted_count = delete_s3_folder(user_prefix, include_prefix=True)
-            print(f"Deleted {deleted_count} files from S3 for user {user.id}")
             
             # Delete the user (cascades to delete all related objects in DB)
+            # first, so no row still refers to the user's stored objects
             username = user.username
             email = user.email
+            user_id = user.id
             user.delete()
             
+            # Delete all user content from S3
+            print(f"Deleting all S3 content with prefix: {user_prefix}")
+            deleted_count = delete_s3_folder(user_prefix, include_prefix=True)
+            print(f"Deleted {deleted_count} files from S3 for user {user_id}")
+            
             print(f"User {username} ({email}) successfully deleted")
             return Response({"success": True, "message": "Account successfully deleted"})
             
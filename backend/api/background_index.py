@@ -0,0 +1,151 @@
+"""
+Holder for the per-process in-memory indexes (api.search_index,
+api.fulltext, api.tag_suggest).
+
+Rebuilds run in a daemon thread and readers keep using the previous index
+until the new one is swapped in. Changes from model signals are applied
+once their transaction commits, so rolled-back writes never reach an
+index. A change that arrives while a build is running is also queued, then
+replayed onto the new index before the swap, so no write is lost. Changes
+must therefore be idempotent: they set a document or count to the state
+read at commit time rather than add deltas.
+
+Only the first lookup in a process with no index yet builds in the calling
+thread, or waits for the startup build already in flight. start_build() is
+called from AppConfig.ready() when the process serves requests.
+"""
+import os
+import sys
+import threading
+import time
+from django.db import close_old_connections, transaction
+
+def serving_requests():
+    """False for manage.py commands other than runserver (migrate, test, shell, ...)"""
+    if os.path.basename(sys.argv[0]) in ('manage.py', 'django-admin'):
+        return len(sys.argv) > 1 and sys.argv[1] == 'runserver'
+    return True
+
+class BackgroundIndex:
+    """
+    The current index of one kind plus its rebuild state
+
+    Args:
+        name: Label for log lines and the build thread
+        build: Builds a fresh index from the database; it must set built_at
+        max_age: Returns the age in seconds after which lookups trigger a rebuild
+        load: Optional fast path (e.g. a snapshot) returning an index or None;
+            a loaded index is served at once and caught up by a full build
+    """
+
+    def __init__(self, name, build, max_age, load=None):
+        self.name = name
+        self.build = build
+        self.max_age = max_age
+        self.load = load
+        self.current = None
+        self._pending = None  # Changes seen during a build, None when idle
+        self._build_pid = None
+        self._condition = threading.Condition()
+
+    @property
+    def building(self):
+        # A build started before a fork (e.g. gunicorn --preload) has no thread in this process
+        return self._pending is not None and self._build_pid == os.getpid()
+
+    def get(self):
+        """Returns the current index, starting a background rebuild when it is stale"""
+        index = self.current
+        if index is None:
+            return self._get_cold()
+        if time.time() - index.built_at > self.max_age():
+            self.start_build()
+        return index
+
+    def _get_cold(self):
+        if self._begin():
+            loaded = None
+            try:
+                loaded = self.load() if self.load else None
+                index = loaded if loaded is not None else self._timed_build()
+            except Exception:
+                self._finish(None)
+                raise
+            self._finish(index)
+            if loaded is not None:
+                self.start_build()
+            return index
+        with self._condition:
+            while self.building and self.current is None:
+                self._condition.wait()
+        return self.current if self.current is not None else self._get_cold()
+
+    def start_build(self, use_load=False):
+        """Rebuilds in a daemon thread unless a build is already running"""
+        if not self._begin():
+            return
+
+        def run():
+            close_old_connections()
+            index = None
+            try:
+                if use_load and self.load:
+                    loaded = self.load()
+                    if loaded is not None:
+                        self._swap(loaded)
+                index = self._timed_build()
+            except Exception as e:
+                print(f"{self.name} build failed: {str(e)}")
+            finally:
+                self._finish(index)
+                close_old_connections()
+
+        threading.Thread(target=run, name=f'{self.name}-build', daemon=True).start()
+
+    def _timed_build(self):
+        started = time.monotonic()
+        index = self.build()
+        print(f"Built {self.name} in {(time.monotonic() - started) * 1000:.0f} ms")
+        return index
+
+    def _begin(self):
+        with self._condition:
+            if self.building:
+                return False
+            self._pending = []
+            self._build_pid = os.getpid()
+            return True
+
+    def _swap(self, index):
+        """Replays the queued changes onto index and serves it; keeps queueing"""
+        with self._condition:
+            for change in self._pending:
+                change(index)
+            self._pending = []
+            self.current = index
+            self._condition.notify_all()
+
+    def _finish(self, index):
+        with self._condition:
+            if index is not None:
+                for change in self._pending:
+                    change(index)
+                self.current = index
+            self._pending = None
+            self._condition.notify_all()
+
+    def apply(self, change):
+        """Applies change(index) to the current index and to the one being built"""
+        with self._condition:
+            if self.building:
+                self._pending.append(change)
+            index = self.current
+        if index is not None:
+            change(index)
+
+    def apply_on_commit(self, change):
+        transaction.on_commit(lambda: self.apply(change))
+
+    def reset(self):
+        with self._condition:
+            self.current = None
@@ -0,0 +1,53 @@
+"""
+The financial dashboard (GET /api/dashboard/): financial data, profile
+stats and goals of the requesting user in one payload.
+
+Totals come from the materialized ProfileStats row and monthly spending
+from FinancialInfo (the MonthlySpending rollup for large accounts), so
+building a payload costs a handful of indexed queries and no writes. The
+payload is cached per user for DASHBOARD_CACHE_TTL seconds under the
+user's response cache generation, which moves whenever their items,
+collections or goals change (see api.response_cache). It is built fresh
+on every request whenever the response cache is off, i.e. with
+RESPONSE_CACHE_TTL=0 or with LocMemCache under several workers.
+"""
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from .response_cache import cache_key, record_lookup, response_cache_enabled
+from .stats import compute_profile_stats
+
+def build_dashboard(user):
+    from .models import FinancialInfo, Goal, ProfileStats
+    from .serializers import GoalSerializer
+    stats = ProfileStats.objects.filter(user_id=user.id).values_list(
+        'total_collections', 'total_items', 'total_value'
+    ).first()
+    if stats is None:
+        stats = compute_profile_stats([user.id])[user.id]
+    total_collections, total_items, total_value = stats
+
+    # Unsaved: only its user_id is needed, so no get_or_create write
+    financial_info = FinancialInfo(user_id=user.id)
+    goals = Goal.objects.filter(user_profile__user_id=user.id).order_by('id')
+    return {
+        'totalSpending': total_value or Decimal('0'),
+        'collections': financial_info.get_collection_prices(),
+        'monthlySpending': financial_info.get_monthly_spending(),
+        'totalValue': total_value or Decimal('0'),
+        'totalCollections': total_collections,
+        'totalItems': total_items,
+        'goals': GoalSerializer(goals, many=True).data,
+    }
+
+def get_dashboard(user):
+    """The user's dashboard payload, from the cache when it is current"""
+    if not response_cache_enabled() or settings.DASHBOARD_CACHE_TTL <= 0:
+        return build_dashboard(user)
+    key = cache_key('dashboard', [('user', user.id)])
+    payload = cache.get(key)
+    record_lookup('dashboard', payload is not None)
+    if payload is None:
+        payload = build_dashboard(user)
+        cache.set(key, payload, settings.DASHBOARD_CACHE_TTL)
+    return payload
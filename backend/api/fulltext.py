@@ -0,0 +1,351 @@
+"""
+Full-text search over image titles, descriptions and tags (GET /api/search/).
+
+Two backends, picked with FULLTEXT_SEARCH_BACKEND:
+
+  'bm25'   An in-process BM25 index (the default, and what the tests use).
+           Title matches count FIELD_WEIGHTS['title'] times, tags and
+           description less. Built from a streaming query in a background
+           thread at startup and kept current by post_save/post_delete
+           signals applied on commit; like api.search_index it rebuilds in
+           the background once older than FULLTEXT_INDEX_MAX_AGE seconds,
+           to pick up other processes' writes, serving the old index
+           meanwhile (see api.background_index).
+  'mysql'  MATCH ... AGAINST on the FULLTEXT index added by migration 0019
+           (only created on MySQL).
+
+Both return (image id, score) pairs, best first; the view loads the rows
+that still pass the filters in SQL (see filter_images), serializes them
+and adds highlighted snippets.
+"""
+import html
+import math
+import re
+import threading
+import time
+from heapq import heappush, heapreplace
+from operator import itemgetter
+from django.conf import settings
+from django.db import transaction
+from django.db.models.expressions import RawSQL
+from .background_index import BackgroundIndex
+from .search_index import tokenize, parse_tags
+
+FIELD_WEIGHTS = {'title': 3.0, 'tags': 2.0, 'description': 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# The Image columns an index entry is built from, in add_row() order
+IMAGE_ROW_FIELDS = (
+    'id', 'title', 'description', 'tags', 'is_wishlist', 'valuation',
+    'category_id', 'category__user_id', 'category__is_public', 'category__is_wishlist'
+)
+
+class BM25Index:
+    """
+    Weighted term frequencies per image plus the metadata the search
+    filters need, so filtering and ranking never touch the database
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.lengths = {}
+        self.terms = {}
+        self.meta = {}
+        self.impacts = {}
+        self.impact_average = 1.0
+        self.total_length = 0.0
+        self.built_at = time.time()
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, image_id, title, description, tags, meta):
+        """
+        Indexes (or re-indexes) an image
+
+        Args:
+            meta: Dict with owner_id, category_id, is_public, is_wishlist and valuation
+        """
+        frequencies = {}
+        for field, text in (('title', title), ('description', description), ('tags', ' '.join(map(str, tags)))):
+            for token in tokenize(text):
+                frequencies[token] = frequencies.get(token, 0) + FIELD_WEIGHTS[field]
+        with self.lock:
+            self.remove(image_id)
+            length = sum(frequencies.values())
+            self.lengths[image_id] = length
+            self.terms[image_id] = frequencies
+            self.meta[image_id] = meta
+            self.total_length += length
+            for token, frequency in frequencies.items():
+                self.postings.setdefault(token, {})[image_id] = frequency
+                self.impacts.pop(token, None)
+
+    def remove(self, image_id):
+        with self.lock:
+            frequencies = self.terms.pop(image_id, None)
+            if frequencies is None:
+                return
+            self.total_length -= self.lengths.pop(image_id)
+            self.meta.pop(image_id, None)
+            for token in frequencies:
+                self.impacts.pop(token, None)
+                documents = self.postings.get(token)
+                if documents is not None:
+                    documents.pop(image_id, None)
+                    if not documents:
+                        del self.postings[token]
+
+    def update_meta(self, image_ids, **changes):
+        with self.lock:
+            for image_id in image_ids:
+                if image_id in self.meta:
+                    self.meta[image_id] = {**self.meta[image_id], **changes}
+
+    def _impacts(self, term, average_length):
+        """
+        The term's documents ordered by their BM25 term-frequency part (the
+        score without idf, which scales every entry of a term alike), cached
+        until the term's postings change
+        """
+        cached = self.impacts.get(term)
+        if cached is None:
+            base = BM25_K1 * (1 - BM25_B)
+            per_length = BM25_K1 * BM25_B / average_length
+            lengths = self.lengths
+            partials = {
+                image_id: frequency * (BM25_K1 + 1) / (frequency + base + per_length * lengths[image_id])
+                for image_id, frequency in self.postings[term].items()
+            }
+            ordered = sorted(partials.items(), key=itemgetter(1), reverse=True)
+            cached = self.impacts[term] = (ordered, partials)
+        return cached
+
+    def search(self, text, accept=None, limit=20):
+        """
+        Ranks images by BM25 over the query tokens (any token may match)
+
+        Walks each term's impact-ordered postings in parallel and stops as
+        soon as no unseen image could beat the current top `limit` (Fagin's
+        threshold algorithm), so common terms do not cost a full scan.
+
+        Args:
+            accept: Optional predicate on an image's meta dict
+            limit: Number of results
+
+        Returns:
+            List of (image id, score) tuples, best first
+        """
+        terms = list(dict.fromkeys(tokenize(text)))
+        with self.lock:
+            count = len(self.lengths)
+            if not terms or not count:
+                return []
+            average_length = self.total_length / count or 1.0
+            if abs(average_length - self.impact_average) > 0.05 * self.impact_average:
+                self.impacts.clear()
+                self.impact_average = average_length
+
+            lists = []
+            for term in terms:
+                documents = self.postings.get(term)
+                if documents:
+                    idf = math.log(1 + (count - len(documents) + 0.5) / (len(documents) + 0.5))
+                    ordered, partials = self._impacts(term, self.impact_average)
+                    lists.append((idf, ordered, partials))
+
+            positions = [0] * len(lists)
+            seen = set()
+            top = []
+            while True:
+                threshold = sum(
+                    idf * ordered[position][1]
+                    for (idf, ordered, _), position in zip(lists, positions)
+                    if position < len(ordered)
+                )
+                if threshold == 0 or (len(top) >= limit and top[0][0] >= threshold):
+                    break
+                for i, (idf, ordered, _) in enumerate(lists):
+                    if positions[i] >= len(ordered):
+                        continue
+                    image_id = ordered[positions[i]][0]
+                    positions[i] += 1
+                    if image_id in seen:
+                        continue
+                    seen.add(image_id)
+                    if accept is not None and not accept(self.meta[image_id]):
+                        continue
+                    score = sum(idf * partials.get(image_id, 0.0) for idf, _, partials in lists)
+                    if len(top) < limit:
+                        heappush(top, (score, image_id))
+                    elif (score, image_id) > top[0]:
+                        heapreplace(top, (score, image_id))
+        return [(image_id, score) for score, image_id in sorted(top, reverse=True)]
+
+    @classmethod
+    def build(cls, chunk_size=2000):
+        """Builds the index by streaming every image with its category's fields"""
+        from .models import Image
+        index = cls()
+        rows = Image.objects.order_by('id').values_list(*IMAGE_ROW_FIELDS).iterator(chunk_size=chunk_size)
+        for row in rows:
+            index.add_row(row)
+        return index
+
+    def add_row(self, row):
+        (image_id, title, description, tags, is_wishlist, valuation,
+         category_id, owner_id, is_public, category_is_wishlist) = row
+        self.add(image_id, title, description, parse_tags(tags), {
+            'category_id': category_id,
+            'owner_id': owner_id,
+            'is_public': is_public,
+            'is_wishlist': is_wishlist or category_is_wishlist,
+            'valuation': float(valuation) if valuation is not None else None,
+        })
+
+_holder = BackgroundIndex('full-text index', lambda: BM25Index.build(), lambda: settings.FULLTEXT_INDEX_MAX_AGE)
+
+def get_fulltext_index():
+    """Returns this process's BM25 index, building it on first use"""
+    return _holder.get()
+
+def start_background_build():
+    _holder.start_build()
+
+def reset_fulltext_index():
+    _holder.reset()
+
+def _accepts(meta, filters):
+    viewer_id = filters.get('viewer_id')
+    if not meta['is_public'] and meta['owner_id'] != viewer_id:
+        return False
+    if filters.get('owner_id') is not None and meta['owner_id'] != filters['owner_id']:
+        return False
+    if filters.get('is_wishlist') is not None and meta['is_wishlist'] != filters['is_wishlist']:
+        return False
+    if filters.get('min_valuation') is not None or filters.get('max_valuation') is not None:
+        if meta['valuation'] is None:
+            return False
+        if filters.get('min_valuation') is not None and meta['valuation'] < filters['min_valuation']:
+            return False
+        if filters.get('max_valuation') is not None and meta['valuation'] > filters['max_valuation']:
+            return False
+    return True
+
+def search_images(text, filters, limit):
+    """
+    Ranked (image id, score) pairs for a query
+
+    Args:
+        text: The query string
+        filters: Dict with viewer_id (required) and optional owner_id,
+            is_wishlist, min_valuation and max_valuation
+        limit: Number of results
+    """
+    if settings.FULLTEXT_SEARCH_BACKEND == 'mysql':
+        return _search_mysql(text, filters, limit)
+    return get_fulltext_index().search(text, accept=lambda meta: _accepts(meta, filters), limit=limit)
+
+def filter_images(queryset, filters):
+    """
+    Applies the search filters to an Image queryset in SQL
+
+    The BM25 metadata of other processes can lag behind a write by up to
+    FULLTEXT_INDEX_MAX_AGE, so the view re-checks each page of ids with
+    this before loading the rows.
+    """
+    from django.db.models import Q
+    queryset = queryset.filter(Q(category__is_public=True) | Q(category__user_id=filters.get('viewer_id')))
+    if filters.get('owner_id') is not None:
+        queryset = queryset.filter(category__user_id=filters['owner_id'])
+    if filters.get('is_wishlist') is True:
+        queryset = queryset.filter(Q(is_wishlist=True) | Q(category__is_wishlist=True))
+    elif filters.get('is_wishlist') is False:
+        queryset = queryset.filter(is_wishlist=False, category__is_wishlist=False)
+    if filters.get('min_valuation') is not None:
+        queryset = queryset.filter(valuation__gte=filters['min_valuation'])
+    if filters.get('max_valuation') is not None:
+        queryset = queryset.filter(valuation__lte=filters['max_valuation'])
+    return queryset
+
+def _search_mysql(text, filters, limit):
+    from .models import Image
+    queryset = Image.objects.annotate(
+        score=RawSQL('MATCH(api_image.title, api_image.description, api_image.tags) AGAINST (%s)', (text,))
+    ).filter(score__gt=0)
+    queryset = filter_images(queryset, filters)
+    return list(queryset.order_by('-score', '-id').values_list('id', 'score')[:limit])
+
+def highlight(text, query, max_length=None):
+    """
+    HTML-escapes text and wraps query tokens in <mark>. With max_length,
+    returns a window of about that many characters around the first match.
+    """
+    if not text:
+        return ''
+    terms = set(tokenize(query))
+    if max_length and len(text) > max_length:
+        first = None
+        for match in re.finditer(r'\w+', text, re.UNICODE):
+            if match.group(0).lower() in terms:
+                first = match.start()
+                break
+        start = max(0, (first or 0) - max_length // 4)
+        end = min(len(text), start + max_length)
+        text = ('…' if start else '') + text[start:end] + ('…' if end < len(text) else '')
+
+    def mark(match):
+        word = match.group(0)
+        return f'<mark>{word}</mark>' if word.lower() in terms else word
+    return re.sub(r'\w+', mark, html.escape(text), flags=re.UNICODE)
+
+def index_image(sender, instance, update_fields=None, **kwargs):
+    """post_save receiver for Image: re-reads the row once the write commits"""
+    if update_fields is not None and not {'title', 'description', 'tags', 'is_wishlist', 'valuation', 'category'} & set(update_fields):
+        return
+    image_id = instance.id
+
+    def reindex():
+        from .models import Image
+        row = Image.objects.filter(id=image_id).values_list(*IMAGE_ROW_FIELDS).first()
+        if row:
+            _holder.apply(lambda index: index.add_row(row))
+    transaction.on_commit(reindex)
+
+def update_category_images(sender, instance, created=False, **kwargs):
+    """post_save receiver for Category: visibility and ownership live on the category"""
+    if created:
+        return
+    category_id = instance.id
+
+    def update():
+        from .models import Category, Image
+        category = Category.objects.filter(id=category_id).values_list('user_id', 'is_public', 'is_wishlist').first()
+        if category is None:
+            return
+        owner_id, is_public, category_is_wishlist = category
+        images = list(Image.objects.filter(category_id=category_id).values_list('id', 'is_wishlist'))
+
+        def change(index):
+            for image_id, is_wishlist in images:
+                index.update_meta(
+                    [image_id],
+                    owner_id=owner_id,
+                    is_public=is_public,
+                    is_wishlist=is_wishlist or category_is_wishlist
+                )
+        _holder.apply(change)
+    transaction.on_commit(update)
+
+def unindex_image(sender, instance, **kwargs):
+    """post_delete receiver for Image"""
+    image_id = instance.id
+    _holder.apply_on_commit(lambda index: index.remove(image_id))
+
+def connect_signals():
+    from django.db.models.signals import post_save, post_delete
+    from .models import Category, Image
+    post_save.connect(index_image, sender=Image, dispatch_uid='fulltext_index_image')
+    post_save.connect(update_category_images, sender=Category, dispatch_uid='fulltext_update_category')
+    post_delete.connect(unindex_image, sender=Image, dispatch_uid='fulltext_unindex_image')
@@ -0,0 +1,71 @@
+import random
+from itertools import accumulate
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.fulltext import BM25Index, search_images, _accepts
+
+COMMON_WORDS = [
+    'charizard', 'pikachu', 'holo', 'rare', 'vintage', 'mint', 'graded', 'psa', 'first', 'edition',
+    'shadowless', 'promo', 'japanese', 'booster', 'sealed', 'card', 'coin', 'stamp', 'vinyl', 'comic',
+    'signed', 'limited', 'gold', 'silver', 'foil', 'error', 'misprint', 'poster', 'figure', 'lego',
+]
+# Generated words follow a Zipf-like distribution, like real titles do
+WORDS = COMMON_WORDS + [f'word{i}' for i in range(5000)]
+WORD_WEIGHTS = list(accumulate(1 / rank for rank in range(1, len(WORDS) + 1)))
+
+class Command(BaseCommand):
+    help = 'Measures /api/search/ query latency and fails if p95 exceeds FULLTEXT_SEARCH_LATENCY_BUDGET_MS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Index this many generated images instead of the database')
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--budget-ms', type=float, default=None)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        budget = options['budget_ms'] or settings.FULLTEXT_SEARCH_LATENCY_BUDGET_MS
+        filters = {'viewer_id': None}
+
+        started = time.monotonic()
+        if options['synthetic']:
+            index = BM25Index()
+            for image_id in range(1, options['synthetic'] + 1):
+                index.add(
+                    image_id,
+                    ' '.join(rng.choices(WORDS, cum_weights=WORD_WEIGHTS, k=3)),
+                    ' '.join(rng.choices(WORDS, cum_weights=WORD_WEIGHTS, k=20)),
+                    rng.choices(WORDS, cum_weights=WORD_WEIGHTS, k=3),
+                    {'owner_id': image_id % 100, 'category_id': image_id % 1000, 'is_public': True,
+                     'is_wishlist': False, 'valuation': rng.uniform(1, 500)}
+                )
+
+            def run(text):
+                return index.search(text, accept=lambda meta: _accepts(meta, filters), limit=21)
+        else:
+            search_images('warmup', filters, 1)
+
+            def run(text):
+                return search_images(text, filters, 21)
+        self.stdout.write(f"Index ready in {(time.monotonic() - started) * 1000:.0f} ms")
+
+        latencies = []
+        for _ in range(options['queries']):
+            text = ' '.join(rng.choices(WORDS, cum_weights=WORD_WEIGHTS, k=rng.randint(1, 3)))
+            query_started = time.perf_counter()
+            run(text)
+            latencies.append((time.perf_counter() - query_started) * 1000)
+
+        latencies.sort()
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+        p50, p95, p99 = percentile(0.50), percentile(0.95), percentile(0.99)
+        self.stdout.write(
+            f"{options['queries']} queries: p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms "
+            f"(budget p95 {budget:.0f} ms)"
+        )
+        if p95 > budget:
+            raise CommandError(f"p95 latency {p95:.2f} ms is over the {budget:.0f} ms budget")
+        self.stdout.write(self.style.SUCCESS('Search latency is within budget'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from api.tasks import scheduled_s3_deletion_drain, s3_deletion_metrics
+
+class Command(BaseCommand):
+    help = 'Deletes the S3 objects queued in the deletion outbox that are due; run it every few minutes from cron'
+
+    def handle(self, *args, **options):
+        handled = scheduled_s3_deletion_drain()
+
+        metrics = s3_deletion_metrics()
+        self.stdout.write(self.style.SUCCESS(
+            f"Handled {handled} outbox entries: {metrics['deleted']} deleted, "
+            f"{metrics['kept']} kept, {metrics['failed']} failed; "
+            f"{metrics['pending']} pending, {metrics['abandoned']} abandoned"
+        ))
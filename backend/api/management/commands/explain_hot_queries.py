@@ -0,0 +1,155 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from django.utils import timezone
+from api.models import Category, CategoryTag, Image, ImageTag, Tag
+
+# The composite indexes added for the hot filter paths (migration 0023)
+HOT_INDEXES = (
+    (Category, 'category_user_wishlist_idx'),
+    (Category, 'category_user_public_idx'),
+    (Image, 'image_cat_wishlist_upload_idx'),
+)
+
+def hot_queries(user_id, tag='rare'):
+    """(label, queryset) pairs for the hot filter paths, as the app runs them"""
+    since = timezone.now() - timedelta(days=365)
+    counted = Image.objects.filter(category__user_id=user_id, category__is_wishlist=False, is_wishlist=False)
+    return [
+        ('profile stats totals', counted.values('category__user_id').annotate(items=Count('id'), value=Sum('valuation'))),
+        ('monthly spending', counted.filter(uploaded_at__gte=since).values('uploaded_at', 'valuation')),
+        ('collection count', Category.objects.filter(user_id=user_id, is_wishlist=False).values('user_id').annotate(count=Count('id'))),
+        ('public collections', Category.objects.filter(user_id=user_id, is_public=True).order_by('-id')[:100]),
+        ('tag search: collections', Category.objects.filter(is_public=True, tag_links__normalized=tag).exclude(user_id=user_id).order_by('-id')[:100]),
+        ('tag search: items', Image.objects.filter(
+            category__is_public=True, is_wishlist=False, tag_links__normalized=tag
+        ).exclude(category__user_id=user_id).order_by('-id')[:100]),
+    ]
+
+def seed(users, categories_per_user, images_per_category, seed=1, batch_size=2000):
+    """Bulk-inserts a synthetic dataset and returns one of its user ids"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    User.objects.bulk_create(
+        [User(username=f'bench{i}', email=f'bench{i}@example.com') for i in range(users)],
+        batch_size=batch_size
+    )
+    user_ids = list(User.objects.filter(username__startswith='bench').values_list('id', flat=True))
+    Category.objects.bulk_create(
+        [
+            Category(
+                name=f'Collection {n}', user_id=user_id,
+                is_public=rng.random() < 0.7, is_wishlist=rng.random() < 0.2
+            )
+            for user_id in user_ids for n in range(categories_per_user)
+        ],
+        batch_size=batch_size
+    )
+    category_ids = list(Category.objects.filter(user_id__in=user_ids).values_list('id', flat=True))
+    for start in range(0, len(category_ids), 100):
+        Image.objects.bulk_create(
+            [
+                Image(
+                    title=f'Item {n}', path=f'bench/{category_id}/{n}.jpg', category_id=category_id,
+                    is_wishlist=rng.random() < 0.1,
+                    valuation=Decimal(rng.randint(100, 50000)) / 100,
+                )
+                for category_id in category_ids[start:start + 100] for n in range(images_per_category)
+            ],
+            batch_size=batch_size
+        )
+    image_ids = list(Image.objects.filter(category_id__in=category_ids).values_list('id', flat=True))
+    # auto_now_add stamped every row with now; spread the uploads over two years
+    for month in range(24):
+        Image.objects.filter(id__in=image_ids[month::24]).update(uploaded_at=now - timedelta(days=30 * month))
+
+    tags = list(Tag.get_or_create_all(['rare', 'holo', 'mint']).values())
+    CategoryTag.objects.bulk_create(
+        [CategoryTag(category_id=category_id, tag=rng.choice(tags)) for category_id in category_ids[::3]],
+        batch_size=batch_size, ignore_conflicts=True
+    )
+    tagged_image_ids = image_ids[::7]
+    ImageTag.objects.bulk_create(
+        [ImageTag(image_id=image_id, tag=rng.choice(tags)) for image_id in tagged_image_ids],
+        batch_size=batch_size, ignore_conflicts=True
+    )
+    return user_ids[len(user_ids) // 2]
+
+def analyze_tables():
+    """Refreshes planner statistics after bulk loads"""
+    tables = [model._meta.db_table for model in (Category, Image, CategoryTag, ImageTag, Tag)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f"ANALYZE TABLE {', '.join(tables)}")
+        elif connection.vendor in ('sqlite', 'postgresql'):
+            cursor.execute('ANALYZE')
+
+def set_hot_indexes(enabled):
+    with connection.schema_editor() as editor:
+        for model, name in HOT_INDEXES:
+            index = next(index for index in model._meta.indexes if index.name == name)
+            if enabled:
+                editor.add_index(model, index)
+            else:
+                editor.remove_index(model, index)
+
+def measure(queryset, runs):
+    """Median wall time of evaluating a queryset, in milliseconds"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+class Command(BaseCommand):
+    help = (
+        'Loads a synthetic dataset into a scratch test database and prints the EXPLAIN '
+        'plan and median time of each hot query without and with the composite indexes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=10, help='Collections per user')
+        parser.add_argument('--images', type=int, default=50, help='Items per collection')
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Never touch real data: build a throwaway database with every migration applied
+        old_name = connection.settings_dict['NAME']
+        try:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        except Exception as e:
+            raise CommandError(f"Could not create the scratch database: {str(e)}")
+        try:
+            self.stdout.write('Loading synthetic data...')
+            user_id = seed(options['users'], options['categories'], options['images'])
+            self.stdout.write(
+                f"{User.objects.count()} users, {Category.objects.count()} collections, "
+                f"{Image.objects.count()} items on {connection.vendor}"
+            )
+            self.report(user_id, options['runs'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def report(self, user_id, runs):
+        results = {}
+        for phase, enabled in (('before', False), ('after', True)):
+            set_hot_indexes(enabled)
+            analyze_tables()
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== {phase}: composite indexes {'present' if enabled else 'dropped'} ==="))
+            for label, queryset in hot_queries(user_id):
+                elapsed = measure(queryset, runs)
+                results.setdefault(label, {})[phase] = elapsed
+                self.stdout.write(self.style.MIGRATE_LABEL(f"\n{label}: {elapsed:.2f} ms"))
+                self.stdout.write(queryset.explain())
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\n=== summary (median ms) ==='))
+        for label, timings in results.items():
+            self.stdout.write(f"{label:<26} {timings['before']:>9.2f} -> {timings['after']:>9.2f}")
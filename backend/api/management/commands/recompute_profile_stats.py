@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import MonthlySpending, ProfileStats
+from api.stats import (
+    compute_monthly_spending,
+    compute_profile_stats,
+    recompute_monthly_spending,
+    recompute_profile_stats,
+)
+
+class Command(BaseCommand):
+    help = 'Recomputes the ProfileStats counters and MonthlySpending rollup from scratch and reports the users whose totals had drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only report drift')
+
+    def handle(self, *args, **options):
+        checked = drifted = 0
+        last_id = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['chunk_size']]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+
+            with transaction.atomic():
+                if not options['dry_run']:
+                    # Signal deltas for these users wait on the locks until the repair
+                    # commits, so none lands between reading the totals and overwriting them
+                    list(ProfileStats.objects.select_for_update().filter(user_id__in=user_ids).values_list('id'))
+                    list(MonthlySpending.objects.select_for_update().filter(user_id__in=user_ids).values_list('id'))
+                stale_ids, stale_month_ids = self.check(user_ids)
+                if not options['dry_run']:
+                    if stale_ids:
+                        recompute_profile_stats(stale_ids)
+                    if stale_month_ids:
+                        recompute_monthly_spending(stale_month_ids)
+            checked += len(user_ids)
+            drifted += len(set(stale_ids) | set(stale_month_ids))
+
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} users, {action} {drifted} with drifted totals"))
+
+    def check(self, user_ids):
+        """Reports and returns the users whose counters and whose monthly rollup drifted"""
+        stored = {
+            user_id: (collections, items, value)
+            for user_id, collections, items, value in ProfileStats.objects.filter(user_id__in=user_ids)
+            .values_list('user_id', 'total_collections', 'total_items', 'total_value')
+        }
+        fresh = compute_profile_stats(user_ids)
+        stale_ids = [user_id for user_id in user_ids if stored.get(user_id) != fresh[user_id]]
+        for user_id in stale_ids:
+            self.stdout.write(f"User {user_id}: stored {stored.get(user_id)}, actual {fresh[user_id]}")
+
+        # compute_monthly_spending keeps every non-zero month, negative ones included
+        stored_months = {user_id: {} for user_id in user_ids}
+        for user_id, month, amount in (
+            MonthlySpending.objects.filter(user_id__in=user_ids).exclude(amount=0)
+            .values_list('user_id', 'month', 'amount')
+        ):
+            stored_months[user_id][month] = amount
+        fresh_months = compute_monthly_spending(user_ids)
+        stale_month_ids = [user_id for user_id in user_ids if stored_months[user_id] != fresh_months[user_id]]
+        for user_id in stale_month_ids:
+            self.stdout.write(f"User {user_id}: monthly spending rollup drifted")
+        return stale_ids, stale_month_ids
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api.tasks import recover_upload_jobs
+
+class Command(BaseCommand):
+    help = (
+        'Re-queues or fails background upload jobs left unfinished by a restart '
+        'and deletes orphaned spool files. Re-queued jobs run before the command exits; '
+        'schedule it alongside drain_s3_deletions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-after', type=int, default=None,
+            help='Seconds without progress before a job counts as lost (default UPLOAD_JOB_STALE_AFTER)'
+        )
+
+    def handle(self, *args, **options):
+        requeued, failed, removed = recover_upload_jobs(options['stale_after'], inline=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"{requeued} jobs re-queued, {failed} failed, {removed} spool files removed"
+        ))
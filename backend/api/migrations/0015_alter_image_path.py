@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_uploadjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='path',
+            field=models.CharField(db_index=True, max_length=500),
+        ),
+    ]
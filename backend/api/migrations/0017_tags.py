@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_s3deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('normalized', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImageTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.image')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.tag')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategoryTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.category')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='tag_links',
+            field=models.ManyToManyField(blank=True, related_name='categories', through='api.CategoryTag', to='api.tag'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='tag_links',
+            field=models.ManyToManyField(blank=True, related_name='images', through='api.ImageTag', to='api.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='imagetag',
+            index=models.Index(fields=['tag', 'image'], name='imagetag_tag_image_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='imagetag',
+            constraint=models.UniqueConstraint(fields=('image', 'tag'), name='unique_image_tag'),
+        ),
+        migrations.AddIndex(
+            model_name='categorytag',
+            index=models.Index(fields=['tag', 'category'], name='categorytag_tag_category_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='categorytag',
+            constraint=models.UniqueConstraint(fields=('category', 'tag'), name='unique_category_tag'),
+        ),
+    ]
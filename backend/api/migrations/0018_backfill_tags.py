@@ -0,0 +1,84 @@
+import json
+
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+
+def normalize_tag(name):
+    return str(name).strip().lower()[:255]
+
+
+def parse_tags(value):
+    if not value:
+        return []
+    try:
+        tags = json.loads(value)
+    except ValueError:
+        return []
+    return [tag for tag in tags if str(tag).strip()] if isinstance(tags, list) else []
+
+
+def tags_for(Tag, names):
+    wanted = {}
+    for name in names:
+        wanted.setdefault(normalize_tag(name), str(name).strip()[:255])
+    if not wanted:
+        return {}
+    tags = {tag.normalized: tag for tag in Tag.objects.filter(normalized__in=wanted)}
+    missing = [Tag(name=wanted[key], normalized=key) for key in wanted if key not in tags]
+    if missing:
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        tags = {tag.normalized: tag for tag in Tag.objects.filter(normalized__in=wanted)}
+    return tags
+
+
+def backfill(apps, model_name, through_name, owner_field):
+    """
+    Walks the table in primary-key order, CHUNK_SIZE rows at a time, so each
+    chunk is its own short transaction and the table is never locked whole
+    """
+    Model = apps.get_model('api', model_name)
+    Through = apps.get_model('api', through_name)
+    Tag = apps.get_model('api', 'Tag')
+
+    last_id = 0
+    while True:
+        rows = list(
+            Model.objects.filter(id__gt=last_id)
+            .exclude(tags__isnull=True).exclude(tags='')
+            .order_by('id')
+            .values_list('id', 'tags')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        parsed = [(owner_id, parse_tags(value)) for owner_id, value in rows]
+        tags = tags_for(Tag, [name for _, names in parsed for name in names])
+        Through.objects.bulk_create(
+            [
+                Through(**{f'{owner_field}_id': owner_id, 'tag': tags[normalize_tag(name)]})
+                for owner_id, names in parsed
+                for name in names
+            ],
+            ignore_conflicts=True
+        )
+
+
+def backfill_tags(apps, schema_editor):
+    backfill(apps, 'Category', 'CategoryTag', 'category')
+    backfill(apps, 'Image', 'ImageTag', 'image')
+
+
+class Migration(migrations.Migration):
+    # Commit chunk by chunk instead of holding one transaction for the whole table
+    atomic = False
+
+    dependencies = [
+        ('api', '0017_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
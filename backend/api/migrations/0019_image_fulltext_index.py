@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def add_fulltext_index(apps, schema_editor):
+    # Only MySQL has FULLTEXT indexes; other databases use the BM25 backend
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX api_image_fulltext ON api_image (title, description, tags)'
+        )
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX api_image_fulltext ON api_image')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_backfill_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:55
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+CHUNK_SIZE = 1000
+SEARCH_WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def user_search_terms(username, email, first_name, last_name, display_name):
+    terms = {value.lower() for value in (username, email) if value}
+    for value in (first_name, last_name, display_name, username.split('@')[0], (email or '').split('@')[0]):
+        terms.update(SEARCH_WORD_RE.findall((value or '').lower()))
+    return {term[:150] for term in terms}
+
+
+def backfill_search_terms(apps, schema_editor):
+    """Indexes existing users CHUNK_SIZE at a time, in primary-key order"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserSearchTerm = apps.get_model('api', 'UserSearchTerm')
+
+    last_id = 0
+    while True:
+        rows = list(
+            User.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'username', 'email', 'first_name', 'last_name', 'profile__display_name')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        UserSearchTerm.objects.bulk_create(
+            [
+                UserSearchTerm(user_id=row[0], term=term)
+                for row in rows
+                for term in user_search_terms(*row[1:])
+            ],
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+    # Commit chunk by chunk instead of holding one transaction for the whole table
+    atomic = False
+
+    dependencies = [
+        ('api', '0019_image_fulltext_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=150)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'user'], name='api_usersearchterm_term_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'term'), name='unique_user_search_term')],
+            },
+        ),
+        migrations.RunPython(backfill_search_terms, migrations.RunPython.noop),
+    ]
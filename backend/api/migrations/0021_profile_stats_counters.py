@@ -0,0 +1,69 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:59
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+CHUNK_SIZE = 1000
+
+
+def backfill_counters(apps, schema_editor):
+    """Fills the new counters CHUNK_SIZE users at a time, in primary-key order"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Category = apps.get_model('api', 'Category')
+    Image = apps.get_model('api', 'Image')
+    ProfileStats = apps.get_model('api', 'ProfileStats')
+
+    last_id = 0
+    while True:
+        user_ids = list(User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:CHUNK_SIZE])
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+        stats = {user_id: {'total_collections': 0, 'total_items': 0, 'total_value': Decimal('0')} for user_id in user_ids}
+        collections = (
+            Category.objects.filter(user_id__in=user_ids, is_wishlist=False)
+            .values_list('user_id').annotate(count=Count('id')).order_by()
+        )
+        for user_id, count in collections:
+            stats[user_id]['total_collections'] = count
+        items = (
+            Image.objects.filter(category__user_id__in=user_ids, category__is_wishlist=False, is_wishlist=False)
+            .values_list('category__user_id').annotate(count=Count('id'), value=Sum('valuation')).order_by()
+        )
+        for user_id, count, value in items:
+            stats[user_id]['total_items'] = count
+            stats[user_id]['total_value'] = value or Decimal('0')
+        for user_id, defaults in stats.items():
+            ProfileStats.objects.update_or_create(user_id=user_id, defaults=defaults)
+
+
+class Migration(migrations.Migration):
+    # Commit chunk by chunk instead of holding one transaction for the whole table
+    atomic = False
+
+    dependencies = [
+        ('api', '0020_user_search_terms'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilestats',
+            name='total_collections',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profilestats',
+            name='total_items',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profilestats',
+            name='total_value',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+CHUNK_SIZE = 1000
+
+
+def backfill_rollup(apps, schema_editor):
+    """Aggregates existing images CHUNK_SIZE users at a time, in primary-key order"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Image = apps.get_model('api', 'Image')
+    MonthlySpending = apps.get_model('api', 'MonthlySpending')
+
+    last_id = 0
+    while True:
+        user_ids = list(User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:CHUNK_SIZE])
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+        rows = (
+            Image.objects.filter(
+                category__user_id__in=user_ids, category__is_wishlist=False,
+                is_wishlist=False, valuation__isnull=False
+            )
+            .annotate(month=TruncMonth('uploaded_at', output_field=models.DateField()))
+            .values_list('category__user_id', 'month')
+            .annotate(amount=Sum('valuation'))
+            .order_by()
+        )
+        MonthlySpending.objects.bulk_create(
+            [MonthlySpending(user_id=user_id, month=month, amount=amount) for user_id, month, amount in rows if amount],
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+    # Commit chunk by chunk instead of holding one transaction for the whole table
+    atomic = False
+
+    dependencies = [
+        ('api', '0021_profile_stats_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySpending',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_spending', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'month'), name='unique_monthly_spending')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
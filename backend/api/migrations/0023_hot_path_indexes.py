@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_monthly_spending'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['user', 'is_wishlist'], name='category_user_wishlist_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['user', 'is_public'], name='category_user_public_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['category', 'is_wishlist', 'uploaded_at', 'valuation'], name='image_cat_wishlist_upload_idx'),
+        ),
+    ]
@@ -1,16 +1,99 @@
 import json
+import re
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import receiver, Signal
 import uuid
 import os
 from django.db.models import Sum
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from collections import defaultdict
-from django.utils.timezone import now
+from django.utils.timezone import now, localtime, make_aware
+from django.db.models.functions import Coalesce, TruncMonth
+from django.conf import settings
+from decimal import Decimal
 
-class Category(models.Model):
+# Sent by TagLinksMixin.sync_tag_links with `tags`, the Tags it newly linked
+tags_linked = Signal()
+
+def normalize_tag(name):
+    return str(name).strip().lower()[:255]
+
+class Tag(models.Model):
+    """A tag shared by categories and images, matched case-insensitively"""
+    name = models.CharField(max_length=255)
+    normalized = models.CharField(max_length=255, unique=True)
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def get_or_create_all(cls, names):
+        """
+        Returns {normalized name: Tag} for the given names, creating missing
+        tags in one bulk insert
+        """
+        wanted = {}
+        for name in names:
+            if str(name).strip():
+                wanted.setdefault(normalize_tag(name), str(name).strip()[:255])
+        if not wanted:
+            return {}
+        tags = {tag.normalized: tag for tag in cls.objects.filter(normalized__in=wanted)}
+        missing = [cls(name=wanted[key], normalized=key) for key in wanted if key not in tags]
+        if missing:
+            cls.objects.bulk_create(missing, ignore_conflicts=True)
+            tags = {tag.normalized: tag for tag in cls.objects.filter(normalized__in=wanted)}
+        return tags
+
+class AtomicSaveMixin:
+    """
+    Saves in a transaction, so post_save receivers that write derived data
+    (the ProfileStats counters) commit or roll back together with the row
+    """
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+class TagLinksMixin:
+    """
+    Keeps a model's Tag links in step with its JSON `tags` column. get_tags()
+    keeps reading the JSON (it preserves order and spelling); the links make
+    tags queryable, e.g. Image.objects.filter(tag_links__normalized='rare').
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._linked_tags = instance.__dict__.get('tags')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'tags' not in update_fields:
+            return
+        if 'tags' in self.get_deferred_fields() or self.tags == getattr(self, '_linked_tags', None):
+            return
+        self.sync_tag_links()
+    
+    def sync_tag_links(self):
+        through = self._meta.get_field('tag_links').remote_field.through
+        owner_field = self._meta.model_name
+        tags = Tag.get_or_create_all(self.get_tags())
+        links = through.objects.filter(**{owner_field: self})
+        links.exclude(tag__in=tags.values()).delete()
+        linked_ids = set(links.values_list('tag_id', flat=True))
+        new_tags = [tag for tag in tags.values() if tag.id not in linked_ids]
+        through.objects.bulk_create(
+            [through(**{owner_field: self, 'tag': tag}) for tag in new_tags],
+            ignore_conflicts=True
+        )
+        self._linked_tags = self.tags
+        if new_tags:
+            tags_linked.send(sender=type(self), instance=self, tags=new_tags)
+
+class Category(AtomicSaveMixin, TagLinksMixin, models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -20,6 +103,16 @@ class Category(models.Model):
     is_wishlist = models.BooleanField(default=False)  # Add this!
     # Add tags as a JSON string to be compatible with any database
     tags = models.TextField(blank=True, null=True)
+    # Normalized copy of tags for SQL lookups, maintained by TagLinksMixin
+    tag_links = models.ManyToManyField(Tag, through='CategoryTag', related_name='categories', blank=True)
+    
+    class Meta:
+        indexes = [
+            # A user's collections (financial data, ProfileStats) and their items through the join
+            models.Index(fields=['user', 'is_wishlist'], name='category_user_wishlist_idx'),
+            # A user's public collections, newest first (InnoDB appends the id)
+            models.Index(fields=['user', 'is_public'], name='category_user_public_idx'),
+        ]
     
     def set_tags(self, tags_list):
         if tags_list is None:
@@ -35,10 +128,10 @@ class Category(models.Model):
             print(f"Error parsing tags: {self.tags}")
             return []
 
-class Image(models.Model):
+class Image(AtomicSaveMixin, TagLinksMixin, models.Model):
     id = models.AutoField(primary_key=True)
     title = models.CharField(max_length=255)
-    path = models.CharField(max_length=500)
+    path = models.CharField(max_length=500, db_index=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='images')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     # Add new fields
@@ -47,6 +140,20 @@ class Image(models.Model):
     tags = models.TextField(blank=True, null=True)
     purchase_url = models.URLField(blank=True, null=True)
     is_wishlist = models.BooleanField(default=False)
+    # Resized/WebP variants as a JSON string: {"320": {"webp": key, "jpeg": key}, ...}
+    # None means derivatives have not been generated yet
+    derivatives = models.TextField(blank=True, null=True)
+    # Normalized copy of tags for SQL lookups, maintained by TagLinksMixin
+    tag_links = models.ManyToManyField(Tag, through='ImageTag', related_name='images', blank=True)
+    
+    class Meta:
+        indexes = [
+            # Covers the spending aggregates: a category's non-wishlist items by upload date, with their valuation
+            models.Index(
+                fields=['category', 'is_wishlist', 'uploaded_at', 'valuation'],
+                name='image_cat_wishlist_upload_idx'
+            ),
+        ]
     
     def set_tags(self, tags_list):
         self.tags = json.dumps(tags_list)
@@ -56,6 +163,131 @@ class Image(models.Model):
             return json.loads(self.tags)
         return []
     
+    def set_derivatives(self, derivatives):
+        self.derivatives = json.dumps(derivatives)
+    
+    def get_derivatives(self):
+        if not self.derivatives:
+            return {}
+        try:
+            return json.loads(self.derivatives)
+        except ValueError:
+            return {}
+    
+    def apply_upload_fields(self, data):
+        """Copy the optional fields sent with an upload onto the image"""
+        if data.get('purchase_url'):
+            self.purchase_url = data['purchase_url']
+            
+        if 'description' in data:
+            self.description = data['description']
+            
+        if 'valuation' in data:
+            try:
+                value = data['valuation']
+                if value:
+                    self.valuation = float(value)
+            except (ValueError, TypeError):
+                pass  # Invalid value, just skip
+        
+        # Handle tags if present
+        if 'tags' in data:
+            tags = data['tags']
+            # If tags comes as a string (stringified JSON), parse it
+            if isinstance(tags, str):
+                try:
+                    tags = json.loads(tags)
+                except json.JSONDecodeError:
+                    tags = None  # Invalid JSON, skip
+            if isinstance(tags, list):
+                self.set_tags(tags)
+    
+    def get_object_keys(self):
+        """All S3 keys stored for this image: the original plus its derivatives"""
+        keys = [self.path] if self.path else []
+        for formats in self.get_derivatives().values():
+            keys.extend(formats.values())
+        return keys
+    
+class CategoryTag(models.Model):
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'tag'], name='unique_category_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'category'], name='categorytag_tag_category_idx'),
+        ]
+
+class ImageTag(models.Model):
+    image = models.ForeignKey(Image, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'tag'], name='unique_image_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'image'], name='imagetag_tag_image_idx'),
+        ]
+
+class UploadJob(models.Model):
+    """An image upload spooled to local disk and finished by a background worker"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_jobs')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='upload_jobs')
+    image = models.ForeignKey(Image, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    spool_path = models.CharField(max_length=500)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    is_wishlist = models.BooleanField(default=False)
+    # Title, description, valuation, tags... as a JSON string
+    fields = models.TextField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def get_fields(self):
+        return json.loads(self.fields) if self.fields else {}
+
+class S3Deletion(models.Model):
+    """
+    An S3 object waiting to be deleted, written in the same transaction as
+    the rows that referenced it and drained in batches by api.tasks
+    """
+    object_key = models.CharField(max_length=500)
+    # Deletes everything under object_key that existed when the entry was queued
+    is_prefix = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now, db_index=True)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(default=now)
+    
+    def __str__(self):
+        return self.object_key
+
+class S3UploadPin(models.Model):
+    """
+    A content-addressed object an upload is about to reference. The deletion
+    drain leaves pinned objects alone until the pin expires, by which time
+    the referencing row exists (see api.utils.pin_s3_object).
+    """
+    object_key = models.CharField(max_length=500, db_index=True)
+    created_at = models.DateTimeField(default=now, db_index=True)
+    
+    def __str__(self):
+        return self.object_key
+
 class UserFollow(models.Model):
     follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
     followed = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
@@ -76,6 +308,40 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s profile"
 
+SEARCH_TERM_MAX_LENGTH = 150
+SEARCH_WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+def user_search_terms(user, display_name=''):
+    """
+    The lowercased terms a user can be found by: their whole username and
+    email, and the words of their names, display name and username/email
+    local part
+    """
+    terms = {value.lower() for value in (user.username, user.email) if value}
+    for value in (user.first_name, user.last_name, display_name, user.username.split('@')[0], (user.email or '').split('@')[0]):
+        terms.update(SEARCH_WORD_RE.findall((value or '').lower()))
+    return {term[:SEARCH_TERM_MAX_LENGTH] for term in terms}
+
+class UserSearchTerm(models.Model):
+    """
+    Prefix-searchable terms of a user (see user_search_terms), so user
+    search is an index range scan (term LIKE 'q%') instead of LIKE '%q%'
+    scans over five columns. Kept current by sync_user_search_terms.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=SEARCH_TERM_MAX_LENGTH)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'term'], name='unique_user_search_term'),
+        ]
+        indexes = [
+            models.Index(fields=['term', 'user'], name='api_usersearchterm_term_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.term}"
+
 class FinancialInfo(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='financial_info')
 
@@ -85,46 +351,91 @@ class FinancialInfo(models.Model):
         ).aggregate(total_spending=Sum('valuation'))['total_spending'] or 0
 
     def get_collection_prices(self):
-        categories = Category.objects.filter(user=self.user, is_wishlist=False).prefetch_related('images')
-        return [{"collectionName": category.name, "price": sum(image.valuation for image in category.images.all() if image.valuation)} for category in categories]
+        categories = (
+            Category.objects.filter(user_id=self.user_id, is_wishlist=False)
+            .annotate(price=Coalesce(Sum('images__valuation'), Decimal('0')))
+            .order_by('id')
+        )
+        return [{"collectionName": name, "price": price} for name, price in categories.values_list('name', 'price')]
 
     def get_monthly_spending(self):
-        # Use timezone-aware datetime
-        twelve_months_ago = now() - timedelta(days=365)
-        monthly_spending = defaultdict(float)
+        """
+        Valuation of the non-wishlist items uploaded in the last 365 days,
+        per calendar month, oldest first, summed in the database. Negative
+        valuations count and months that add up to zero are left out, the
+        same in both paths. Large accounts read the whole months from the
+        MonthlySpending rollup and only sum the images of the partial first
+        month.
+        """
+        since = now() - timedelta(days=365)
 
-        # Query the Image model directly, using uploaded_at
+        total_items = ProfileStats.objects.filter(user_id=self.user_id).values_list('total_items', flat=True).first()
+        if (total_items or 0) >= settings.FINANCIAL_ROLLUP_MIN_ITEMS:
+            first_day = localtime(since).date()
+            year, month = divmod(first_day.year * 12 + first_day.month, 12)
+            first_whole_month = date(year, month + 1, 1)
+            rows = list(self._image_spending(since, make_aware(datetime.combine(first_whole_month, time.min))))
+            rows += (
+                MonthlySpending.objects.filter(user_id=self.user_id, month__gte=first_whole_month)
+                .exclude(amount=0)
+                .order_by('month')
+                .values_list('month', 'amount')
+            )
+        else:
+            rows = self._image_spending(since)
+        return [{"month": month.strftime('%Y-%m'), "amount": amount} for month, amount in rows]
+
+    def _image_spending(self, since, until=None):
+        """(month, amount) rows summed from the images uploaded in [since, until)"""
         images = Image.objects.filter(
-            category__user=self.user,
+            category__user_id=self.user_id,
             category__is_wishlist=False,
             is_wishlist=False,
-            uploaded_at__gte=twelve_months_ago  # Use uploaded_at for date filtering
+            valuation__isnull=False,
+            uploaded_at__gte=since
+        )
+        if until is not None:
+            images = images.filter(uploaded_at__lt=until)
+        return (
+            images.annotate(month=TruncMonth('uploaded_at', output_field=models.DateField()))
+            .values_list('month')
+            .annotate(amount=Sum('valuation'))
+            .exclude(amount=0)
+            .order_by('month')
         )
 
-        for image in images:
-            if image.valuation:  # Ensure valuation exists
-                # Convert uploaded_at to a naive datetime if necessary, or use it directly
-                month_key = image.uploaded_at.strftime('%Y-%m')  # Format as "YYYY-MM"
-                monthly_spending[month_key] += float(image.valuation)
+class MonthlySpending(models.Model):
+    """
+    Per-user, per-month total valuation of non-wishlist items by upload
+    month, kept current by the receivers in api.stats
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_spending')
+    month = models.DateField()  # First day of the month
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
-        # Convert to a sorted list of dictionaries
-        return [{"month": key, "amount": value} for key, value in sorted(monthly_spending.items())]
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='unique_monthly_spending'),
+        ]
 
 class ProfileStats(models.Model):
+    """
+    Materialized totals of a user's non-wishlist collections and items,
+    kept current by the receivers in api.stats
+    """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile_stats')
+    total_collections = models.IntegerField(default=0)
+    total_items = models.IntegerField(default=0)
+    total_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
     def get_total_value(self):
-        return Image.objects.filter(
-            category__user=self.user, category__is_wishlist=False, is_wishlist=False
-        ).aggregate(total_value=Sum('valuation'))['total_value'] or 0
+        return self.total_value
 
     def get_total_collections(self):
-        return Category.objects.filter(user=self.user, is_wishlist=False).count()
+        return self.total_collections
 
     def get_total_items(self):
-        return Image.objects.filter(
-            category__user=self.user, category__is_wishlist=False, is_wishlist=False
-        ).count()
+        return self.total_items
     
 class Goal(models.Model):
     user_profile = models.ForeignKey(
@@ -155,7 +466,25 @@ def create_financial_info(sender, instance, created, **kwargs):
     if created:
         FinancialInfo.objects.create(user=instance)
 
+@receiver(post_save, sender=User)
+def create_profile_stats(sender, instance, created, **kwargs):
+    if created:
+        ProfileStats.objects.create(user=instance)
+
 @receiver(post_save, sender=User)
 def save_financial_info(sender, instance, **kwargs):
     if hasattr(instance, 'financial_info'):
-        instance.financial_info.save()
\ No newline at end of file
+        instance.financial_info.save()
+
+@receiver(post_save, sender=UserProfile)
+def sync_user_search_terms(sender, instance, **kwargs):
+    """Re-indexes a user for search; User saves reach here through save_user_profile"""
+    terms = user_search_terms(instance.user, instance.display_name)
+    existing = set(UserSearchTerm.objects.filter(user_id=instance.user_id).values_list('term', flat=True))
+    if existing - terms:
+        UserSearchTerm.objects.filter(user_id=instance.user_id, term__in=existing - terms).delete()
+    if terms - existing:
+        UserSearchTerm.objects.bulk_create(
+            [UserSearchTerm(user_id=instance.user_id, term=term) for term in terms - existing],
+            ignore_conflicts=True
+        )
@@ -0,0 +1,86 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered on indexed columns and located with an opaque cursor, so
+deep pages cost the same as the first one and no COUNT(*) is run. The
+response body stays a plain JSON list, as clients expect; the next and
+previous pages are advertised in a `Link` header:
+
+    Link: <https://.../api/categories/?cursor=cD0xMjM%3D>; rel="next"
+
+Clients pass `?page_size=` (capped at API_MAX_PAGE_SIZE) and request the
+`next` link only when they need more rows, e.g. on a "Load more" action.
+"""
+import base64
+import json
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+def page_size_from_request(request):
+    """Returns the requested ?page_size=, defaulting to API_PAGE_SIZE and capped at API_MAX_PAGE_SIZE"""
+    try:
+        page_size = int(request.query_params.get('page_size', settings.API_PAGE_SIZE))
+    except (TypeError, ValueError):
+        page_size = settings.API_PAGE_SIZE
+    return max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+def link_header(next_url=None, previous_url=None):
+    links = []
+    if next_url:
+        links.append(f'<{next_url}>; rel="next"')
+    if previous_url:
+        links.append(f'<{previous_url}>; rel="prev"')
+    return ', '.join(links)
+
+def paginated_list_response(data, next_url=None, previous_url=None):
+    response = Response(data)
+    links = link_header(next_url, previous_url)
+    if links:
+        response['Link'] = links
+    return response
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination ordered newest first on the primary key"""
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        return page_size_from_request(request)
+
+    def get_paginated_response(self, data):
+        return paginated_list_response(data, self.get_next_link(), self.get_previous_link())
+
+class ImageKeysetPagination(KeysetPagination):
+    """Newest uploads first; id breaks ties between equal timestamps"""
+    ordering = ('-uploaded_at', '-id')
+
+def encode_cursor(position):
+    """Encodes a keyset position (a JSON-serializable dict) as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+
+def decode_cursor(request):
+    """
+    Decodes the ?cursor= of a request built by encode_cursor
+
+    Returns:
+        The position dict, or None for the first page
+
+    Raises:
+        NotFound: If the cursor is malformed
+    """
+    cursor = request.query_params.get('cursor')
+    if not cursor:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise NotFound('Invalid cursor')
+    if not isinstance(position, dict):
+        raise NotFound('Invalid cursor')
+    return position
+
+def next_page_url(request, position):
+    return replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(position))
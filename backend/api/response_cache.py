@@ -0,0 +1,232 @@
+"""
+Per-user response cache for read-heavy endpoints.
+
+Cached payloads live in Django's cache (CACHES['default']) under keys that
+embed a generation counter for each user or category they are built from:
+
+    response:categories-list:user7:1718000000123456:<hash of viewer and path>
+
+Writes never look for the keys they make stale. The receivers below bump
+the generations of the users and categories a write touches, so readers
+compute new keys and the old entries age out after RESPONSE_CACHE_TTL.
+A bump happens right away, so the writing request reads its own writes,
+and again when the transaction commits, so a payload rebuilt in between
+from the old committed rows is never served. Writes that bypass the model
+layer (queryset.update(), raw SQL) are only picked up when the TTL runs
+out.
+
+The generation counters are only as shared as the cache backend. With
+the default LocMemCache every process keeps its own counters, so a write
+handled by one worker never bumps the counters another worker reads, and
+that worker keeps serving the stale payload until the TTL runs out. The
+cache is therefore bypassed when the backend is LocMemCache and
+WEB_CONCURRENCY says more than one worker serves requests; configure a
+shared backend (Redis, Memcached) in CACHES to cache with several
+workers.
+
+Hits and misses are counted per endpoint in this process, see
+response_cache_metrics().
+"""
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.response import Response
+from .stats import category_state, origin_model
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+def _generation_key(scope, obj_id):
+    return f'generation:{scope}:{obj_id}'
+
+def get_generations(*scopes):
+    """
+    Current generation of each (scope, id) pair
+
+    A missing counter starts at the current time in microseconds, above any
+    value it can have held before it was evicted, so old keys never come
+    back into use.
+    """
+    keys = [_generation_key(scope, obj_id) for scope, obj_id in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns() // 1000, None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Never read or evicted: the next read starts a fresh counter
+        pass
+
+def bump_generation(scope, obj_id):
+    """Makes every cached payload built from a user or category stale"""
+    if obj_id is None:
+        return
+    key = _generation_key(scope, obj_id)
+    _bump(key)
+    transaction.on_commit(lambda: _bump(key))
+
+def bump_user(user_id):
+    bump_generation('user', user_id)
+
+def bump_category(category_id):
+    bump_generation('category', category_id)
+
+def cache_key(name, scopes, variant=''):
+    """
+    Key of a payload built from the given (scope, id) pairs at their current
+    generations
+
+    Args:
+        variant: Anything else the payload depends on, e.g. the path and viewer
+    """
+    generations = '.'.join(
+        f'{scope}{obj_id}:{generation}'
+        for (scope, obj_id), generation in zip(scopes, get_generations(*scopes))
+    )
+    digest = hashlib.sha1(variant.encode()).hexdigest()
+    return f'response:{name}:{generations}:{digest}'
+
+def record_lookup(name, hit):
+    with _metrics_lock:
+        counts = _metrics.setdefault(name, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+def response_cache_metrics():
+    """Hits, misses and hit rate per endpoint and overall, for this process"""
+    def with_rate(counts):
+        lookups = counts['hits'] + counts['misses']
+        return {**counts, 'hit_rate': counts['hits'] / lookups if lookups else 0.0}
+
+    with _metrics_lock:
+        endpoints = {name: dict(counts) for name, counts in _metrics.items()}
+    total = {
+        'hits': sum(counts['hits'] for counts in endpoints.values()),
+        'misses': sum(counts['misses'] for counts in endpoints.values()),
+    }
+    return {
+        **with_rate(total),
+        'endpoints': {name: with_rate(counts) for name, counts in sorted(endpoints.items())},
+    }
+
+def reset_response_cache_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+def response_cache_enabled():
+    """False when the TTL is 0 or several workers would each hold their own LocMemCache"""
+    if settings.RESPONSE_CACHE_TTL <= 0:
+        return False
+    return settings.WEB_CONCURRENCY <= 1 or not isinstance(caches['default'], LocMemCache)
+
+def cached_response(request, name, scopes, build):
+    """
+    Serves a GET from the cache, or calls build() and caches its response
+    when it is a 200
+
+    The key covers the full path and the requesting user, so query
+    parameters, pagination cursors and viewer-specific fields such as
+    is_following never leak between requests.
+
+    Args:
+        name: Endpoint label used in the key and the metrics
+        scopes: (scope, id) pairs the payload is built from, e.g. [('user', 7)]
+        build: Callable returning a DRF Response
+
+    Returns:
+        A Response with the cached data and Link header, or build()'s response
+    """
+    if not response_cache_enabled():
+        return build()
+    ttl = settings.RESPONSE_CACHE_TTL
+    key = cache_key(name, scopes, f'{request.user.id}:{request.get_full_path()}')
+    entry = cache.get(key)
+    record_lookup(name, entry is not None)
+    if entry is not None:
+        data, link = entry
+        response = Response(data)
+        if link:
+            response['Link'] = link
+        return response
+    response = build()
+    if response.status_code == 200:
+        cache.set(key, (response.data, response.get('Link')), ttl)
+    return response
+
+def image_changed(sender, instance, origin=None, **kwargs):
+    """post_save/post_delete receiver for Image"""
+    from django.contrib.auth.models import User
+    from .models import Category
+    if origin_model(origin) in (Category, User):
+        # Cascade: the category or user receiver covers it
+        return
+    user_id, _ = category_state(instance.category_id, instance._state.fields_cache.get('category'))
+    bump_category(instance.category_id)
+    bump_user(user_id)
+
+def image_moving(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save receiver for Image: a move also changes the collection it leaves"""
+    if raw or instance._state.adding or (update_fields is not None and 'category' not in update_fields):
+        return
+    old_category_id = sender.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+    if old_category_id is not None and old_category_id != instance.category_id:
+        bump_category(old_category_id)
+        bump_user(category_state(old_category_id)[0])
+
+def category_moving(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save receiver for Category: a change of owner also changes the old owner"""
+    if raw or instance._state.adding or (update_fields is not None and 'user' not in update_fields):
+        return
+    old_user_id = sender.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+    if old_user_id != instance.user_id:
+        bump_user(old_user_id)
+
+def category_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for Category"""
+    bump_category(instance.id)
+    bump_user(instance.user_id)
+
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """post_save/post_delete receiver for User; logins only touch last_login"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_user(instance.id)
+
+def profile_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for UserProfile"""
+    bump_user(instance.user_id)
+
+def follow_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for UserFollow: both users' counts move"""
+    bump_user(instance.follower_id)
+    bump_user(instance.followed_id)
+
+def goal_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for Goal"""
+    from .models import UserProfile
+    bump_user(UserProfile.objects.filter(id=instance.user_profile_id).values_list('user_id', flat=True).first())
+
+def connect_signals():
+    from django.contrib.auth.models import User
+    from django.db.models.signals import pre_save, post_save, post_delete
+    from .models import Category, Goal, Image, UserFollow, UserProfile
+    pre_save.connect(image_moving, sender=Image, dispatch_uid='response_cache_move_Image')
+    pre_save.connect(category_moving, sender=Category, dispatch_uid='response_cache_move_Category')
+    for model, receiver in (
+        (Image, image_changed),
+        (Category, category_changed),
+        (User, user_changed),
+        (UserProfile, profile_changed),
+        (UserFollow, follow_changed),
+        (Goal, goal_changed),
+    ):
+        post_save.connect(receiver, sender=model, dispatch_uid=f'response_cache_save_{model.__name__}')
+        post_delete.connect(receiver, sender=model, dispatch_uid=f'response_cache_delete_{model.__name__}')
@@ -0,0 +1,300 @@
+"""
+Optional per-process inverted index over image and category tags and titles.
+
+Each document (an Image or Category id) is split into normalized tokens;
+the index maps every token to a sorted array of the ids containing it, so
+multi-term AND/OR queries are merges of sorted arrays and never touch the
+database. Tag tokens weigh more than title tokens when ranking.
+
+Enable with SEARCH_INDEX_ENABLED. Processes that serve requests then build
+the index in a background thread at startup: a recent snapshot at
+SEARCH_INDEX_SNAPSHOT_PATH is served at once while a full build streams
+both tables to catch up on the writes made since it was taken. The index
+is kept current by post_save/post_delete signals applied on commit (see
+api.background_index). Signals only see this process's writes, so with
+several worker processes each index also rebuilds itself in the background
+once it is older than SEARCH_INDEX_MAX_AGE seconds.
+
+GET /api/search/by-tag/ narrows its rows to tag_candidates() when the index
+is enabled, and re-checks those ids in SQL, so a stale index can miss a
+recent tag but never shows a row the database would not.
+
+Usage:
+    from api.search_index import search
+    search('image', 'rare holo', mode='and')  # -> [(id, score), ...]
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left, insort
+from heapq import merge
+from django.conf import settings
+from .background_index import BackgroundIndex
+
+TAG_WEIGHT = 2.0
+TITLE_WEIGHT = 1.0
+SNAPSHOT_VERSION = 1
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def tokenize(text):
+    """Lowercase word tokens of a title or tag"""
+    return TOKEN_RE.findall(str(text).lower()) if text else []
+
+def document_tokens(title, tags):
+    """Token -> weight for one document; a token found in both fields gets both weights"""
+    tokens = {token: TITLE_WEIGHT for token in tokenize(title)}
+    for token in {token for tag in tags for token in tokenize(tag)}:
+        tokens[token] = tokens.get(token, 0) + TAG_WEIGHT
+    return tokens
+
+def intersect_sorted(left, right):
+    """Intersection of two ascending id arrays, binary-searching the longer one"""
+    if len(left) > len(right):
+        left, right = right, left
+    result = []
+    position = 0
+    for value in left:
+        position = bisect_left(right, value, position)
+        if position == len(right):
+            break
+        if right[position] == value:
+            result.append(value)
+    return result
+
+def union_sorted(arrays):
+    """Union of ascending id arrays, without duplicates"""
+    result = []
+    for value in merge(*arrays):
+        if not result or result[-1] != value:
+            result.append(value)
+    return result
+
+class InvertedIndex:
+    """Token -> sorted ids, plus each id's token weights for ranking and removal"""
+
+    def __init__(self):
+        self.postings = {}
+        self.documents = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, doc_id, tokens):
+        """Indexes (or re-indexes) a document given its token -> weight map"""
+        with self.lock:
+            self.remove(doc_id)
+            if not tokens:
+                return
+            self.documents[doc_id] = tokens
+            for token in tokens:
+                ids = self.postings.setdefault(token, [])
+                if not ids or ids[-1] < doc_id:
+                    ids.append(doc_id)
+                else:
+                    insort(ids, doc_id)
+
+    def remove(self, doc_id):
+        with self.lock:
+            tokens = self.documents.pop(doc_id, None)
+            if not tokens:
+                return
+            for token in tokens:
+                ids = self.postings.get(token)
+                if ids is None:
+                    continue
+                position = bisect_left(ids, doc_id)
+                if position < len(ids) and ids[position] == doc_id:
+                    del ids[position]
+                if not ids:
+                    del self.postings[token]
+
+    def query(self, text, mode='and', limit=None):
+        """
+        Ranks the documents matching the tokens of `text`
+
+        Args:
+            text: Query string, tokenized like titles and tags
+            mode: 'and' requires every token, 'or' any of them
+            limit: Maximum number of results
+
+        Returns:
+            List of (id, score) tuples, best first, newest first on ties
+        """
+        terms = list(dict.fromkeys(tokenize(text)))
+        if not terms:
+            return []
+        with self.lock:
+            arrays = [self.postings.get(term, []) for term in terms]
+            if mode == 'and':
+                if not all(arrays):
+                    return []
+                arrays.sort(key=len)
+                ids = arrays[0]
+                for array in arrays[1:]:
+                    ids = intersect_sorted(ids, array)
+                    if not ids:
+                        return []
+            else:
+                ids = union_sorted([array for array in arrays if array])
+            scored = [
+                (doc_id, sum(self.documents[doc_id].get(term, 0) for term in terms))
+                for doc_id in ids
+            ]
+        scored.sort(key=lambda item: (-item[1], -item[0]))
+        return scored[:limit] if limit else scored
+
+    def to_dict(self):
+        with self.lock:
+            return {str(doc_id): tokens for doc_id, tokens in self.documents.items()}
+
+    @classmethod
+    def from_dict(cls, documents):
+        index = cls()
+        for doc_id in sorted(int(key) for key in documents):
+            index.add(doc_id, documents[str(doc_id)])
+        return index
+
+class SearchIndex:
+    """The image and category indexes of this process"""
+
+    def __init__(self, images=None, categories=None, built_at=None):
+        self.indexes = {
+            'image': images if images is not None else InvertedIndex(),
+            'category': categories if categories is not None else InvertedIndex(),
+        }
+        self.built_at = built_at or time.time()
+
+    @classmethod
+    def build(cls, chunk_size=2000):
+        """Builds both indexes by streaming the tables"""
+        from .models import Category, Image
+        index = cls()
+        for kind, model, title_field in (('image', Image, 'title'), ('category', Category, 'name')):
+            rows = model.objects.order_by('id').values_list('id', title_field, 'tags').iterator(chunk_size=chunk_size)
+            for doc_id, title, tags in rows:
+                index.indexes[kind].add(doc_id, document_tokens(title, parse_tags(tags)))
+        return index
+
+    def save_snapshot(self, path):
+        """Writes the index atomically so a crashed write never leaves a partial snapshot"""
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'built_at': self.built_at,
+            'documents': {kind: index.to_dict() for kind, index in self.indexes.items()},
+        }
+        # A temp file of its own, so workers saving at once never write into each other's
+        with tempfile.NamedTemporaryFile(
+            'w', dir=os.path.dirname(path) or '.', prefix=f'{os.path.basename(path)}.', suffix='.tmp', delete=False
+        ) as snapshot_file:
+            tmp_path = snapshot_file.name
+            try:
+                json.dump(snapshot, snapshot_file, separators=(',', ':'))
+            except Exception:
+                snapshot_file.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_snapshot(cls, path, max_age):
+        """Returns the snapshot at path, or None if it is missing, stale or unreadable"""
+        try:
+            with open(path) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get('version') != SNAPSHOT_VERSION or time.time() - snapshot.get('built_at', 0) > max_age:
+            return None
+        documents = snapshot['documents']
+        return cls(
+            images=InvertedIndex.from_dict(documents.get('image', {})),
+            categories=InvertedIndex.from_dict(documents.get('category', {})),
+            built_at=snapshot['built_at']
+        )
+
+def parse_tags(value):
+    if not value:
+        return []
+    try:
+        tags = json.loads(value)
+    except ValueError:
+        return []
+    return tags if isinstance(tags, list) else []
+
+def build_index():
+    """Builds both indexes from the tables and refreshes the snapshot"""
+    index = SearchIndex.build()
+    path = settings.SEARCH_INDEX_SNAPSHOT_PATH
+    if path:
+        try:
+            index.save_snapshot(path)
+        except OSError as e:
+            print(f"Could not write search index snapshot: {str(e)}")
+    return index
+
+def load_index_snapshot():
+    path = settings.SEARCH_INDEX_SNAPSHOT_PATH
+    return SearchIndex.load_snapshot(path, settings.SEARCH_INDEX_MAX_AGE) if path else None
+
+_holder = BackgroundIndex(
+    'search index', build_index, lambda: settings.SEARCH_INDEX_MAX_AGE, load=load_index_snapshot
+)
+
+def get_search_index():
+    """Returns this process's index, building it on first use"""
+    return _holder.get()
+
+def start_background_build():
+    """Loads a recent snapshot, then rebuilds from the tables, in a daemon thread"""
+    _holder.start_build(use_load=True)
+
+def reset_search_index():
+    _holder.reset()
+
+def search(kind, text, mode='and', limit=None):
+    """Ranked (id, score) tuples of 'image' or 'category' documents matching text"""
+    return get_search_index().indexes[kind].query(text, mode=mode, limit=limit)
+
+def tag_candidates(kind, tag, before_id=None):
+    """
+    Ids of 'image' or 'category' documents holding every word of tag in
+    their tags or title, newest first and below before_id
+
+    Returns None when the tag has no word tokens. The ids are a superset of
+    the rows tagged with it as of this process's index, so callers must
+    re-check them (tag, visibility) in SQL.
+    """
+    if not tokenize(tag):
+        return None
+    ids = sorted((doc_id for doc_id, _ in search(kind, tag)), reverse=True)
+    return [doc_id for doc_id in ids if before_id is None or doc_id < before_id]
+
+def index_instance(sender, instance, update_fields=None, **kwargs):
+    """post_save receiver for Image and Category"""
+    kind = sender._meta.model_name
+    title_field = 'name' if kind == 'category' else 'title'
+    if update_fields is not None and not {'tags', title_field} & set(update_fields):
+        return
+    if {'tags', title_field} & instance.get_deferred_fields():
+        instance.refresh_from_db(fields=['tags', title_field])
+    doc_id = instance.id
+    tokens = document_tokens(getattr(instance, title_field), instance.get_tags())
+    _holder.apply_on_commit(lambda index: index.indexes[kind].add(doc_id, tokens))
+
+def unindex_instance(sender, instance, **kwargs):
+    """post_delete receiver for Image and Category"""
+    kind = sender._meta.model_name
+    doc_id = instance.id
+    _holder.apply_on_commit(lambda index: index.indexes[kind].remove(doc_id))
+
+def connect_signals():
+    from django.db.models.signals import post_save, post_delete
+    from .models import Category, Image
+    for model in (Image, Category):
+        post_save.connect(index_instance, sender=model, dispatch_uid=f'search_index_save_{model.__name__}')
+        post_delete.connect(unindex_instance, sender=model, dispatch_uid=f'search_index_delete_{model.__name__}')
@@ -1,6 +1,15 @@
 import json
+from decimal import Decimal
 from rest_framework import serializers
-from .utils import generate_presigned_url
+from django.conf import settings
+from django.db import models
+from django.db.models import (
+    Count, DecimalField, Exists, F, IntegerField, OuterRef, Prefetch, Subquery, Sum, Value, Window
+)
+from django.db.models.functions import Coalesce, RowNumber
+from django.urls import reverse
+from .utils import generate_presigned_url, generate_presigned_urls
+from .thumbnails import derivative_widths, pick_derivative
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -8,20 +17,68 @@ from .models import (
     Category,
     Image,
     UserFollow,
+    UserProfile,
     Goal
 )
 
+def use_stable_media_urls(context):
+    """
+    Whether image URLs should point at the stable /api/media/<id>/ redirect.
+    Set 'stable_media_urls' in the serializer context or pass ?stable_urls=true
+    to override the MEDIA_STABLE_URLS setting.
+    """
+    if 'stable_media_urls' in context:
+        return context['stable_media_urls']
+    request = context.get('request')
+    if request is not None:
+        value = getattr(request, 'query_params', request.GET).get('stable_urls')
+        if value is not None:
+            return value.lower() == 'true'
+    return getattr(settings, 'MEDIA_STABLE_URLS', False)
+
+def _object_key(path):
+    if path and '/' in path and 's3.amazonaws.com/' in path:
+        return path.split('s3.amazonaws.com/')[1]
+    return path
+
+def stable_media_url(image_id, context):
+    url = reverse('api:media-redirect', args=[image_id])
+    request = context.get('request')
+    return request.build_absolute_uri(url) if request is not None else url
+
+class BatchPresignListSerializer(serializers.ListSerializer):
+    """
+    Collects every S3 key the child serializer will sign and presigns them
+    in one batch before serializing, so each get_*_url call is a cache hit.
+    Children provide a collect_object_keys(instances) classmethod.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        instances = list(iterable)
+        
+        # A list nested inside a batched list has already been signed
+        root_is_batched = isinstance(self.root, BatchPresignListSerializer) and self.root is not self
+        if instances and not root_is_batched and not use_stable_media_urls(self.context):
+            generate_presigned_urls(self.child.collect_object_keys(instances))
+        
+        return super().to_representation(instances)
+
 class ImageSerializer(serializers.ModelSerializer):
     presigned_url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     tags = serializers.SerializerMethodField()
     
     class Meta:
         model = Image
-        fields = ['id', 'title', 'path', 'presigned_url', 'category', 'uploaded_at', 
+        list_serializer_class = BatchPresignListSerializer
+        fields = ['id', 'title', 'path', 'presigned_url', 'srcset', 'category', 'uploaded_at', 
                  'description', 'valuation', 'tags', 'purchase_url', 'is_wishlist']
         read_only_fields = ['id', 'uploaded_at']
     
     def get_presigned_url(self, obj):
+        if use_stable_media_urls(self.context):
+            return stable_media_url(obj.id, self.context)
+        
         # Your existing code
         path = obj.path
         if '/' in path and 's3.amazonaws.com/' in path:
@@ -31,6 +88,26 @@ class ImageSerializer(serializers.ModelSerializer):
             
         return generate_presigned_url(obj.path)
     
+    def get_srcset(self, obj):
+        """Derivative URLs by format and width, e.g. {"webp": {"320": url}}"""
+        srcset = {}
+        stable = use_stable_media_urls(self.context)
+        for width, formats in obj.get_derivatives().items():
+            for fmt, object_key in formats.items():
+                if stable:
+                    url = f"{stable_media_url(obj.id, self.context)}?w={width}&fmt={fmt}"
+                else:
+                    url = generate_presigned_url(object_key)
+                srcset.setdefault(fmt, {})[width] = url
+        return srcset
+    
+    @classmethod
+    def collect_object_keys(cls, instances):
+        keys = []
+        for image in instances:
+            keys.extend(image.get_object_keys())
+        return keys
+    
     def get_tags(self, obj):
         return obj.get_tags() if obj.tags else []
     
@@ -51,6 +128,19 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'created_at', 'placeholder_image', 'placeholder_presigned_url', 
                  'images', 'is_public', 'tags']
         read_only_fields = ['id', 'created_at']
+        list_serializer_class = BatchPresignListSerializer
+    
+    @classmethod
+    def collect_object_keys(cls, instances):
+        keys = [_object_key(category.placeholder_image) for category in instances]
+        if all('images' in getattr(category, '_prefetched_objects_cache', {}) for category in instances):
+            images = [image for category in instances for image in category.images.all()]
+        else:
+            images = Image.objects.filter(
+                category__in=[category.id for category in instances]
+            ).only('path', 'derivatives')
+        keys += ImageSerializer.collect_object_keys(images)
+        return keys
     
     def get_placeholder_presigned_url(self, obj):
         # Your existing code
@@ -75,6 +165,76 @@ class CategorySerializer(serializers.ModelSerializer):
             internal_value['tags'] = json.dumps(tags)
         return internal_value
 
+class CategorySummarySerializer(serializers.ModelSerializer):
+    """
+    Lightweight category for list views: counts, total valuation and the
+    newest few images as thumbnails instead of every nested image.
+    Use with a queryset from CategorySummarySerializer.prepare_queryset().
+    """
+    image_count = serializers.IntegerField(read_only=True)
+    total_valuation = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    cover_images = serializers.SerializerMethodField()
+    placeholder_presigned_url = serializers.SerializerMethodField()
+    tags = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'created_at', 'placeholder_image', 'placeholder_presigned_url',
+                 'is_public', 'is_wishlist', 'tags', 'image_count', 'total_valuation', 'cover_images']
+        read_only_fields = fields
+        list_serializer_class = BatchPresignListSerializer
+    
+    @classmethod
+    def prepare_queryset(cls, queryset):
+        """Annotates counts and totals and prefetches the newest CATEGORY_COVER_IMAGES images"""
+        latest_images = Image.objects.annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('category_id'),
+                order_by=[F('uploaded_at').desc(), F('id').desc()]
+            )
+        ).filter(position__lte=settings.CATEGORY_COVER_IMAGES).only(
+            'id', 'title', 'path', 'derivatives', 'category_id', 'uploaded_at'
+        ).order_by('-uploaded_at', '-id')
+        return queryset.annotate(
+            image_count=Count('images'),
+            total_valuation=Coalesce(
+                Sum('images__valuation'),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )
+        ).prefetch_related(Prefetch('images', queryset=latest_images, to_attr='latest_images'))
+    
+    @staticmethod
+    def thumbnail_key(image):
+        return pick_derivative(image, derivative_widths()[0], 'webp')
+    
+    @classmethod
+    def collect_object_keys(cls, instances):
+        keys = [_object_key(category.placeholder_image) for category in instances]
+        for category in instances:
+            keys.extend(cls.thumbnail_key(image) for image in getattr(category, 'latest_images', []))
+        return keys
+    
+    def get_cover_images(self, obj):
+        covers = []
+        stable = use_stable_media_urls(self.context)
+        for image in getattr(obj, 'latest_images', []):
+            if stable:
+                url = f"{stable_media_url(image.id, self.context)}?w={derivative_widths()[0]}&fmt=webp"
+            else:
+                url = generate_presigned_url(self.thumbnail_key(image))
+            covers.append({'id': image.id, 'title': image.title, 'thumbnail_url': url})
+        return covers
+    
+    def get_placeholder_presigned_url(self, obj):
+        if not obj.placeholder_image:
+            return None
+        return generate_presigned_url(_object_key(obj.placeholder_image))
+    
+    def get_tags(self, obj):
+        return obj.get_tags() if obj.tags else []
+
 class CategoryCreateSerializer(serializers.ModelSerializer):
     tags = serializers.ListField(child=serializers.CharField(), required=False)
     
@@ -130,14 +290,60 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 
                  'follower_count', 'following_count', 'is_following', 'categories',
                  'bio', 'display_name', 'profile_picture', 'profile_picture_url']
+        list_serializer_class = BatchPresignListSerializer
+    
+    @classmethod
+    def prepare_queryset(cls, queryset, request=None):
+        """
+        Annotates follower_count, following_count and is_following (for the
+        requesting user) as subqueries and prefetches profiles and categories
+        """
+        def follow_count(field):
+            return Coalesce(Subquery(
+                UserFollow.objects.filter(**{field: OuterRef('pk')})
+                .order_by()
+                .values(field)
+                .annotate(count=Count('id'))
+                .values('count'),
+                output_field=IntegerField()
+            ), 0)
+        
+        if request is not None and request.user.is_authenticated:
+            is_following = Exists(UserFollow.objects.filter(follower=request.user, followed=OuterRef('pk')))
+        else:
+            is_following = Value(False)
+        
+        return queryset.annotate(
+            follower_count=follow_count('followed'),
+            following_count=follow_count('follower'),
+            is_following=is_following
+        ).select_related('profile').prefetch_related('categories__images')
+    
+    @classmethod
+    def collect_object_keys(cls, instances):
+        user_ids = [user.id for user in instances]
+        keys = list(UserProfile.objects.filter(
+            user__in=user_ids
+        ).values_list('profile_picture', flat=True))
+        keys += CategorySerializer.collect_object_keys(
+            list(Category.objects.filter(user__in=user_ids))
+        )
+        return keys
     
+    # The counts come from prepare_queryset() annotations when available
     def get_follower_count(self, obj):
+        if hasattr(obj, 'follower_count'):
+            return obj.follower_count
         return obj.followers.count()
     
     def get_following_count(self, obj):
+        if hasattr(obj, 'following_count'):
+            return obj.following_count
         return obj.following.count()
     
     def get_is_following(self, obj):
+        if hasattr(obj, 'is_following'):
+            return obj.is_following
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.followers.filter(follower=request.user).exists()
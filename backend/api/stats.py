@@ -0,0 +1,302 @@
+"""
+Materialized ProfileStats counters.
+
+Each user's ProfileStats row holds total_collections (non-wishlist
+categories), total_items and total_value (non-wishlist images in them),
+and their MonthlySpending rows hold that value per upload month. The
+counters move with every Image and Category write: pre_save
+receivers read the row's previous state, post_save/post_delete receivers
+apply the difference as one `UPDATE ... SET total = total + delta`. Image
+and Category saves run in a transaction (AtomicSaveMixin) and deletes
+already do, so a counter change commits or rolls back with its row.
+
+Bulk paths wrap their work in `batched_profile_stats()` to write one
+UPDATE per user (and month) instead of one per row. `manage.py
+recompute_profile_stats` repairs drift from writes that bypass the model
+layer.
+"""
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, QuerySet, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+IMAGE_FIELDS = {'category', 'category_id', 'is_wishlist', 'valuation', 'uploaded_at'}
+CATEGORY_FIELDS = {'user', 'user_id', 'is_wishlist'}
+
+_local = threading.local()
+
+def month_of(moment):
+    """First day of the month of a datetime, in the current time zone like TruncMonth"""
+    if timezone.is_aware(moment):
+        moment = timezone.localtime(moment)
+    return moment.date().replace(day=1)
+
+def _counted_images(**filters):
+    from .models import Image
+    return Image.objects.filter(category__is_wishlist=False, is_wishlist=False, **filters)
+
+def compute_profile_stats(user_ids):
+    """
+    Aggregates the counters from scratch
+
+    Returns:
+        {user_id: (total_collections, total_items, total_value)}
+    """
+    from .models import Category
+    stats = {user_id: [0, 0, Decimal('0')] for user_id in user_ids}
+    collections = (
+        Category.objects.filter(user_id__in=user_ids, is_wishlist=False)
+        .values_list('user_id').annotate(count=Count('id')).order_by()
+    )
+    for user_id, count in collections:
+        stats[user_id][0] = count
+    items = (
+        _counted_images(category__user_id__in=user_ids)
+        .values_list('category__user_id')
+        .annotate(count=Count('id'), value=Coalesce(Sum('valuation'), Decimal('0')))
+        .order_by()
+    )
+    for user_id, count, value in items:
+        stats[user_id][1] = count
+        stats[user_id][2] = value
+    return {user_id: tuple(values) for user_id, values in stats.items()}
+
+def compute_monthly_spending(user_ids):
+    """
+    Aggregates the MonthlySpending rollup from scratch
+
+    Returns:
+        {user_id: {month: amount}}, without empty months
+    """
+    spending = {user_id: {} for user_id in user_ids}
+    rows = (
+        _counted_images(category__user_id__in=user_ids, valuation__isnull=False)
+        .annotate(month=TruncMonth('uploaded_at', output_field=DateField()))
+        .values_list('category__user_id', 'month')
+        .annotate(amount=Sum('valuation'))
+        .order_by()
+    )
+    for user_id, month, amount in rows:
+        if amount:
+            spending[user_id][month] = amount
+    return spending
+
+def recompute_profile_stats(user_ids):
+    """Overwrites the counters of the given users with fresh aggregates"""
+    from .models import ProfileStats
+    for user_id, (collections, items, value) in compute_profile_stats(user_ids).items():
+        ProfileStats.objects.update_or_create(
+            user_id=user_id,
+            defaults={'total_collections': collections, 'total_items': items, 'total_value': value}
+        )
+
+def recompute_monthly_spending(user_ids):
+    """Replaces the MonthlySpending rows of the given users with fresh aggregates"""
+    from .models import MonthlySpending
+    spending = compute_monthly_spending(user_ids)
+    with transaction.atomic():
+        MonthlySpending.objects.filter(user_id__in=user_ids).delete()
+        MonthlySpending.objects.bulk_create([
+            MonthlySpending(user_id=user_id, month=month, amount=amount)
+            for user_id, months in spending.items()
+            for month, amount in months.items()
+        ])
+
+def _write(user_id, collections, items, value):
+    from .models import ProfileStats
+    updated = ProfileStats.objects.filter(user_id=user_id).update(
+        total_collections=F('total_collections') + collections,
+        total_items=F('total_items') + items,
+        total_value=F('total_value') + value
+    )
+    if not updated:
+        # No row yet: the aggregates already include this write
+        recompute_profile_stats([user_id])
+
+def _write_month(user_id, month, amount):
+    from .models import MonthlySpending
+    rows = MonthlySpending.objects.filter(user_id=user_id, month=month)
+    if rows.update(amount=F('amount') + amount):
+        return
+    try:
+        with transaction.atomic():
+            MonthlySpending.objects.create(user_id=user_id, month=month, amount=amount)
+    except IntegrityError:
+        # Created concurrently
+        rows.update(amount=F('amount') + amount)
+
+def _add_months(totals, months, sign=1):
+    for month, amount in months.items():
+        totals[month] = totals.get(month, Decimal('0')) + sign * amount
+    return totals
+
+def adjust_profile_stats(user_id, collections=0, items=0, value=0, months=None):
+    """
+    Adds deltas to a user's counters, or to the open batch
+
+    Args:
+        months: Optional {month: amount} deltas for the MonthlySpending rollup
+    """
+    if user_id is None:
+        return
+    months = {month: amount for month, amount in (months or {}).items() if amount}
+    if not (collections or items or value or months):
+        return
+    batch = getattr(_local, 'batch', None)
+    if batch is None:
+        if collections or items or value:
+            _write(user_id, collections, items, value)
+        for month, amount in months.items():
+            _write_month(user_id, month, amount)
+        return
+    totals = batch['deltas'].setdefault(user_id, [0, 0, Decimal('0'), {}])
+    totals[0] += collections
+    totals[1] += items
+    totals[2] += value
+    _add_months(totals[3], months)
+
+@contextmanager
+def batched_profile_stats():
+    """
+    Collects the counter changes made inside the block and writes them as
+    one UPDATE per user and month when it exits without an error. Also
+    remembers category lookups, so deleting many images of one category
+    costs one.
+    """
+    if getattr(_local, 'batch', None) is not None:
+        yield
+        return
+    _local.batch = {'deltas': {}, 'categories': {}}
+    try:
+        yield
+        deltas = _local.batch['deltas']
+    finally:
+        _local.batch = None
+    for user_id, (collections, items, value, months) in deltas.items():
+        adjust_profile_stats(user_id, collections, items, value, months)
+
+def category_state(category_id, category=None):
+    """(user_id, is_wishlist) of a category, from the instance when it is at hand"""
+    from .models import Category
+    if category is not None and category.id == category_id:
+        return category.user_id, category.is_wishlist
+    batch = getattr(_local, 'batch', None)
+    if batch is not None and category_id in batch['categories']:
+        return batch['categories'][category_id]
+    state = Category.objects.filter(id=category_id).values_list('user_id', 'is_wishlist').first() or (None, True)
+    if batch is not None:
+        batch['categories'][category_id] = state
+    return state
+
+def _image_contribution(category_id, is_wishlist, valuation, uploaded_at, category=None):
+    """(user_id, items, value, {month: value}) an image adds to its owner's totals"""
+    user_id, category_is_wishlist = category_state(category_id, category)
+    if is_wishlist or category_is_wishlist:
+        return user_id, 0, Decimal('0'), {}
+    value = Decimal(str(valuation)) if valuation else Decimal('0')
+    return user_id, 1, value, {month_of(uploaded_at): value} if value and uploaded_at else {}
+
+def _category_images(category_id):
+    """(items, value, {month: value}) of a category's non-wishlist images"""
+    from .models import Image
+    images = Image.objects.filter(category_id=category_id, is_wishlist=False)
+    totals = images.aggregate(items=Count('id'), value=Coalesce(Sum('valuation'), Decimal('0')))
+    months = dict(
+        images.filter(valuation__isnull=False)
+        .annotate(month=TruncMonth('uploaded_at', output_field=DateField()))
+        .values_list('month')
+        .annotate(amount=Sum('valuation'))
+        .order_by()
+    )
+    return totals['items'], totals['value'], months
+
+def origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+def _tracks(update_fields, fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+def remember_image(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save receiver for Image"""
+    if raw or instance._state.adding or not _tracks(update_fields, IMAGE_FIELDS):
+        return
+    row = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('category_id', 'is_wishlist', 'valuation', 'uploaded_at')
+        .first()
+    )
+    instance._stats_before = _image_contribution(*row) if row else None
+
+def count_image(sender, instance, raw=False, update_fields=None, **kwargs):
+    """post_save receiver for Image"""
+    if raw or not _tracks(update_fields, IMAGE_FIELDS):
+        return
+    before = instance.__dict__.pop('_stats_before', None)
+    user_id, items, value, months = _image_contribution(
+        instance.category_id, instance.is_wishlist, instance.valuation, instance.uploaded_at,
+        instance._state.fields_cache.get('category')
+    )
+    if before is not None:
+        old_user_id, old_items, old_value, old_months = before
+        if old_user_id != user_id:
+            adjust_profile_stats(old_user_id, items=-old_items, value=-old_value, months=_add_months({}, old_months, -1))
+        else:
+            items, value = items - old_items, value - old_value
+            months = _add_months(dict(months), old_months, -1)
+    adjust_profile_stats(user_id, items=items, value=value, months=months)
+
+def uncount_image(sender, instance, origin=None, **kwargs):
+    """post_delete receiver for Image; category and user deletes account for their images themselves"""
+    from django.contrib.auth.models import User
+    from .models import Category
+    if origin_model(origin) in (Category, User):
+        return
+    user_id, items, value, months = _image_contribution(
+        instance.category_id, instance.is_wishlist, instance.valuation, instance.uploaded_at
+    )
+    adjust_profile_stats(user_id, items=-items, value=-value, months=_add_months({}, months, -1))
+
+def remember_category(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save receiver for Category"""
+    if raw or instance._state.adding or not _tracks(update_fields, CATEGORY_FIELDS):
+        return
+    instance._stats_before = sender.objects.filter(pk=instance.pk).values_list('user_id', 'is_wishlist').first()
+
+def count_category(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """post_save receiver for Category"""
+    if raw or not _tracks(update_fields, CATEGORY_FIELDS):
+        return
+    before = instance.__dict__.pop('_stats_before', None)
+    if created:
+        adjust_profile_stats(instance.user_id, collections=0 if instance.is_wishlist else 1)
+        return
+    if before is None or before == (instance.user_id, instance.is_wishlist):
+        return
+    old_user_id, old_is_wishlist = before
+    # Ownership or wishlist status moves the category's images along with it
+    items, value, months = _category_images(instance.id)
+    if not old_is_wishlist:
+        adjust_profile_stats(old_user_id, collections=-1, items=-items, value=-value, months=_add_months({}, months, -1))
+    if not instance.is_wishlist:
+        adjust_profile_stats(instance.user_id, collections=1, items=items, value=value, months=months)
+
+def uncount_category(sender, instance, origin=None, **kwargs):
+    """pre_delete receiver for Category: subtracts it and its images before they go"""
+    from django.contrib.auth.models import User
+    if origin_model(origin) is User or instance.is_wishlist:
+        return
+    items, value, months = _category_images(instance.id)
+    adjust_profile_stats(instance.user_id, collections=-1, items=-items, value=-value, months=_add_months({}, months, -1))
+
+def connect_signals():
+    from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+    from .models import Category, Image
+    pre_save.connect(remember_image, sender=Image, dispatch_uid='profile_stats_remember_image')
+    post_save.connect(count_image, sender=Image, dispatch_uid='profile_stats_count_image')
+    post_delete.connect(uncount_image, sender=Image, dispatch_uid='profile_stats_uncount_image')
+    pre_save.connect(remember_category, sender=Category, dispatch_uid='profile_stats_remember_category')
+    post_save.connect(count_category, sender=Category, dispatch_uid='profile_stats_count_category')
+    pre_delete.connect(uncount_category, sender=Category, dispatch_uid='profile_stats_uncount_category')
@@ -0,0 +1,297 @@
+"""
+Tag autocomplete (GET /api/tags/suggest/?prefix=).
+
+Every publicly visible tag is stored in a per-process prefix trie keyed by
+its normalized name. Each trie node keeps the TAG_SUGGEST_LIMIT most used
+tags below it, so a lookup is a walk of len(prefix) nodes plus a slice,
+however many tags share the prefix. Usage is the number of public,
+non-wishlist categories and images linked to the tag; links on private
+collections and wishlists are never counted, so their tags cannot leak to
+other users. suggest_tags() drops the suggestions no longer linked to
+public content in the database, since the trie can lag behind other
+processes' writes, then merges in the caller's own tags with a small
+per-user lookup.
+
+The trie is built in a background thread (see api.background_index) and
+kept current on commit: new links (`tags_linked`), removed links
+(post_delete on the link tables) and visibility changes of categories and
+images recount the affected tags. Like the search indexes it is rebuilt in
+the background once older than TAG_SUGGEST_MAX_AGE seconds, to pick up
+other processes' writes, while the old trie keeps serving.
+"""
+import threading
+import time
+from heapq import nsmallest
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from .background_index import BackgroundIndex
+
+def _rank(entry):
+    count, normalized = entry
+    return (-count, normalized)
+
+class _Node:
+    __slots__ = ('children', 'top', 'terminal')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+        self.terminal = False
+
+class TagTrie:
+    """Normalized tag name -> usage count, with each node's best completions precomputed"""
+
+    def __init__(self, size=10):
+        self.size = size
+        self.root = _Node()
+        self.counts = {}
+        self.names = {}
+        self.normalized_by_id = {}
+        self.built_at = time.time()
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _path(self, normalized, create=False):
+        nodes = [self.root]
+        for char in normalized:
+            child = nodes[-1].children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = nodes[-1].children[char] = _Node()
+            nodes.append(child)
+        return nodes
+
+    def _refresh(self, node, normalized):
+        """Recomputes a node's best completions from its own tag and its children's"""
+        candidates = [entry for child in node.children.values() for entry in child.top]
+        if node.terminal and self.counts.get(normalized, 0) > 0:
+            candidates.append((self.counts[normalized], normalized))
+        node.top = nsmallest(self.size, candidates, key=_rank)
+
+    def set(self, tag_id, normalized, name, count):
+        """Sets a tag's usage count, refreshing only the nodes on its path"""
+        with self.lock:
+            self.normalized_by_id[tag_id] = normalized
+            self.names.setdefault(normalized, name)
+            if count > 0:
+                self.counts[normalized] = count
+            else:
+                self.counts.pop(normalized, None)
+            nodes = self._path(normalized, create=True)
+            nodes[-1].terminal = True
+            for depth in range(len(nodes) - 1, -1, -1):
+                self._refresh(nodes[depth], normalized[:depth])
+
+    def suggest(self, prefix, limit=None):
+        """
+        The most used tags starting with prefix
+
+        Args:
+            prefix: Already normalized prefix; '' returns the most used tags overall
+            limit: Number of suggestions, at most the trie's size
+
+        Returns:
+            List of (name, count) tuples, most used first, alphabetical on ties
+        """
+        with self.lock:
+            nodes = self._path(prefix)
+            if nodes is None:
+                return []
+            return [(self.names[normalized], count) for count, normalized in nodes[-1].top[:limit]]
+
+    @classmethod
+    def build(cls, size=10, chunk_size=2000):
+        """Builds the trie from the public links, computing every node's completions once"""
+        from .models import Tag
+        trie = cls(size)
+        usage = public_tag_usage()
+        for tag_id, name, normalized in Tag.objects.values_list('id', 'name', 'normalized').iterator(chunk_size=chunk_size):
+            if usage.get(tag_id):
+                trie.normalized_by_id[tag_id] = normalized
+                trie.names[normalized] = name
+                trie.counts[normalized] = usage[tag_id]
+                trie._path(normalized, create=True)[-1].terminal = True
+
+        def fill(node, key):
+            for char, child in node.children.items():
+                fill(child, key + char)
+            trie._refresh(node, key)
+        fill(trie.root, '')
+        return trie
+
+def _public_links():
+    """The CategoryTag and ImageTag rows other users may see"""
+    from .models import CategoryTag, ImageTag
+    return (
+        CategoryTag.objects.filter(category__is_public=True, category__is_wishlist=False),
+        ImageTag.objects.filter(
+            image__is_wishlist=False, image__category__is_public=True, image__category__is_wishlist=False
+        ),
+    )
+
+def public_tag_usage(tag_ids=None):
+    """
+    Links per tag on public, non-wishlist categories and images
+
+    Args:
+        tag_ids: Only count these tags; None counts all of them
+
+    Returns:
+        {tag_id: count}, without unused tags
+    """
+    usage = {}
+    for links in _public_links():
+        if tag_ids is not None:
+            links = links.filter(tag_id__in=tag_ids)
+        for tag_id, count in links.values_list('tag_id').annotate(count=Count('id')).order_by():
+            usage[tag_id] = usage.get(tag_id, 0) + count
+    return usage
+
+def public_tag_names(normalized_names):
+    """The normalized names among normalized_names still linked to public content"""
+    public = set()
+    if not normalized_names:
+        return public
+    for links in _public_links():
+        public.update(
+            links.filter(tag__normalized__in=normalized_names)
+            .values_list('tag__normalized', flat=True).distinct()
+        )
+    return public
+
+def own_tag_usage(user_id, prefix, limit):
+    """
+    The user's own most used tags starting with prefix, private ones included
+
+    Returns:
+        {normalized: (name, count)}
+    """
+    from .models import CategoryTag, ImageTag
+    usage = {}
+    for links in (
+        CategoryTag.objects.filter(category__user_id=user_id),
+        ImageTag.objects.filter(image__category__user_id=user_id),
+    ):
+        rows = (
+            links.filter(tag__normalized__istartswith=prefix)
+            .values_list('tag__normalized', 'tag__name')
+            .annotate(count=Count('id'))
+            .order_by('-count')[:limit]
+        )
+        for normalized, name, count in rows:
+            usage[normalized] = (name, usage.get(normalized, (name, 0))[1] + count)
+    return usage
+
+_holder = BackgroundIndex(
+    'tag trie', lambda: TagTrie.build(settings.TAG_SUGGEST_LIMIT), lambda: settings.TAG_SUGGEST_MAX_AGE
+)
+
+def get_tag_trie():
+    """Returns this process's trie, building it on first use"""
+    return _holder.get()
+
+def start_background_build():
+    _holder.start_build()
+
+def reset_tag_trie():
+    _holder.reset()
+
+def suggest_tags(prefix, limit=None, user_id=None):
+    """
+    The most used public tags starting with prefix, plus the user's own
+
+    Returns:
+        List of (name, count) tuples, most used first, alphabetical on ties
+    """
+    from .models import normalize_tag
+    prefix = normalize_tag(prefix)
+    limit = limit or settings.TAG_SUGGEST_LIMIT
+    suggestions = get_tag_trie().suggest(prefix, limit)
+    # Another process may have made a collection private since this trie counted it
+    public = public_tag_names([normalize_tag(name) for name, _ in suggestions])
+    suggestions = [(name, count) for name, count in suggestions if normalize_tag(name) in public]
+    if user_id is None:
+        return suggestions
+    merged = {normalize_tag(name): (name, count) for name, count in suggestions}
+    for normalized, entry in own_tag_usage(user_id, prefix, limit).items():
+        merged.setdefault(normalized, entry)
+    ranked = sorted(merged.items(), key=lambda item: (-item[1][1], item[0]))
+    return [entry for _, entry in ranked[:limit]]
+
+# Tags, categories and images whose public usage changed in this thread,
+# recounted when the transaction commits
+_local = threading.local()
+
+def _mark(tag_ids=(), category_ids=(), image_ids=()):
+    if not hasattr(_local, 'tags'):
+        _local.tags, _local.categories, _local.images = set(), set(), set()
+    _local.tags.update(tag_ids)
+    _local.categories.update(category_ids)
+    _local.images.update(image_ids)
+    # The first callback to run recounts everything marked so far; the rest find nothing to do
+    transaction.on_commit(_recount_marked)
+
+def _recount_marked():
+    from .models import CategoryTag, ImageTag, Tag
+    tag_ids, category_ids, image_ids = _local.tags, _local.categories, _local.images
+    _local.tags, _local.categories, _local.images = set(), set(), set()
+    if _holder.current is None and not _holder.building:
+        # The next build reads the committed rows
+        return
+    if category_ids:
+        tag_ids |= set(CategoryTag.objects.filter(category_id__in=category_ids).values_list('tag_id', flat=True))
+        tag_ids |= set(ImageTag.objects.filter(image__category_id__in=category_ids).values_list('tag_id', flat=True))
+    if image_ids:
+        tag_ids |= set(ImageTag.objects.filter(image_id__in=image_ids).values_list('tag_id', flat=True))
+    if not tag_ids:
+        return
+    usage = public_tag_usage(tag_ids)
+    tags = list(Tag.objects.filter(id__in=tag_ids).values_list('id', 'normalized', 'name'))
+
+    def recount(trie):
+        for tag_id, normalized, name in tags:
+            trie.set(tag_id, normalized, name, usage.get(tag_id, 0))
+    _holder.apply(recount)
+
+def count_new_links(sender, tags, **kwargs):
+    """tags_linked receiver"""
+    _mark(tag_ids=[tag.id for tag in tags])
+
+def count_removed_link(sender, instance, **kwargs):
+    """post_delete receiver for CategoryTag and ImageTag"""
+    _mark(tag_ids=[instance.tag_id])
+
+def _visibility_changed(sender, instance, fields, update_fields):
+    """Whether a save changes any of the given columns, read from the row before it"""
+    if instance._state.adding:
+        return False
+    if update_fields is not None and not {
+        field.removesuffix('_id') for field in fields
+    } & {field.removesuffix('_id') for field in update_fields}:
+        return False
+    before = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    return before is not None and before != tuple(getattr(instance, field) for field in fields)
+
+def category_visibility(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save receiver for Category: going public or private moves all its tags"""
+    if not raw and _visibility_changed(sender, instance, ('is_public', 'is_wishlist'), update_fields):
+        _mark(category_ids=[instance.pk])
+
+def image_visibility(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save receiver for Image: wishlisting a tagged image or moving it to another collection"""
+    if not raw and instance.get_tags() and \
+            _visibility_changed(sender, instance, ('category_id', 'is_wishlist'), update_fields):
+        _mark(image_ids=[instance.pk])
+
+def connect_signals():
+    from django.db.models.signals import pre_save, post_delete
+    from .models import Category, CategoryTag, Image, ImageTag, tags_linked
+    tags_linked.connect(count_new_links, dispatch_uid='tag_suggest_linked')
+    for model in (CategoryTag, ImageTag):
+        post_delete.connect(count_removed_link, sender=model, dispatch_uid=f'tag_suggest_unlinked_{model.__name__}')
+    pre_save.connect(category_visibility, sender=Category, dispatch_uid='tag_suggest_category_visibility')
+    pre_save.connect(image_visibility, sender=Image, dispatch_uid='tag_suggest_image_visibility')
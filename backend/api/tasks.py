@@ -0,0 +1,465 @@
+"""
+Background workers for work that should not hold a request thread.
+
+Jobs run on a per-process thread pool (UPLOAD_WORKER_THREADS threads).
+Their state lives in the database so any process can report on them.
+"""
+import os
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Min
+from django.utils.timezone import now
+from .models import Image, UploadJob, S3Deletion, S3UploadPin
+from .thumbnails import derivatives_mode, render_derivatives, store_derivatives, create_derivatives
+from .utils import (
+    upload_file_to_s3,
+    get_s3_client,
+    list_s3_objects,
+    referenced_s3_keys,
+    pinned_s3_keys,
+    presigned_url_cache
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'UPLOAD_WORKER_THREADS', 4),
+                    thread_name_prefix='upload-worker'
+                )
+    return _executor
+
+def spool_upload(uploaded_file, job_id):
+    """
+    Writes an uploaded file to UPLOAD_SPOOL_DIR and returns its path
+    """
+    spool_dir = settings.UPLOAD_SPOOL_DIR
+    os.makedirs(spool_dir, exist_ok=True)
+    ext = os.path.splitext(uploaded_file.name)[1]
+    spool_path = os.path.join(spool_dir, f"{job_id}{ext}")
+    with open(spool_path, 'wb') as spool_file:
+        for chunk in uploaded_file.chunks():
+            spool_file.write(chunk)
+    return spool_path
+
+def enqueue_upload_job(job):
+    get_executor().submit(run_upload_job, job.id)
+
+def run_upload_job(job_id):
+    """Worker entry point: runs the job with its own database connection"""
+    close_old_connections()
+    try:
+        process_upload_job(job_id)
+    except Exception:
+        print(traceback.format_exc())
+    finally:
+        close_old_connections()
+
+def process_upload_job(job_id):
+    """
+    Uploads a spooled file to S3, renders its derivatives, creates the
+    Image row and announces the result to the collection's WebSocket group
+    """
+    # A job re-queued by recover_upload_jobs() runs once even if it was queued twice
+    if not UploadJob.objects.filter(id=job_id, status='pending').update(status='running', updated_at=now()):
+        print(f"Upload job {job_id} is no longer pending, skipping")
+        return None
+    job = UploadJob.objects.select_related('category').get(id=job_id)
+
+    try:
+        with open(job.spool_path, 'rb') as spool_file:
+            upload = File(spool_file, name=job.filename)
+            upload.content_type = job.content_type
+
+            rendered_derivatives = []
+            if derivatives_mode() == 'upload':
+                rendered_derivatives = render_derivatives(upload)
+
+            s3_path = upload_file_to_s3(
+                upload,
+                job.category.name,
+                job.user_id,
+                job.is_wishlist
+            )
+        if not s3_path:
+            raise RuntimeError('Failed to upload image to S3')
+
+        fields = job.get_fields()
+        image = Image(
+            title=fields.get('title', job.filename),
+            path=s3_path,
+            category=job.category,
+            is_wishlist=job.is_wishlist
+        )
+        image.apply_upload_fields(fields)
+        image.save()
+        if rendered_derivatives:
+            store_derivatives(image, rendered_derivatives)
+
+        job.status = 'succeeded'
+        job.image = image
+        message = {'action': 'image_uploaded', 'job_id': str(job.id), 'image_id': image.id}
+    except Exception as e:
+        print(f"Upload job {job.id} failed: {str(e)}")
+        job.status = 'failed'
+        job.error = str(e)
+        message = {'action': 'image_upload_failed', 'job_id': str(job.id), 'error': str(e)}
+    finally:
+        try:
+            os.remove(job.spool_path)
+        except OSError:
+            pass
+
+    job.save()
+
+    try:
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            f'collection_{job.category_id}',
+            {
+                'type': 'collection_update',
+                'message': message
+            }
+        )
+    except Exception as e:
+        print(f"WebSocket error: {str(e)}")
+
+    return job
+
+def enqueue_derivatives(image_id):
+    """
+    Queues the lazy rendering of an image's derivatives
+    
+    A cache entry claims the image for IMAGE_DERIVATIVES_RETRY_AFTER
+    seconds, so concurrent requests for a new image queue it once, and an
+    original that failed to download is retried at most that often.
+    """
+    if cache.add(f'derivatives-queued:{image_id}', True, settings.IMAGE_DERIVATIVES_RETRY_AFTER):
+        get_executor().submit(run_derivatives_job, image_id)
+
+def run_derivatives_job(image_id):
+    """Worker entry point: renders derivatives for an image that has none yet"""
+    close_old_connections()
+    try:
+        image = Image.objects.filter(id=image_id, derivatives__isnull=True).first()
+        if image is not None:
+            create_derivatives(image)
+    except Exception:
+        print(traceback.format_exc())
+    finally:
+        close_old_connections()
+
+def recover_upload_jobs(stale_after=None, inline=False):
+    """
+    Re-queues or fails the upload jobs a restart left behind, and deletes
+    spool files no unfinished job points at
+    
+    Jobs run on a per-process pool, so a restart drops the ones that were
+    queued or running. Pending or running jobs not updated for stale_after
+    seconds go back to pending and are queued again when their spool file
+    is still there, and are marked failed otherwise. Each job is claimed
+    with a conditional update, so processes starting together never queue
+    it twice.
+    
+    Args:
+        stale_after: Seconds, defaults to UPLOAD_JOB_STALE_AFTER
+        inline: Run the re-queued jobs in the calling thread before
+            returning instead of on the worker pool
+    
+    Returns:
+        (requeued, failed, removed spool files) counts
+    """
+    if stale_after is None:
+        stale_after = settings.UPLOAD_JOB_STALE_AFTER
+    cutoff = now() - timedelta(seconds=stale_after)
+    
+    requeued, failed = [], 0
+    for job in UploadJob.objects.filter(status__in=('pending', 'running'), updated_at__lt=cutoff):
+        claim = UploadJob.objects.filter(id=job.id, status=job.status, updated_at=job.updated_at)
+        if os.path.exists(job.spool_path):
+            if claim.update(status='pending', updated_at=now()):
+                requeued.append(job.id)
+        elif claim.update(status='failed', error='The upload was interrupted by a restart', updated_at=now()):
+            failed += 1
+    for job_id in requeued:
+        if not inline:
+            get_executor().submit(run_upload_job, job_id)
+            continue
+        try:
+            process_upload_job(job_id)
+        except Exception:
+            print(traceback.format_exc())
+    
+    removed = 0
+    spool_dir = settings.UPLOAD_SPOOL_DIR
+    live = set(UploadJob.objects.filter(status__in=('pending', 'running')).values_list('spool_path', flat=True))
+    try:
+        names = os.listdir(spool_dir)
+    except OSError:
+        names = []
+    for name in names:
+        path = os.path.join(spool_dir, name)
+        # Young files may belong to a job whose row is not committed yet
+        if path in live or not os.path.isfile(path) or os.path.getmtime(path) > cutoff.timestamp():
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    
+    if requeued or failed or removed:
+        print(f"Upload recovery: {len(requeued)} jobs re-queued, {failed} failed, {removed} spool files removed")
+    return len(requeued), failed, removed
+
+def run_upload_job_recovery():
+    """Worker entry point for recover_upload_jobs(), submitted at startup"""
+    close_old_connections()
+    try:
+        recover_upload_jobs()
+    except Exception:
+        print(traceback.format_exc())
+    finally:
+        close_old_connections()
+
+def start_upload_job_recovery():
+    get_executor().submit(run_upload_job_recovery)
+
+def scheduled_upload_job_recovery(event=None, context=None):
+    """
+    Recovers lost upload jobs and runs the re-queued ones before returning
+    
+    Startup recovery only covers processes that restart; a worker recycled
+    after its response, or a frozen Lambda, drops its queued jobs without
+    one. Run this on a schedule: `manage.py recover_upload_jobs` from cron,
+    or this function from a zappa `events` entry (hence the unused event
+    and context arguments). Jobs whose spool file lived on another machine
+    are marked failed.
+    """
+    return recover_upload_jobs(inline=True)
+
+# delete_objects accepts at most 1000 keys per call
+S3_DELETE_BATCH_SIZE = 1000
+
+_drain_lock = threading.Lock()
+_drain_again = False
+_retry_timer = None
+_deletion_metrics = {
+    'batches': 0,
+    'deleted': 0,
+    'kept': 0,
+    'deferred': 0,
+    'failed': 0,
+    'last_drain_ms': 0,
+}
+_metrics_lock = threading.Lock()
+
+def queue_s3_deletions(object_keys=(), prefixes=()):
+    """
+    Records S3 objects to delete once the current transaction commits
+    
+    Call inside the same transaction.atomic() block as the row delete, so
+    the outbox entries exist exactly when the rows are gone.
+    
+    Args:
+        object_keys: Keys of single objects
+        prefixes: Folder prefixes whose current contents should be deleted
+    """
+    entries = [S3Deletion(object_key=key) for key in dict.fromkeys(object_keys) if key]
+    entries.extend(S3Deletion(object_key=prefix, is_prefix=True) for prefix in prefixes if prefix)
+    if not entries:
+        return
+    S3Deletion.objects.bulk_create(entries)
+    transaction.on_commit(schedule_s3_deletion_drain)
+
+def schedule_s3_deletion_drain():
+    get_executor().submit(run_s3_deletion_drain)
+
+def run_s3_deletion_drain():
+    """Worker entry point: drains due outbox entries until none are left"""
+    global _drain_again
+    if not _drain_lock.acquire(blocking=False):
+        # The running drain picks these entries up on its next pass
+        _drain_again = True
+        return
+    close_old_connections()
+    try:
+        while True:
+            _drain_again = False
+            if not drain_s3_deletions() and not _drain_again:
+                break
+        _schedule_deletion_retry()
+    except Exception:
+        print(traceback.format_exc())
+    finally:
+        close_old_connections()
+        _drain_lock.release()
+    if _drain_again:
+        schedule_s3_deletion_drain()
+
+def scheduled_s3_deletion_drain(event=None, context=None):
+    """
+    Drains every due outbox entry in the calling thread
+    
+    The retry timer and the drain queued after a delete only live as long
+    as this process, so a restarted worker or a frozen Lambda leaves
+    overdue entries behind. Run this on a schedule: `manage.py
+    drain_s3_deletions` from cron, or this function from a zappa `events`
+    entry (hence the unused event and context arguments).
+    
+    Returns:
+        Number of outbox entries handled
+    """
+    handled = 0
+    while True:
+        count = drain_s3_deletions()
+        if not count:
+            return handled
+        handled += count
+
+def _schedule_deletion_retry():
+    """Wakes the drainer when the earliest backed-off entry is due"""
+    global _retry_timer
+    next_attempt_at = S3Deletion.objects.filter(
+        attempts__lt=settings.S3_DELETE_MAX_ATTEMPTS
+    ).aggregate(next_attempt_at=Min('next_attempt_at'))['next_attempt_at']
+    if next_attempt_at is None:
+        return
+    if _retry_timer is not None:
+        _retry_timer.cancel()
+    delay = max(0, (next_attempt_at - now()).total_seconds())
+    _retry_timer = threading.Timer(delay, schedule_s3_deletion_drain)
+    _retry_timer.daemon = True
+    _retry_timer.start()
+
+def drain_s3_deletions(limit=S3_DELETE_BATCH_SIZE):
+    """
+    Deletes one batch of due outbox entries with a single delete_objects call
+    
+    Prefix entries are expanded into one entry per object first. Objects
+    that are still referenced (shared content-addressed uploads) are kept,
+    objects pinned by an upload in progress are deferred until the pin
+    expires, and failed keys are retried with exponential backoff.
+    
+    The batch stays locked until the objects are gone, so an upload that
+    pins one of them waits for the delete and then stores it again (see
+    api.utils.pin_s3_object).
+    
+    Returns:
+        Number of outbox entries handled
+    """
+    started = time.monotonic()
+    with transaction.atomic():
+        due = list(S3Deletion.objects.select_for_update(skip_locked=True).filter(
+            next_attempt_at__lte=now(),
+            attempts__lt=settings.S3_DELETE_MAX_ATTEMPTS
+        ).order_by('next_attempt_at', 'id')[:limit])
+        if not due:
+            return 0
+        
+        entries_by_key = {}
+        for entry in due:
+            if entry.is_prefix:
+                _expand_prefix_entry(entry)
+            else:
+                entries_by_key.setdefault(entry.object_key, []).append(entry)
+        
+        deleted, failed = [], {}
+        referenced = referenced_s3_keys(list(entries_by_key))
+        pinned = pinned_s3_keys([key for key in entries_by_key if key not in referenced])
+        kept = [key for key in entries_by_key if key in referenced]
+        keys = [key for key in entries_by_key if key not in referenced and key not in pinned]
+        
+        if keys:
+            try:
+                response = get_s3_client().delete_objects(
+                    Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                    Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+                )
+                failed = {
+                    error['Key']: f"{error.get('Code')}: {error.get('Message')}"
+                    for error in response.get('Errors', [])
+                }
+            except Exception as e:
+                failed = {key: str(e) for key in keys}
+            deleted = [key for key in keys if key not in failed]
+        
+        done_ids = [entry.id for key in deleted + kept for entry in entries_by_key[key]]
+        S3Deletion.objects.filter(id__in=done_ids).delete()
+        for key, expires_at in pinned.items():
+            S3Deletion.objects.filter(
+                id__in=[entry.id for entry in entries_by_key[key]]
+            ).update(next_attempt_at=expires_at)
+        for key, error in failed.items():
+            for entry in entries_by_key[key]:
+                _retry_deletion(entry, error)
+        S3UploadPin.objects.filter(
+            created_at__lte=now() - timedelta(seconds=settings.S3_UPLOAD_PIN_TTL)
+        ).delete()
+    for key in deleted:
+        presigned_url_cache.invalidate(key)
+    
+    elapsed_ms = (time.monotonic() - started) * 1000
+    with _metrics_lock:
+        _deletion_metrics['batches'] += 1
+        _deletion_metrics['deleted'] += len(deleted)
+        _deletion_metrics['kept'] += len(kept)
+        _deletion_metrics['deferred'] += len(pinned)
+        _deletion_metrics['failed'] += len(failed)
+        _deletion_metrics['last_drain_ms'] = round(elapsed_ms)
+    print(
+        f"S3 deletion batch: {len(deleted)} deleted, {len(kept)} kept, {len(pinned)} deferred, "
+        f"{len(failed)} failed in {elapsed_ms:.0f} ms"
+    )
+    return len(due)
+
+def _expand_prefix_entry(entry):
+    """
+    Replaces a prefix entry with one entry per object under it. Objects
+    written after the entry was queued (e.g. to a re-created collection
+    with the same name) are left alone.
+    """
+    try:
+        objects = list_s3_objects(entry.object_key)
+    except Exception as e:
+        _retry_deletion(entry, str(e))
+        return
+    with transaction.atomic():
+        S3Deletion.objects.bulk_create([
+            S3Deletion(object_key=obj['Key'], created_at=entry.created_at)
+            for obj in objects
+            if obj.get('LastModified') is None or obj['LastModified'] <= entry.created_at
+        ])
+        entry.delete()
+
+def _retry_deletion(entry, error):
+    entry.attempts += 1
+    entry.last_error = error
+    backoff = settings.S3_DELETE_RETRY_BACKOFF * 2 ** (entry.attempts - 1)
+    entry.next_attempt_at = now() + timedelta(seconds=min(backoff, 6 * 3600))
+    entry.save(update_fields=['attempts', 'last_error', 'next_attempt_at'])
+    if entry.attempts >= settings.S3_DELETE_MAX_ATTEMPTS:
+        print(f"Giving up on deleting {entry.object_key} after {entry.attempts} attempts: {error}")
+
+def s3_deletion_metrics():
+    """Counters for this process plus the outbox backlog"""
+    with _metrics_lock:
+        metrics = dict(_deletion_metrics)
+    max_attempts = settings.S3_DELETE_MAX_ATTEMPTS
+    metrics['pending'] = S3Deletion.objects.filter(attempts__lt=max_attempts).count()
+    metrics['abandoned'] = S3Deletion.objects.filter(attempts__gte=max_attempts).count()
+    return metrics
@@ -1,7 +1,7 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
-from .models import Category, Image, UserFollow, UserProfile, Goal, FinancialInfo
+from .models import Category, Image, UserFollow, UserProfile, Goal, FinancialInfo, Tag, CategoryTag
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 import json
@@ -10,16 +10,20 @@ from unittest.mock import patch, MagicMock
 
 import os
 import boto3
+from botocore.config import Config
 import uuid
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 from django.test import TestCase
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth.models import User
 from django.conf import settings
 from api.utils import (
+    s3_client_manager,
+    presigned_url_cache,
     get_s3_client, 
     upload_file_to_s3, 
     generate_presigned_url, 
+    generate_presigned_urls,
     list_files_in_category,
     delete_s3_file,
     delete_s3_folder
@@ -69,6 +73,7 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
 from api.auth import GoogleLoginView, UserInfoView, LogoutView, DeleteUserView
+from api.pagination import encode_cursor
 
 import json
 from unittest.mock import patch, MagicMock
@@ -145,6 +150,45 @@ class ModelTests(TestCase):
         self.assertEqual(self.user.following.count(), 1)
         self.assertEqual(other_user.followers.count(), 1)
 
+    def test_tag_links_follow_json_tags(self):
+        """Test that saving tags keeps the normalized Tag links in step"""
+        self.assertEqual(
+            sorted(self.category.tag_links.values_list('normalized', flat=True)),
+            ['tag1', 'tag2', 'tag3']
+        )
+        
+        image = Image.objects.create(title='Card', path='p/card.jpg', category=self.category)
+        image.set_tags(['Rare', ' rare ', 'Holo'])
+        image.save()
+        self.assertEqual(sorted(image.tag_links.values_list('normalized', flat=True)), ['holo', 'rare'])
+        self.assertEqual(image.get_tags(), ['Rare', ' rare ', 'Holo'])
+        
+        image = Image.objects.get(id=image.id)
+        image.set_tags(['holo', 'tag1'])
+        image.save()
+        self.assertEqual(sorted(image.tag_links.values_list('normalized', flat=True)), ['holo', 'tag1'])
+        # Tags are shared between categories and images
+        self.assertEqual(Tag.objects.filter(normalized='tag1').count(), 1)
+        self.assertEqual(
+            list(Image.objects.filter(tag_links__normalized='tag1').values_list('id', flat=True)),
+            [image.id]
+        )
+    
+    def test_backfill_tags_migration(self):
+        """Test that the data migration links rows written before the Tag table"""
+        import importlib
+        from django.apps import apps
+        migration = importlib.import_module('api.migrations.0018_backfill_tags')
+        image = Image.objects.create(title='Card', path='p/card.jpg', category=self.category)
+        Image.objects.filter(id=image.id).update(tags=json.dumps(['Vintage', 'tag1']))
+        CategoryTag.objects.all().delete()
+        
+        with patch.object(migration, 'CHUNK_SIZE', 1):
+            migration.backfill_tags(apps, None)
+        
+        self.assertEqual(sorted(image.tag_links.values_list('normalized', flat=True)), ['tag1', 'vintage'])
+        self.assertEqual(self.category.tag_links.count(), 3)
+
 
 class CategoryViewTests(TestCase):
     """Tests for Category API views"""
@@ -324,6 +368,36 @@ class ImageViewTests(TestCase):
         # Check if images were deleted from database
         self.assertEqual(Image.objects.count(), initial_count - 2)
 
+    @patch('api.views.get_channel_layer')
+    def test_bulk_delete_refuses_other_users_images(self, mock_get_channel_layer):
+        """Test that bulk delete only removes the requester's images"""
+        mock_channel_layer = MagicMock()
+        mock_get_channel_layer.return_value = mock_channel_layer
+        other_user = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        other_category = Category.objects.create(name='Other', user=other_user)
+        other_image = Image.objects.create(title='Theirs', path='other/image.jpg', category=other_category)
+        image2 = Image.objects.create(title='Second', path='test_path/image2.jpg', category=self.category)
+        
+        response = self.client.post(
+            '/api/images/bulk_delete/',
+            data=json.dumps({'image_ids': [self.image.id, image2.id, other_image.id, 'abc']}),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(sorted(data['deleted_ids']), sorted([self.image.id, image2.id]))
+        self.assertEqual(data['refused'], [
+            {'id': 'abc', 'error': 'invalid id'},
+            {'id': other_image.id, 'error': 'not found'}
+        ])
+        self.assertTrue(Image.objects.filter(id=other_image.id).exists())
+        # One coalesced update for the category
+        mock_channel_layer.group_send.assert_called_once()
+        group, event = mock_channel_layer.group_send.call_args[0]
+        self.assertEqual(group, f'collection_{self.category.id}')
+        self.assertEqual(sorted(event['message']['image_ids']), sorted([self.image.id, image2.id]))
+
 
 class AuthenticationTests(TestCase):
     """Tests for authentication"""
@@ -578,6 +652,7 @@ class FinancialTests(TestCase):
 
 class UtilsTests(TestCase):
     def setUp(self):
+        presigned_url_cache.clear()
         self.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
@@ -595,6 +670,7 @@ class UtilsTests(TestCase):
         """Test the S3 client creation function"""
         mock_client = MagicMock()
         mock_boto_client.return_value = mock_client
+        s3_client_manager.reset()
         
         client = get_s3_client()
         
@@ -603,10 +679,35 @@ class UtilsTests(TestCase):
             's3',
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME
+            region_name=settings.AWS_S3_REGION_NAME,
+            config=ANY
         )
         # Assert the function returns the mocked client
         self.assertEqual(client, mock_client)
+        s3_client_manager.reset()
+
+    @patch('boto3.client')
+    def test_get_s3_client_is_shared(self, mock_boto_client):
+        """Test that the S3 client is built once and reused"""
+        mock_boto_client.return_value = MagicMock()
+        s3_client_manager.reset()
+        
+        first = get_s3_client()
+        second = get_s3_client()
+        
+        self.assertIs(first, second)
+        self.assertEqual(mock_boto_client.call_count, 1)
+        
+        # The pool settings are passed through to botocore
+        config = mock_boto_client.call_args[1]['config']
+        self.assertEqual(config.max_pool_connections, settings.AWS_S3_MAX_POOL_CONNECTIONS)
+        self.assertEqual(config.retries['mode'], settings.AWS_S3_RETRY_MODE)
+        
+        # Changing the settings rebuilds the client
+        with self.settings(AWS_S3_MAX_POOL_CONNECTIONS=5):
+            get_s3_client()
+        self.assertEqual(mock_boto_client.call_count, 2)
+        s3_client_manager.reset()
 
     @patch('api.utils.get_s3_client')
     @patch('uuid.uuid4')
@@ -638,6 +739,26 @@ class UtilsTests(TestCase):
         self.assertEqual(mock_client.upload_fileobj.call_args[0][1], settings.AWS_STORAGE_BUCKET_NAME)
         # Third argument should be the S3 path
         self.assertEqual(mock_client.upload_fileobj.call_args[0][2], expected_path)
+    
+    @patch('api.utils.get_s3_client')
+    def test_upload_file_to_s3_transfer_config(self, mock_get_s3_client):
+        """Test that uploads use the configured multipart transfer profile"""
+        mock_client = MagicMock()
+        mock_get_s3_client.return_value = mock_client
+        
+        with self.settings(
+            AWS_S3_MULTIPART_THRESHOLD=16 * 1024 * 1024,
+            AWS_S3_MULTIPART_CHUNKSIZE=4 * 1024 * 1024,
+            AWS_S3_MAX_CONCURRENCY=6,
+            AWS_S3_MAX_BANDWIDTH=1024 * 1024
+        ):
+            upload_file_to_s3(self.test_file, 'test_category', self.user.id)
+        
+        config = mock_client.upload_fileobj.call_args[1]['Config']
+        self.assertEqual(config.multipart_threshold, 16 * 1024 * 1024)
+        self.assertEqual(config.multipart_chunksize, 4 * 1024 * 1024)
+        self.assertEqual(config.max_concurrency, 6)
+        self.assertEqual(config.max_bandwidth, 1024 * 1024)
 
     @patch('api.utils.get_s3_client')
     def test_generate_presigned_url(self, mock_get_s3_client):
@@ -665,6 +786,132 @@ class UtilsTests(TestCase):
             ExpiresIn=3600  # Default expiration time
         )
     
+    @patch('api.utils.get_s3_client')
+    def test_generate_presigned_url_cached(self, mock_get_s3_client):
+        """Test that presigned URLs are reused until the object is deleted"""
+        mock_client = MagicMock()
+        mock_get_s3_client.return_value = mock_client
+        mock_client.generate_presigned_url.return_value = "https://test-presigned-url.com"
+        
+        self.assertEqual(generate_presigned_url("cached_key"), "https://test-presigned-url.com")
+        self.assertEqual(generate_presigned_url("cached_key"), "https://test-presigned-url.com")
+        
+        # The second call is served from the cache
+        self.assertEqual(mock_client.generate_presigned_url.call_count, 1)
+        stats = presigned_url_cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        
+        # Deleting the object drops the cached URL
+        delete_s3_file("cached_key")
+        generate_presigned_url("cached_key")
+        self.assertEqual(mock_client.generate_presigned_url.call_count, 2)
+    
+    @patch('api.utils.get_s3_client')
+    def test_presigned_url_cache_expiry_and_eviction(self, mock_get_s3_client):
+        """Test that nearly expired URLs are re-signed and old entries are evicted"""
+        mock_client = MagicMock()
+        mock_get_s3_client.return_value = mock_client
+        mock_client.generate_presigned_url.return_value = "https://test-presigned-url.com"
+        
+        with self.settings(PRESIGNED_URL_CACHE_MIN_REMAINING=600):
+            # Signed for less than the minimum remaining validity, so never reused
+            generate_presigned_url("short_key", expiration=300)
+            generate_presigned_url("short_key", expiration=300)
+            self.assertEqual(mock_client.generate_presigned_url.call_count, 2)
+        
+        with self.settings(PRESIGNED_URL_CACHE_MAX_ENTRIES=2):
+            for key in ("key_1", "key_2", "key_3"):
+                generate_presigned_url(key)
+            self.assertEqual(presigned_url_cache.stats()['size'], 2)
+            self.assertGreaterEqual(presigned_url_cache.stats()['evictions'], 1)
+    
+    def test_generate_presigned_urls_matches_botocore(self):
+        """Test that the batch signer produces the same URLs as botocore"""
+        keys = ['user_1/My Collection/photo one+ü.jpg', 'user_1/other/b~c(1).png']
+        with self.settings(
+            AWS_ACCESS_KEY_ID='AKIDEXAMPLE',
+            AWS_SECRET_ACCESS_KEY='example/secret+key',
+            AWS_S3_REGION_NAME='us-east-2',
+            AWS_STORAGE_BUCKET_NAME='collections-test-bucket'
+        ):
+            # botocore's own pipeline, configured for SigV4 virtual-hosted URLs
+            client = boto3.client(
+                's3',
+                aws_access_key_id='AKIDEXAMPLE',
+                aws_secret_access_key='example/secret+key',
+                region_name='us-east-2',
+                config=Config(signature_version='s3v4', s3={'addressing_style': 'virtual'})
+            )
+            # Retry if the two signing passes straddle a second boundary
+            for _ in range(3):
+                presigned_url_cache.clear()
+                urls = generate_presigned_urls(keys)
+                expected = {
+                    key: client.generate_presigned_url(
+                        'get_object',
+                        Params={'Bucket': 'collections-test-bucket', 'Key': key},
+                        ExpiresIn=3600
+                    )
+                    for key in keys
+                }
+                if urls == expected:
+                    break
+            self.assertEqual(urls, expected)
+            
+            # Signed URLs are cached for the single-key path
+            self.assertEqual(generate_presigned_url(keys[0]), urls[keys[0]])
+        s3_client_manager.reset()
+    
+    @patch('api.utils.get_s3_client')
+    def test_content_addressed_upload(self, mock_get_s3_client):
+        """Test that identical files are stored once under a content hash key"""
+        import hashlib
+        mock_client = MagicMock()
+        mock_get_s3_client.return_value = mock_client
+        # The first HEAD misses, the second finds the stored object
+        mock_client.head_object.side_effect = [Exception('Not Found'), {}]
+        expected_path = f"user_{self.user.id}/cas/{hashlib.sha256(b'file_content').hexdigest()}"
+        
+        with self.settings(S3_CONTENT_ADDRESSED_UPLOADS=True):
+            first = upload_file_to_s3(self.test_file, 'Collection', self.user.id)
+            second = upload_file_to_s3(self.test_file, 'Wishlist', self.user.id, is_wishlist=True)
+        
+        self.assertEqual(first, expected_path)
+        self.assertEqual(second, expected_path)
+        mock_client.upload_fileobj.assert_called_once()
+    
+    @patch('api.utils.get_s3_client')
+    def test_content_addressed_delete_waits_for_last_reference(self, mock_get_s3_client):
+        """Test that shared objects are deleted only when nothing refers to them"""
+        from api.utils import count_s3_references
+        mock_client = MagicMock()
+        mock_get_s3_client.return_value = mock_client
+        shared_key = f"user_{self.user.id}/cas/{'a' * 64}"
+        category = Category.objects.create(name='Collection', user=self.user)
+        wishlist = Category.objects.create(name='Wishlist', user=self.user, placeholder_image=shared_key)
+        image = Image.objects.create(title='Item', path=shared_key, category=category)
+        
+        self.assertEqual(count_s3_references(shared_key), 2)
+        self.assertEqual(count_s3_references(f"user_{self.user.id}/cas/derivatives/{'a' * 64}_w320.webp"), 2)
+        
+        image.delete()
+        self.assertTrue(delete_s3_file(shared_key))
+        mock_client.delete_object.assert_not_called()
+        
+        # Folder deletes skip it too
+        mock_client.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [{'Key': shared_key}, {'Key': f'user_{self.user.id}/Collection/old.jpg'}]}
+        ]
+        self.assertEqual(delete_s3_folder(f'user_{self.user.id}/', include_prefix=True), 1)
+        
+        wishlist.delete()
+        self.assertTrue(delete_s3_file(shared_key))
+        mock_client.delete_object.assert_called_once_with(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=shared_key
+        )
+    
     @patch('api.utils.get_s3_client')
     def test_list_files_in_category(self, mock_get_s3_client):
         """Test listing files in a category folder in S3"""
@@ -977,6 +1224,1750 @@ class WishlistTests(TestCase):
         mock_client.copy_object.assert_called_once()
         mock_client.delete_object.assert_called_once()
 
+class MediaRedirectTests(TestCase):
+    """Test the stable media redirect endpoint"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(
+            username='owner',
+            email='owner@example.com',
+            password='ownerpassword'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='otherpassword'
+        )
+        self.public_category = Category.objects.create(
+            name='Public Category',
+            user=self.owner,
+            is_public=True
+        )
+        self.private_category = Category.objects.create(
+            name='Private Category',
+            user=self.owner,
+            is_public=False
+        )
+        self.public_image = Image.objects.create(
+            title='Public Image',
+            path='user_1/Public Category/public.jpg',
+            category=self.public_category
+        )
+        self.private_image = Image.objects.create(
+            title='Private Image',
+            path='user_1/Private Category/private.jpg',
+            category=self.private_category
+        )
+    
+    @patch('api.views.generate_presigned_url_with_expiry')
+    def test_owner_redirect(self, mock_presign):
+        """Test that the owner is redirected to a presigned URL with cache headers"""
+        import time
+        mock_presign.return_value = ('https://presigned-url.example.com', time.time() + 3600)
+        self.client.force_login(self.owner)
+        
+        response = self.client.get(f'/api/media/{self.private_image.id}/')
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://presigned-url.example.com')
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertTrue(response.has_header('ETag'))
+        mock_presign.assert_called_once_with(self.private_image.path, settings.MEDIA_REDIRECT_URL_EXPIRATION)
+        
+        # A matching ETag short-circuits with 304
+        response = self.client.get(
+            f'/api/media/{self.private_image.id}/',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+    
+    @patch('api.views.generate_presigned_url_with_expiry')
+    def test_visibility(self, mock_presign):
+        """Test that private images are hidden from other users"""
+        import time
+        mock_presign.return_value = ('https://presigned-url.example.com', time.time() + 3600)
+        self.client.force_login(self.other_user)
+        
+        response = self.client.get(f'/api/media/{self.private_image.id}/')
+        self.assertEqual(response.status_code, 404)
+        
+        response = self.client.get(f'/api/media/{self.public_image.id}/')
+        self.assertEqual(response.status_code, 302)
+        
+        response = self.client.get('/api/media/999999/')
+        self.assertEqual(response.status_code, 404)
+    
+    def test_serializer_stable_urls(self):
+        """Test that serializers can emit stable media URLs"""
+        data = ImageSerializer(self.public_image, context={'stable_media_urls': True}).data
+        self.assertEqual(data['presigned_url'], f'/api/media/{self.public_image.id}/')
+        
+        data = CategorySerializer(self.public_category, context={'stable_media_urls': True}).data
+        self.assertEqual(data['images'][0]['presigned_url'], f'/api/media/{self.public_image.id}/')
+
+class DirectUploadTests(TestCase):
+    """Test direct browser-to-S3 uploads"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='otherpassword'
+        )
+        self.category = Category.objects.create(name='Cards', user=self.user)
+        self.other_category = Category.objects.create(name='Other', user=self.other_user)
+        self.client.force_login(self.user)
+    
+    @patch('api.views.generate_presigned_post')
+    def test_upload_url(self, mock_presigned_post):
+        """Test issuing a presigned POST for a collection image"""
+        mock_presigned_post.return_value = {
+            'url': 'https://bucket.s3.amazonaws.com/',
+            'fields': {'key': 'k', 'policy': 'p'}
+        }
+        
+        response = self.client.post(
+            '/api/images/upload-url/',
+            data=json.dumps({
+                'category': self.category.id,
+                'filename': 'card.jpg',
+                'content_type': 'image/jpeg',
+                'size': 1024
+            }),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['key'].startswith(f'user_{self.user.id}/Cards/'))
+        self.assertTrue(data['key'].endswith('.jpg'))
+        self.assertEqual(data['fields'], {'key': 'k', 'policy': 'p'})
+        key, content_type, max_bytes, _ = mock_presigned_post.call_args[0]
+        self.assertEqual(content_type, 'image/jpeg')
+        self.assertEqual(max_bytes, settings.DIRECT_UPLOAD_MAX_BYTES)
+    
+    def test_upload_url_rejects_bad_requests(self):
+        """Test that unsupported types, oversized files and foreign collections are refused"""
+        base = {'category': self.category.id, 'filename': 'card.jpg', 'content_type': 'image/jpeg'}
+        cases = [
+            ({**base, 'content_type': 'application/pdf'}, 400),
+            ({**base, 'size': settings.DIRECT_UPLOAD_MAX_BYTES + 1}, 400),
+            ({**base, 'category': self.other_category.id}, 403),
+        ]
+        for payload, expected_status in cases:
+            response = self.client.post(
+                '/api/images/upload-url/',
+                data=json.dumps(payload),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, expected_status)
+    
+    @patch('api.views.head_s3_object')
+    def test_confirm_upload(self, mock_head):
+        """Test that a confirmed upload creates the image record"""
+        mock_head.return_value = {'ContentLength': 2048, 'ContentType': 'image/jpeg'}
+        key = f'user_{self.user.id}/Cards/abc.jpg'
+        payload = {
+            'key': key,
+            'category': self.category.id,
+            'title': 'Card',
+            'valuation': '12.50',
+            'tags': ['rare']
+        }
+        
+        response = self.client.post(
+            '/api/images/confirm-upload/',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 201)
+        image = Image.objects.get(path=key)
+        self.assertEqual(image.category, self.category)
+        self.assertEqual(float(image.valuation), 12.50)
+        self.assertEqual(image.get_tags(), ['rare'])
+        mock_head.assert_called_once_with(key)
+        
+        # Confirming twice is refused
+        response = self.client.post(
+            '/api/images/confirm-upload/',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 409)
+    
+    @patch('api.views.delete_s3_file')
+    @patch('api.views.head_s3_object')
+    def test_confirm_upload_rejects_bad_objects(self, mock_head, mock_delete):
+        """Test that foreign keys and oversized objects are refused"""
+        response = self.client.post(
+            '/api/images/confirm-upload/',
+            data=json.dumps({
+                'key': f'user_{self.other_user.id}/Other/abc.jpg',
+                'category': self.category.id,
+                'title': 'Card'
+            }),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        mock_head.assert_not_called()
+        
+        mock_head.return_value = {
+            'ContentLength': settings.DIRECT_UPLOAD_MAX_BYTES + 1,
+            'ContentType': 'image/jpeg'
+        }
+        key = f'user_{self.user.id}/Cards/huge.jpg'
+        response = self.client.post(
+            '/api/images/confirm-upload/',
+            data=json.dumps({'key': key, 'category': self.category.id, 'title': 'Card'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        mock_delete.assert_called_once_with(key)
+        self.assertFalse(Image.objects.filter(path=key).exists())
+
+class BackgroundUploadTests(TestCase):
+    """Test uploads finished by the background workers"""
+    
+    def setUp(self):
+        import tempfile
+        self.spool_dir = tempfile.mkdtemp()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.category = Category.objects.create(name='Cards', user=self.user)
+        self.client.force_login(self.user)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+    
+    def make_upload(self):
+        from io import BytesIO
+        from PIL import Image as PILImage
+        buffer = BytesIO()
+        PILImage.new('RGB', (40, 30)).save(buffer, format='JPEG')
+        return SimpleUploadedFile('card.jpg', buffer.getvalue(), content_type='image/jpeg')
+    
+    @patch('api.tasks.get_channel_layer')
+    @patch('api.tasks.upload_file_to_s3')
+    @patch('api.views.enqueue_upload_job')
+    def test_async_upload(self, mock_enqueue, mock_upload, mock_get_channel_layer):
+        """Test that ?async=true returns 202 and the worker creates the image"""
+        from api.models import UploadJob
+        from api.tasks import process_upload_job
+        mock_upload.return_value = f'user_{self.user.id}/Cards/abc.jpg'
+        mock_channel_layer = MagicMock()
+        mock_get_channel_layer.return_value = mock_channel_layer
+        
+        with self.settings(UPLOAD_SPOOL_DIR=self.spool_dir), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/images/upload/?async=true', {
+                'title': 'Card',
+                'category': self.category.id,
+                'file': self.make_upload(),
+                'valuation': '5.00'
+            })
+        
+        self.assertEqual(response.status_code, 202)
+        job = UploadJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual(job.status, 'pending')
+        self.assertTrue(os.path.exists(job.spool_path))
+        mock_enqueue.assert_called_once_with(job)
+        self.assertFalse(Image.objects.exists())
+        
+        # Run the worker inline
+        process_upload_job(job.id)
+        
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.image.path, f'user_{self.user.id}/Cards/abc.jpg')
+        self.assertEqual(float(job.image.valuation), 5.00)
+        self.assertFalse(os.path.exists(job.spool_path))
+        group, event = mock_channel_layer.group_send.call_args[0]
+        self.assertEqual(group, f'collection_{self.category.id}')
+        self.assertEqual(event['message']['action'], 'image_uploaded')
+        
+        response = self.client.get(response.json()['status_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'succeeded')
+        self.assertEqual(response.json()['image']['id'], job.image.id)
+    
+    @patch('api.tasks.get_channel_layer')
+    @patch('api.tasks.upload_file_to_s3')
+    def test_failed_upload_job(self, mock_upload, mock_get_channel_layer):
+        """Test that a failed S3 upload marks the job failed"""
+        from api.models import UploadJob
+        from api.tasks import process_upload_job
+        mock_upload.return_value = None
+        spool_path = os.path.join(self.spool_dir, 'card.jpg')
+        with open(spool_path, 'wb') as spool_file:
+            spool_file.write(b'data')
+        job = UploadJob.objects.create(
+            user=self.user,
+            category=self.category,
+            spool_path=spool_path,
+            filename='card.jpg',
+            content_type='image/jpeg',
+            fields=json.dumps({'title': 'Card'})
+        )
+        
+        process_upload_job(job.id)
+        
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNone(job.image)
+        self.assertFalse(Image.objects.exists())
+
+    @patch('api.tasks.get_executor')
+    def test_recover_upload_jobs(self, mock_get_executor):
+        """Test that jobs lost in a restart are re-queued or failed and orphaned spool files go"""
+        from datetime import timedelta
+        from django.utils.timezone import now
+        from api.models import UploadJob
+        from api.tasks import recover_upload_jobs, run_upload_job
+
+        def make_job(name, status, spooled=True):
+            spool_path = os.path.join(self.spool_dir, name)
+            if spooled:
+                with open(spool_path, 'wb') as spool_file:
+                    spool_file.write(b'data')
+            return UploadJob.objects.create(
+                user=self.user, category=self.category, status=status,
+                spool_path=spool_path, filename=name, content_type='image/jpeg'
+            )
+
+        lost = make_job('lost.jpg', 'running')
+        gone = make_job('gone.jpg', 'pending', spooled=False)
+        fresh = make_job('fresh.jpg', 'pending')
+        UploadJob.objects.filter(id__in=[lost.id, gone.id]).update(updated_at=now() - timedelta(hours=2))
+        orphan = os.path.join(self.spool_dir, 'orphan.jpg')
+        with open(orphan, 'wb') as spool_file:
+            spool_file.write(b'data')
+        old = (now() - timedelta(hours=2)).timestamp()
+        os.utime(orphan, (old, old))
+
+        with self.settings(UPLOAD_SPOOL_DIR=self.spool_dir):
+            self.assertEqual(recover_upload_jobs(), (1, 1, 1))
+            # A second sweep finds nothing left to do
+            self.assertEqual(recover_upload_jobs(), (0, 0, 0))
+
+        mock_get_executor.return_value.submit.assert_called_once_with(run_upload_job, lost.id)
+        self.assertEqual(UploadJob.objects.get(id=lost.id).status, 'pending')
+        self.assertEqual(UploadJob.objects.get(id=gone.id).status, 'failed')
+        self.assertEqual(UploadJob.objects.get(id=fresh.id).status, 'pending')
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(lost.spool_path))
+        self.assertTrue(os.path.exists(fresh.spool_path))
+    
+    @patch('api.tasks.get_executor')
+    @patch('api.tasks.process_upload_job')
+    def test_scheduled_recovery_runs_jobs_inline(self, mock_process, mock_get_executor):
+        """Test that a scheduled sweep finishes lost jobs before it returns"""
+        from datetime import timedelta
+        from django.utils.timezone import now
+        from api.models import UploadJob
+        from api.tasks import scheduled_upload_job_recovery
+        spool_path = os.path.join(self.spool_dir, 'lost.jpg')
+        with open(spool_path, 'wb') as spool_file:
+            spool_file.write(b'data')
+        lost = UploadJob.objects.create(
+            user=self.user, category=self.category, status='pending',
+            spool_path=spool_path, filename='lost.jpg', content_type='image/jpeg'
+        )
+        UploadJob.objects.filter(id=lost.id).update(updated_at=now() - timedelta(hours=2))
+        
+        with self.settings(UPLOAD_SPOOL_DIR=self.spool_dir):
+            self.assertEqual(scheduled_upload_job_recovery({'source': 'aws.events'}, None), (1, 0, 0))
+        mock_process.assert_called_once_with(lost.id)
+        mock_get_executor.return_value.submit.assert_not_called()
+
+class ThumbnailTests(TestCase):
+    """Test the image derivative pipeline"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.category = Category.objects.create(name='Cards', user=self.user)
+        self.image = Image.objects.create(
+            title='Card',
+            path=f'user_{self.user.id}/Cards/card.jpg',
+            category=self.category
+        )
+    
+    def make_jpeg(self, width, height):
+        from io import BytesIO
+        from PIL import Image as PILImage
+        buffer = BytesIO()
+        PILImage.new('RGB', (width, height), (200, 30, 30)).save(buffer, format='JPEG')
+        buffer.seek(0)
+        return buffer
+    
+    def test_render_derivatives(self):
+        """Test that only widths smaller than the original are rendered"""
+        from api.thumbnails import render_derivatives
+        source = self.make_jpeg(800, 600)
+        
+        rendered = render_derivatives(source)
+        
+        self.assertEqual(
+            sorted((width, fmt) for width, fmt, _ in rendered),
+            [(320, 'jpeg'), (320, 'webp'), (640, 'jpeg'), (640, 'webp')]
+        )
+        # The source is rewound for the original upload
+        self.assertEqual(source.tell(), 0)
+        
+        # Files Pillow cannot decode produce no derivatives
+        self.assertEqual(render_derivatives(SimpleUploadedFile('bad.jpg', b'not an image')), [])
+        
+        # Neither do decompression bombs
+        with patch('PIL.Image.MAX_IMAGE_PIXELS', 1000):
+            self.assertEqual(render_derivatives(self.make_jpeg(800, 600)), [])
+    
+    @patch('api.thumbnails.get_s3_client')
+    def test_store_derivatives(self, mock_get_s3_client):
+        """Test that derivatives are uploaded and recorded on the image"""
+        from api.thumbnails import render_derivatives, store_derivatives
+        mock_client = MagicMock()
+        mock_get_s3_client.return_value = mock_client
+        
+        derivatives = store_derivatives(self.image, render_derivatives(self.make_jpeg(800, 600)))
+        
+        self.assertEqual(mock_client.put_object.call_count, 4)
+        self.assertEqual(
+            derivatives['320']['webp'],
+            f'user_{self.user.id}/Cards/derivatives/card_w320.webp'
+        )
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.get_derivatives(), derivatives)
+        self.assertEqual(len(self.image.get_object_keys()), 5)
+    
+    @patch('api.views.generate_presigned_url_with_expiry')
+    def test_media_redirect_width(self, mock_presign):
+        """Test that ?w= redirects to the closest derivative"""
+        import time
+        mock_presign.return_value = ('https://presigned-url.example.com', time.time() + 3600)
+        self.image.set_derivatives({
+            '320': {'webp': 'd/card_w320.webp', 'jpeg': 'd/card_w320.jpg'},
+            '640': {'webp': 'd/card_w640.webp', 'jpeg': 'd/card_w640.jpg'},
+        })
+        self.image.save()
+        self.client.force_login(self.user)
+        
+        self.client.get(f'/api/media/{self.image.id}/?w=400&fmt=webp')
+        self.assertEqual(mock_presign.call_args[0][0], 'd/card_w640.webp')
+        
+        self.client.get(f'/api/media/{self.image.id}/?w=100&fmt=jpeg')
+        self.assertEqual(mock_presign.call_args[0][0], 'd/card_w320.jpg')
+        
+        # Wider than every derivative falls back to the original
+        self.client.get(f'/api/media/{self.image.id}/?w=2000')
+        self.assertEqual(mock_presign.call_args[0][0], self.image.path)
+    
+    @patch('api.tasks.get_executor')
+    @patch('api.views.generate_presigned_url_with_expiry')
+    def test_media_redirect_queues_lazy_render(self, mock_presign, mock_get_executor):
+        """Test that a missing derivative is rendered by a worker, once, while the original is served"""
+        import time
+        from io import BytesIO
+        from django.core.cache import cache
+        from api.tasks import run_derivatives_job
+        cache.clear()
+        mock_presign.return_value = ('https://presigned-url.example.com', time.time() + 3600)
+        self.client.force_login(self.user)
+        
+        with self.settings(IMAGE_DERIVATIVES_MODE='lazy'):
+            first = self.client.get(f'/api/media/{self.image.id}/?w=320')
+            self.client.get(f'/api/media/{self.image.id}/?w=640')
+        
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(first['Cache-Control'], 'private, max-age=0')
+        self.assertEqual(mock_presign.call_args[0][0], self.image.path)
+        mock_get_executor.return_value.submit.assert_called_once_with(run_derivatives_job, self.image.id)
+        
+        # An original that cannot be decoded is recorded and never rendered again
+        with patch('api.thumbnails.get_s3_client') as mock_get_s3_client:
+            mock_get_s3_client.return_value.get_object.return_value = {'Body': BytesIO(b'not an image')}
+            run_derivatives_job(self.image.id)
+            run_derivatives_job(self.image.id)
+        mock_get_s3_client.return_value.get_object.assert_called_once()
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.get_derivatives(), {})
+    
+    @patch('api.serializers.generate_presigned_url')
+    def test_serializer_srcset(self, mock_generate_url):
+        """Test that the serializer exposes derivative URLs by format and width"""
+        mock_generate_url.side_effect = lambda key: f'https://signed/{key}'
+        self.image.set_derivatives({'320': {'webp': 'd/card_w320.webp', 'jpeg': 'd/card_w320.jpg'}})
+        self.image.save()
+        
+        data = ImageSerializer(self.image).data
+        
+        self.assertEqual(data['srcset'], {
+            'webp': {'320': 'https://signed/d/card_w320.webp'},
+            'jpeg': {'320': 'https://signed/d/card_w320.jpg'},
+        })
+
+class S3DeletionOutboxTests(TestCase):
+    """Test the transactional S3 deletion outbox"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Cards', user=self.user)
+        self.image = Image.objects.create(
+            title='Card',
+            path=f'user_{self.user.id}/Cards/card.jpg',
+            category=self.category
+        )
+    
+    @patch('api.tasks.schedule_s3_deletion_drain')
+    @patch('api.tasks.get_s3_client')
+    def test_delete_queues_keys_and_drains_after_commit(self, mock_get_s3_client, mock_schedule):
+        """Test that deleting an image only writes the outbox during the request"""
+        from api.models import S3Deletion
+        self.image.set_derivatives({'320': {'webp': f'user_{self.user.id}/Cards/derivatives/card_w320.webp'}})
+        self.image.save()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/images/{self.image.id}/')
+        
+        self.assertEqual(response.status_code, 204)
+        mock_get_s3_client.assert_not_called()
+        mock_schedule.assert_called_once()
+        self.assertEqual(
+            set(S3Deletion.objects.values_list('object_key', flat=True)),
+            {self.image.path, f'user_{self.user.id}/Cards/derivatives/card_w320.webp'}
+        )
+    
+    @patch('api.tasks.get_s3_client')
+    def test_drain_batches_and_retries(self, mock_get_s3_client):
+        """Test that due keys go out in one delete_objects call and failures back off"""
+        from api.models import S3Deletion
+        from api.tasks import queue_s3_deletions, drain_s3_deletions
+        mock_client = MagicMock()
+        mock_client.delete_objects.return_value = {
+            'Errors': [{'Key': 'user_1/Cards/b.jpg', 'Code': 'SlowDown', 'Message': 'Slow down'}]
+        }
+        mock_get_s3_client.return_value = mock_client
+        
+        queue_s3_deletions(['user_1/Cards/a.jpg', 'user_1/Cards/b.jpg', 'user_1/Cards/a.jpg'])
+        
+        self.assertEqual(drain_s3_deletions(), 2)
+        mock_client.delete_objects.assert_called_once()
+        objects = mock_client.delete_objects.call_args[1]['Delete']['Objects']
+        self.assertEqual(objects, [{'Key': 'user_1/Cards/a.jpg'}, {'Key': 'user_1/Cards/b.jpg'}])
+        
+        remaining = S3Deletion.objects.get()
+        self.assertEqual(remaining.object_key, 'user_1/Cards/b.jpg')
+        self.assertEqual(remaining.attempts, 1)
+        self.assertIn('SlowDown', remaining.last_error)
+        # Backed-off entries are not retried until they are due
+        self.assertEqual(drain_s3_deletions(), 0)
+    
+    @patch('api.tasks.get_s3_client')
+    def test_scheduled_drain_clears_overdue_entries(self, mock_get_s3_client):
+        """Test that entries left behind by a restart drain without a new delete"""
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils.timezone import now
+        from api.models import S3Deletion
+        from api.tasks import scheduled_s3_deletion_drain
+        mock_client = MagicMock()
+        mock_client.delete_objects.return_value = {}
+        mock_get_s3_client.return_value = mock_client
+        # Backed off before the restart, due since
+        S3Deletion.objects.create(object_key='user_1/Cards/a.jpg', attempts=2, next_attempt_at=now() - timedelta(hours=1))
+        S3Deletion.objects.create(object_key='user_1/Cards/b.jpg', next_attempt_at=now() + timedelta(hours=1))
+        
+        self.assertEqual(scheduled_s3_deletion_drain({'source': 'aws.events'}, None), 1)
+        objects = mock_client.delete_objects.call_args[1]['Delete']['Objects']
+        self.assertEqual(objects, [{'Key': 'user_1/Cards/a.jpg'}])
+        self.assertEqual(list(S3Deletion.objects.values_list('object_key', flat=True)), ['user_1/Cards/b.jpg'])
+        
+        S3Deletion.objects.update(next_attempt_at=now() - timedelta(seconds=1))
+        call_command('drain_s3_deletions', stdout=StringIO())
+        self.assertFalse(S3Deletion.objects.exists())
+    
+    @patch('api.tasks.list_s3_objects')
+    @patch('api.tasks.get_s3_client')
+    def test_drain_expands_prefixes(self, mock_get_s3_client, mock_list):
+        """Test that folder entries delete only objects that existed when queued"""
+        from datetime import timedelta
+        from django.utils.timezone import now
+        from api.models import S3Deletion
+        from api.tasks import queue_s3_deletions, drain_s3_deletions
+        mock_client = MagicMock()
+        mock_client.delete_objects.return_value = {}
+        mock_get_s3_client.return_value = mock_client
+        
+        queue_s3_deletions(prefixes=['user_1/Cards/'])
+        mock_list.return_value = [
+            {'Key': 'user_1/Cards/old.jpg', 'LastModified': now() - timedelta(days=1)},
+            {'Key': 'user_1/Cards/new.jpg', 'LastModified': now() + timedelta(minutes=1)},
+        ]
+        
+        drain_s3_deletions()
+        drain_s3_deletions()
+        
+        objects = mock_client.delete_objects.call_args[1]['Delete']['Objects']
+        self.assertEqual(objects, [{'Key': 'user_1/Cards/old.jpg'}])
+        self.assertFalse(S3Deletion.objects.exists())
+
+    @patch('api.tasks.get_s3_client')
+    @patch('api.utils.get_s3_client')
+    def test_deduplicated_upload_defers_queued_deletion(self, mock_utils_client, mock_get_s3_client):
+        """Test that an object reused by an upload is not deleted before its row exists"""
+        from datetime import timedelta
+        from django.utils.timezone import now
+        from api.models import S3Deletion, S3UploadPin
+        from api.tasks import queue_s3_deletions, drain_s3_deletions
+        from api.utils import build_content_addressed_path
+        mock_client = MagicMock()
+        mock_client.delete_objects.return_value = {}
+        mock_get_s3_client.return_value = mock_client
+        mock_utils_client.return_value = MagicMock()
+        upload = SimpleUploadedFile('card.jpg', b'card', content_type='image/jpeg')
+
+        # The last row using the object is gone, then the same bytes are uploaded again
+        shared_key = build_content_addressed_path(upload, self.user.id)
+        queue_s3_deletions([shared_key])
+        with self.settings(S3_CONTENT_ADDRESSED_UPLOADS=True):
+            self.assertEqual(upload_file_to_s3(upload, 'Cards', self.user.id), shared_key)
+        mock_utils_client.return_value.upload_fileobj.assert_not_called()
+
+        self.assertEqual(drain_s3_deletions(), 1)
+        mock_client.delete_objects.assert_not_called()
+        entry = S3Deletion.objects.get()
+        self.assertEqual(entry.attempts, 0)
+        self.assertGreater(entry.next_attempt_at, now())
+
+        # Once the pin expires the new row keeps the object and the pin is purged
+        Image.objects.create(title='Again', path=shared_key, category=self.category)
+        S3UploadPin.objects.update(created_at=now() - timedelta(hours=2))
+        S3Deletion.objects.update(next_attempt_at=now())
+        self.assertEqual(drain_s3_deletions(), 1)
+        mock_client.delete_objects.assert_not_called()
+        self.assertFalse(S3Deletion.objects.exists())
+        self.assertFalse(S3UploadPin.objects.exists())
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination on list endpoints"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+    
+    def next_link(self, response):
+        import re
+        match = re.search(r'<([^>]+)>; rel="next"', response.get('Link', ''))
+        return match.group(1) if match else None
+    
+    def test_category_pages_follow_next_link(self):
+        """Test that categories come back newest first in bounded pages"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        categories = [Category.objects.create(name=f'Collection {i}', user=self.user) for i in range(5)]
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/categories/?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.json()], [categories[4].id, categories[3].id])
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries))
+        
+        seen = [c['id'] for c in response.json()]
+        next_url = self.next_link(response)
+        while next_url:
+            response = self.client.get(next_url)
+            seen.extend(c['id'] for c in response.json())
+            next_url = self.next_link(response)
+        self.assertEqual(seen, [c.id for c in reversed(categories)])
+    
+    def test_page_size_is_capped(self):
+        """Test that ?page_size= cannot exceed API_MAX_PAGE_SIZE"""
+        for i in range(3):
+            Category.objects.create(name=f'Collection {i}', user=self.user)
+        with self.settings(API_MAX_PAGE_SIZE=2):
+            response = self.client.get('/api/categories/?page_size=1000')
+        self.assertEqual(len(response.json()), 2)
+        self.assertIsNotNone(self.next_link(response))
+    
+    def test_search_by_tag_pages_across_categories_and_images(self):
+        """Test that tag search pages through categories and then images"""
+        other_user = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        category = Category.objects.create(name='Cards', user=other_user, is_public=True)
+        category.set_tags(['rare'])
+        category.save()
+        for i in range(3):
+            image = Image.objects.create(title=f'Card {i}', path=f'other/{i}.jpg', category=category)
+            image.set_tags(['rare'])
+            image.save()
+        
+        response = self.client.get('/api/search/by-tag/?tag=rare&page_size=2')
+        results = [(r['type'], r['id']) for r in response.json()]
+        next_url = self.next_link(response)
+        while next_url:
+            response = self.client.get(next_url)
+            results.extend((r['type'], r['id']) for r in response.json())
+            next_url = self.next_link(response)
+        
+        expected = [('category', category.id)] + [
+            ('image', image_id)
+            for image_id in Image.objects.order_by('-id').values_list('id', flat=True)
+        ]
+        self.assertEqual(results, expected)
+    
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/search/by-tag/?tag=rare&cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+        
+        for position in ({'type': 'image', 'id': None}, {'type': 'image', 'id': True}):
+            cursor = encode_cursor(position)
+            response = self.client.get(f'/api/search/by-tag/?tag=rare&cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
+
+class CategorySummaryTests(TestCase):
+    """Test the ?view=summary category list and the per-category image list"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+        self.categories = []
+        for i in range(3):
+            category = Category.objects.create(name=f'Collection {i}', user=self.user)
+            for j in range(6):
+                Image.objects.create(
+                    title=f'Item {j}',
+                    path=f'user_{self.user.id}/Collection {i}/{j}.jpg',
+                    category=category,
+                    valuation=10
+                )
+            self.categories.append(category)
+    
+    @patch('api.serializers.generate_presigned_urls')
+    @patch('api.serializers.generate_presigned_url')
+    def test_summary_list(self, mock_presign, mock_batch):
+        """Test that the summary carries counts and the newest thumbnails only"""
+        mock_presign.side_effect = lambda key, *args: f'https://signed/{key}'
+        
+        with self.settings(CATEGORY_COVER_IMAGES=2), self.assertNumQueries(4):
+            # Session, user, categories with aggregates, latest images
+            response = self.client.get('/api/categories/?view=summary')
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 3)
+        for item in data:
+            self.assertNotIn('images', item)
+            self.assertEqual(item['image_count'], 6)
+            self.assertEqual(item['total_valuation'], '60.00')
+            self.assertEqual([cover['title'] for cover in item['cover_images']], ['Item 5', 'Item 4'])
+        mock_batch.assert_called_once()
+    
+    @patch('api.serializers.generate_presigned_url', return_value='https://signed')
+    def test_category_images_endpoint(self, mock_presign):
+        """Test that a category's images are served in pages"""
+        category = self.categories[0]
+        response = self.client.get(f'/api/categories/{category.id}/images/?page_size=4')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 4)
+        self.assertIn('rel="next"', response['Link'])
+        
+        other_user = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        other_category = Category.objects.create(name='Other', user=other_user)
+        response = self.client.get(f'/api/categories/{other_category.id}/images/')
+        self.assertEqual(response.status_code, 404)
+
+class FollowAnnotationTests(TestCase):
+    """Test that profile lists read follow counts from annotations"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+    
+    def add_followers(self, count):
+        for i in range(count):
+            follower = User.objects.create_user(
+                username=f'follower{UserFollow.objects.count()}',
+                email=f'follower{UserFollow.objects.count()}@example.com',
+                password='pw'
+            )
+            UserFollow.objects.create(follower=follower, followed=self.user)
+            if i == 0:
+                UserFollow.objects.create(follower=self.user, followed=follower)
+    
+    def count_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+    
+    @patch('api.serializers.generate_presigned_urls')
+    def test_follower_list_query_count_is_constant(self, mock_batch):
+        """Test that follower lists do not query per row"""
+        self.add_followers(2)
+        small_count, _ = self.count_queries(f'/api/profiles/{self.user.id}/followers/')
+        self.add_followers(6)
+        large_count, data = self.count_queries(f'/api/profiles/{self.user.id}/followers/')
+        
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(data), 8)
+        followed_back = [user for user in data if user['is_following']]
+        self.assertEqual(len(followed_back), 2)
+        for user in followed_back:
+            self.assertEqual(user['follower_count'], 1)
+            self.assertEqual(user['following_count'], 1)
+    
+    @patch('api.serializers.generate_presigned_urls')
+    def test_profile_detail_counts(self, mock_batch):
+        self.add_followers(3)
+        _, data = self.count_queries(f'/api/profiles/{self.user.id}/')
+        self.assertEqual(data['follower_count'], 3)
+        self.assertEqual(data['following_count'], 1)
+        self.assertFalse(data['is_following'])
+
+class SearchByTagTests(TestCase):
+    """Test the database-side tag search"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        self.other_user.profile.profile_picture = 'user_2/profile.jpg'
+        self.other_user.profile.save()
+    
+    def add_image(self, category, tags, **kwargs):
+        image = Image.objects.create(title='Card', path=f'p/{Image.objects.count()}.jpg', category=category, **kwargs)
+        image.set_tags(tags)
+        image.save()
+        return image
+    
+    @patch('api.views.generate_presigned_urls')
+    def test_search_matches_visible_tagged_content(self, mock_batch):
+        """Test that only other users' public, non-wishlist content matches, ignoring case"""
+        mock_batch.side_effect = lambda keys: {key: f'https://signed/{key}' for key in keys}
+        public = Category.objects.create(name='Public', user=self.other_user, is_public=True)
+        public.set_tags(['RARE'])
+        public.save()
+        private = Category.objects.create(name='Private', user=self.other_user, is_public=False)
+        mine = Category.objects.create(name='Mine', user=self.user, is_public=True)
+        match = self.add_image(public, ['Rare'])
+        self.add_image(public, ['Rare'], is_wishlist=True)
+        self.add_image(public, ['common'])
+        self.add_image(private, ['rare'])
+        self.add_image(mine, ['rare'])
+        
+        response = self.client.get('/api/search/by-tag/?tag=rare')
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([(r['type'], r['id']) for r in data], [('category', public.id), ('image', match.id)])
+        self.assertEqual(data[1]['image_url'], f'https://signed/{match.path}')
+        self.assertEqual(data[1]['user']['profile_picture_url'], 'https://signed/user_2/profile.jpg')
+        mock_batch.assert_called_once()
+    
+    @patch('api.views.generate_presigned_urls', return_value={})
+    def test_search_through_index_rechecks_rows(self, mock_batch):
+        """Test that the in-memory index supplies candidates and SQL still filters them"""
+        from api import search_index
+        public = Category.objects.create(name='Rare binder', user=self.other_user, is_public=True)
+        public.set_tags(['Rare'])
+        public.save()
+        hidden = Category.objects.create(name='Vault', user=self.other_user, is_public=True)
+        hidden.set_tags(['rare'])
+        hidden.save()
+        images = [self.add_image(public, ['rare']) for _ in range(3)]
+        self.add_image(public, ['rare holo'])  # Token match only, not the tag
+        expected = [('category', public.id)] + [('image', image.id) for image in reversed(images)]
+        
+        try:
+            with self.settings(SEARCH_INDEX_ENABLED=True, SEARCH_INDEX_SNAPSHOT_PATH=''):
+                search_index.get_search_index()
+                # Written elsewhere: this process's index still lists it as public
+                Category.objects.filter(id=hidden.id).update(is_public=False)
+                with patch('api.views.tag_candidates', wraps=search_index.tag_candidates) as candidates:
+                    response = self.client.get('/api/search/by-tag/?tag=RARE&page_size=2')
+                    results = [(r['type'], r['id']) for r in response.json()]
+                    while 'Link' in response:
+                        response = self.client.get(response['Link'].split('>')[0].lstrip('<'))
+                        results += [(r['type'], r['id']) for r in response.json()]
+                self.assertTrue(candidates.called)
+        finally:
+            search_index.reset_search_index()
+        self.assertEqual(results, expected)
+    
+    @patch('api.views.generate_presigned_urls', return_value={})
+    def test_search_query_count_is_constant(self, mock_batch):
+        """Test that results do not query per row"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        category = Category.objects.create(name='Public', user=self.other_user, is_public=True)
+        counts = []
+        for _ in range(2):
+            for _ in range(3):
+                self.add_image(category, ['rare'])
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get('/api/search/by-tag/?tag=rare')
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+class SearchIndexTests(TestCase):
+    """Test the in-memory tag/title inverted index"""
+    
+    def setUp(self):
+        from api import search_index
+        self.search_index = search_index
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.category = Category.objects.create(name='Pokemon Cards', user=self.user)
+    
+    def tearDown(self):
+        from django.db.models.signals import post_save, post_delete
+        for model in (Image, Category):
+            post_save.disconnect(sender=model, dispatch_uid=f'search_index_save_{model.__name__}')
+            post_delete.disconnect(sender=model, dispatch_uid=f'search_index_delete_{model.__name__}')
+        self.search_index.reset_search_index()
+    
+    def test_and_or_queries_are_ranked(self):
+        """Test that tag matches outrank title matches and AND requires every term"""
+        index = self.search_index.InvertedIndex()
+        index.add(1, self.search_index.document_tokens('Charizard holo', ['rare']))
+        index.add(2, self.search_index.document_tokens('Rare Pikachu', ['holo']))
+        index.add(3, self.search_index.document_tokens('Bulbasaur', ['Rare', 'holo']))
+        
+        self.assertEqual(index.query('rare holo'), [(3, 4.0), (2, 3.0), (1, 3.0)])
+        self.assertEqual([doc_id for doc_id, _ in index.query('charizard bulbasaur', mode='or')], [3, 1])
+        self.assertEqual(index.query('rare missing'), [])
+        
+        index.remove(3)
+        self.assertEqual([doc_id for doc_id, _ in index.query('holo rare')], [2, 1])
+        self.assertNotIn('bulbasaur', index.postings)
+    
+    def test_signals_keep_index_current(self):
+        """Test that committed saves and deletes update a built index and rolled-back ones do not"""
+        from django.db import transaction
+        image = Image.objects.create(title='Charizard', path='p/1.jpg', category=self.category)
+        with self.settings(SEARCH_INDEX_SNAPSHOT_PATH=''):
+            self.search_index.connect_signals()
+            self.assertEqual(self.search_index.search('image', 'charizard'), [(image.id, 1.0)])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            image.set_tags(['Holo'])
+            image.save()
+        self.assertEqual(self.search_index.search('image', 'holo'), [(image.id, 2.0)])
+        self.assertEqual(
+            self.search_index.search('category', 'pokemon'),
+            [(self.category.id, 1.0)]
+        )
+        
+        try:
+            with transaction.atomic():
+                Image.objects.create(title='Phantom', path='p/2.jpg', category=self.category)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(self.search_index.search('image', 'phantom'), [])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertEqual(self.search_index.search('image', 'holo'), [])
+    
+    def test_changes_during_a_build_are_replayed(self):
+        """Test that a write committed while a rebuild runs reaches the new index"""
+        from api.background_index import BackgroundIndex
+        
+        def build():
+            index = self.search_index.SearchIndex()
+            # Committed by another request after the build read the tables
+            holder.apply(lambda index: index.indexes['image'].add(7, {'late': 1.0}))
+            return index
+        
+        holder = BackgroundIndex('test index', build, lambda: 3600)
+        self.assertEqual(holder.get().indexes['image'].query('late'), [(7, 1.0)])
+    
+    def test_snapshot_round_trip(self):
+        """Test that a warm start loads the snapshot instead of querying"""
+        import tempfile
+        image = Image.objects.create(title='Charizard', path='p/1.jpg', category=self.category)
+        index = self.search_index.SearchIndex.build()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'index.json')
+            index.save_snapshot(path)
+            self.assertEqual(os.listdir(tmp_dir), ['index.json'])
+            with self.assertNumQueries(0):
+                loaded = self.search_index.SearchIndex.load_snapshot(path, max_age=60)
+            self.assertIsNone(self.search_index.SearchIndex.load_snapshot(path, max_age=-1))
+        self.assertEqual(loaded.indexes['image'].query('charizard'), [(image.id, 1.0)])
+
+class FullTextSearchTests(TestCase):
+    """Test ranked full-text image search"""
+    
+    def setUp(self):
+        from api import fulltext
+        self.fulltext = fulltext
+        fulltext.reset_fulltext_index()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        self.public = Category.objects.create(name='Public', user=self.other_user, is_public=True)
+        self.private = Category.objects.create(name='Private', user=self.other_user, is_public=False)
+        self.mine = Category.objects.create(name='Mine', user=self.user, is_public=False)
+    
+    def tearDown(self):
+        from django.db.models.signals import post_save, post_delete
+        post_save.disconnect(sender=Image, dispatch_uid='fulltext_index_image')
+        post_save.disconnect(sender=Category, dispatch_uid='fulltext_update_category')
+        post_delete.disconnect(sender=Image, dispatch_uid='fulltext_unindex_image')
+        self.fulltext.reset_fulltext_index()
+    
+    def add_image(self, category, title, description='', **kwargs):
+        return Image.objects.create(
+            title=title, description=description, path=f'p/{Image.objects.count()}.jpg',
+            category=category, **kwargs
+        )
+    
+    def test_bm25_ranks_title_over_description(self):
+        """Test that title matches outrank description matches and the top-k walk stops early"""
+        index = self.fulltext.BM25Index()
+        meta = {'owner_id': 1, 'category_id': 1, 'is_public': True, 'is_wishlist': False, 'valuation': None}
+        index.add(1, 'Binder', 'A charizard inside', [], meta)
+        index.add(2, 'Charizard', 'Holo card', [], meta)
+        index.add(3, 'Pikachu', 'Card', ['charizard'], meta)
+        for image_id in range(4, 50):
+            index.add(image_id, f'Filler {image_id}', 'card', [], meta)
+        
+        self.assertEqual([image_id for image_id, _ in index.search('charizard')], [2, 3, 1])
+        self.assertEqual(len(index.search('card', limit=5)), 5)
+        self.assertEqual(index.search('card charizard', limit=1)[0][0], 2)
+        
+        index.remove(2)
+        self.assertEqual([image_id for image_id, _ in index.search('charizard')], [3, 1])
+        self.assertEqual(index.search(''), [])
+    
+    @patch('api.serializers.generate_presigned_urls', return_value={})
+    def test_search_filters_and_visibility(self, mock_url):
+        """Test that private categories of other users never match and filters apply"""
+        from decimal import Decimal
+        cheap = self.add_image(self.public, 'Charizard', valuation=Decimal('10.00'))
+        pricey = self.add_image(self.public, 'Charizard holo', valuation=Decimal('500.00'))
+        self.add_image(self.private, 'Charizard')
+        wanted = self.add_image(self.mine, 'Charizard', is_wishlist=True)
+        
+        response = self.client.get('/api/search/?q=charizard')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({r['id'] for r in response.json()}, {cheap.id, pricey.id, wanted.id})
+        
+        response = self.client.get(f'/api/search/?q=charizard&owner={self.other_user.id}&min_valuation=100')
+        self.assertEqual([r['id'] for r in response.json()], [pricey.id])
+        
+        response = self.client.get('/api/search/?q=charizard&is_wishlist=true')
+        self.assertEqual([r['id'] for r in response.json()], [wanted.id])
+        
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/search/?q=x&min_valuation=abc').status_code, 400)
+    
+    @patch('api.serializers.generate_presigned_urls', return_value={})
+    def test_highlighting_and_pagination(self, mock_url):
+        """Test that matches are marked, escaped, and paged with a Link header"""
+        first = self.add_image(self.public, 'Rare <Charizard>', 'word ' * 100 + 'a charizard at the end')
+        self.add_image(self.public, 'Charizard')
+        
+        response = self.client.get('/api/search/?q=charizard&page_size=1')
+        data = response.json()
+        self.assertEqual(len(data), 1)
+        self.assertIn('rel="next"', response['Link'])
+        
+        next_url = response['Link'].split('>')[0].lstrip('<')
+        data += self.client.get(next_url).json()
+        result = next(r for r in data if r['id'] == first.id)
+        self.assertEqual(result['highlighted_title'], 'Rare &lt;<mark>Charizard</mark>&gt;')
+        self.assertIn('<mark>charizard</mark>', result['snippet'])
+        self.assertTrue(result['snippet'].startswith('…'))
+        self.assertIn('score', result)
+    
+    @patch('api.serializers.generate_presigned_urls', return_value={})
+    def test_signals_keep_index_current(self, mock_url):
+        """Test that image and category saves update a built index"""
+        self.fulltext.connect_signals()
+        image = self.add_image(self.public, 'Charizard')
+        self.assertEqual(len(self.client.get('/api/search/?q=charizard').json()), 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            image.title = 'Pikachu'
+            image.save()
+        self.assertEqual(self.client.get('/api/search/?q=charizard').json(), [])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.public.is_public = False
+            self.public.save()
+        self.assertEqual(self.client.get('/api/search/?q=pikachu').json(), [])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertNotIn(image.id, self.fulltext.get_fulltext_index().meta)
+    
+    @patch('api.serializers.generate_presigned_urls', return_value={})
+    def test_stale_index_never_leaks_private_items(self, mock_url):
+        """Test that a collection made private by another process drops out before the rebuild"""
+        image = self.add_image(self.public, 'Charizard', valuation=50)
+        self.assertEqual(len(self.client.get('/api/search/?q=charizard').json()), 1)
+        
+        # Written elsewhere: no signal reaches this process's index
+        Category.objects.filter(id=self.public.id).update(is_public=False)
+        self.assertTrue(self.fulltext.get_fulltext_index().meta[image.id]['is_public'])
+        self.assertEqual(self.client.get('/api/search/?q=charizard').json(), [])
+        
+        Category.objects.filter(id=self.public.id).update(is_public=True)
+        Image.objects.filter(id=image.id).update(valuation=5)
+        self.assertEqual(self.client.get('/api/search/?q=charizard&min_valuation=10').json(), [])
+    
+    def test_stale_index_is_served_while_rebuilding(self):
+        """Test that an expired index keeps answering while a background build replaces it"""
+        index = self.fulltext.get_fulltext_index()
+        index.built_at -= 10 ** 6
+        with patch.object(self.fulltext._holder, 'start_build') as start_build:
+            self.assertIs(self.fulltext.get_fulltext_index(), index)
+        start_build.assert_called_once_with()
+    
+    def test_benchmark_command(self):
+        """Test that the benchmark reports percentiles and enforces the budget"""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        out = StringIO()
+        call_command('benchmark_search', synthetic=200, queries=20, budget_ms=10000, stdout=out)
+        self.assertIn('p95', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('benchmark_search', synthetic=200, queries=20, budget_ms=0.000001, stdout=StringIO())
+
+class TagSuggestTests(TestCase):
+    """Test tag autocomplete"""
+    
+    def setUp(self):
+        from api import tag_suggest
+        self.tag_suggest = tag_suggest
+        tag_suggest.reset_tag_trie()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Cards', user=self.user)
+    
+    def tearDown(self):
+        self.tag_suggest.reset_tag_trie()
+    
+    def add_image(self, tags):
+        image = Image.objects.create(title='Card', path=f'p/{Image.objects.count()}.jpg', category=self.category)
+        image.set_tags(tags)
+        image.save()
+        return image
+    
+    def test_trie_ranks_by_usage(self):
+        """Test that suggestions are the most used completions and follow count changes"""
+        trie = self.tag_suggest.TagTrie(size=2)
+        trie.set(1, 'holo', 'Holo', 3)
+        trie.set(2, 'holographic', 'Holographic', 5)
+        trie.set(3, 'hobby', 'Hobby', 4)
+        trie.set(4, 'rare', 'Rare', 9)
+        
+        self.assertEqual(trie.suggest('ho'), [('Holographic', 5), ('Hobby', 4)])
+        self.assertEqual(trie.suggest('hol'), [('Holographic', 5), ('Holo', 3)])
+        self.assertEqual(trie.suggest(''), [('Rare', 9), ('Holographic', 5)])
+        self.assertEqual(trie.suggest('x'), [])
+        
+        trie.set(2, 'holographic', 'Holographic', 0)
+        self.assertEqual(trie.suggest('ho'), [('Hobby', 4), ('Holo', 3)])
+        self.assertEqual(trie.suggest('holog'), [])
+    
+    def test_endpoint_tracks_tag_writes(self):
+        """Test that linking and unlinking tags updates a built trie without a rebuild"""
+        first = self.add_image(['Rare', 'Holo'])
+        self.add_image(['rare'])
+        self.category.set_tags(['Rarities'])
+        self.category.save()
+        
+        response = self.client.get('/api/tags/suggest/?prefix=RA')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{'name': 'Rare', 'count': 2}, {'name': 'Rarities', 'count': 1}])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_image(['Rarities', 'Raw'])
+            first.set_tags(['Holo'])
+            first.save()
+        with self.assertNumQueries(2):  # The public re-check of the suggested names only
+            self.assertEqual(
+                self.tag_suggest.suggest_tags('ra'),
+                [('Rarities', 2), ('Rare', 1), ('Raw', 1)]
+            )
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.client.get('/api/tags/suggest/?prefix=h').json(), [])
+        self.assertEqual(len(self.client.get('/api/tags/suggest/?limit=1').json()), 1)
+        self.assertEqual(self.client.get('/api/tags/suggest/?limit=x').status_code, 400)
+    
+    def test_private_tags_stay_private(self):
+        """Test that tags of private collections and wishlists are only suggested to their owner"""
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        hidden = Category.objects.create(name='Vault', user=other, is_public=False)
+        hidden.set_tags(['Secret'])
+        hidden.save()
+        wishlist = Category.objects.create(name='Wants', user=other, is_wishlist=True)
+        wishlist.set_tags(['Secretly'])
+        wishlist.save()
+        self.add_image(['Seconds'])
+        
+        self.assertEqual(self.client.get('/api/tags/suggest/?prefix=sec').json(), [{'name': 'Seconds', 'count': 1}])
+        self.client.force_login(other)
+        self.assertEqual(
+            [tag['name'] for tag in self.client.get('/api/tags/suggest/?prefix=sec').json()],
+            ['Seconds', 'Secret', 'Secretly']
+        )
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            hidden.is_public = True
+            hidden.save()
+        self.assertEqual(self.tag_suggest.suggest_tags('sec'), [('Seconds', 1), ('Secret', 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            hidden.is_public = False
+            hidden.save()
+        self.assertEqual(self.tag_suggest.suggest_tags('sec'), [('Seconds', 1)])
+    
+    def test_stale_trie_never_leaks_private_tags(self):
+        """Test that a collection made private by another process drops out before the rebuild"""
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        shared = Category.objects.create(name='Shared', user=other, is_public=True)
+        shared.set_tags(['Secret'])
+        shared.save()
+        self.assertEqual(self.client.get('/api/tags/suggest/?prefix=sec').json(), [{'name': 'Secret', 'count': 1}])
+        
+        # Written elsewhere: this process's trie still counts it
+        Category.objects.filter(id=shared.id).update(is_public=False)
+        self.assertEqual(self.tag_suggest.get_tag_trie().suggest('sec'), [('Secret', 1)])
+        self.assertEqual(self.client.get('/api/tags/suggest/?prefix=sec').json(), [])
+    
+    def test_lookup_latency(self):
+        """Test that p99 lookup latency is far below 5 ms with many tags"""
+        import random
+        import string
+        import time
+        rng = random.Random(1)
+        trie = self.tag_suggest.TagTrie()
+        names = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(5000)]
+        for tag_id, name in enumerate(names):
+            trie.set(tag_id, name, name, rng.randint(1, 100))
+        
+        latencies = []
+        for _ in range(1000):
+            prefix = rng.choice(names)[:rng.randint(0, 3)]
+            started = time.perf_counter()
+            trie.suggest(prefix)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        self.assertLess(latencies[989] * 1000, 5)
+
+class UserSearchTests(TestCase):
+    """Test indexed user prefix search"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+        self.ash = User.objects.create_user(
+            username='ash.ketchum@example.com', email='ash.ketchum@example.com',
+            password='pw', first_name='Ash', last_name='Ketchum'
+        )
+        self.ash.profile.display_name = 'Pallet Trainer'
+        self.ash.profile.save()
+        self.misty = User.objects.create_user(
+            username='misty', email='misty@cerulean.com', password='pw', first_name='Misty'
+        )
+    
+    def test_terms_follow_profile_changes(self):
+        """Test that search terms are kept current when names change"""
+        from api.models import UserSearchTerm
+        terms = set(UserSearchTerm.objects.filter(user=self.ash).values_list('term', flat=True))
+        self.assertTrue({'ash', 'ketchum', 'pallet', 'trainer', 'ash.ketchum@example.com'} <= terms)
+        self.assertNotIn('example', terms)
+        
+        self.ash.profile.display_name = 'Champion'
+        self.ash.profile.save()
+        terms = set(UserSearchTerm.objects.filter(user=self.ash).values_list('term', flat=True))
+        self.assertIn('champion', terms)
+        self.assertNotIn('pallet', terms)
+    
+    @patch('api.views.generate_presigned_urls', return_value={})
+    def test_prefix_search(self, mock_batch):
+        """Test that every query word must prefix-match and results are lean"""
+        response = self.client.get('/api/users/search/?q=Pal')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{
+            'id': self.ash.id,
+            'username': 'ash.ketchum@example.com',
+            'first_name': 'Ash',
+            'last_name': 'Ketchum',
+            'display_name': 'Pallet Trainer',
+            'profile_picture_url': None,
+        }])
+        self.assertEqual([u['id'] for u in self.client.get('/api/users/search/?q=ash train').json()], [self.ash.id])
+        self.assertEqual(self.client.get('/api/users/search/?q=ash misty').json(), [])
+        self.assertEqual(self.client.get('/api/users/search/?q=allet').json(), [])
+        self.assertEqual(self.client.get('/api/users/search/?q=').json(), [])
+    
+    @patch('api.views.generate_presigned_urls', return_value={})
+    def test_pagination_and_cache(self, mock_batch):
+        """Test that pages follow the Link header and repeated queries skip the database"""
+        response = self.client.get('/api/users/search/?q=m&page_size=1')
+        self.assertEqual([u['username'] for u in response.json()], ['misty'])
+        self.assertNotIn('Link', response)
+        
+        response = self.client.get('/api/users/search/?q=t&page_size=1')
+        self.assertEqual([u['username'] for u in response.json()], ['ash.ketchum@example.com'])
+        next_url = response['Link'].split('>')[0].lstrip('<')
+        self.assertEqual([u['username'] for u in self.client.get(next_url).json()], ['testuser'])
+        
+        with self.assertNumQueries(2):  # session and user lookups only
+            self.client.get('/api/users/search/?q=t&page_size=1')
+
+class ProfileStatsCounterTests(TestCase):
+    """Test the materialized ProfileStats counters"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Cards', user=self.user)
+        self.wishlist = Category.objects.create(name='Wants', user=self.user, is_wishlist=True)
+    
+    def stats(self, user=None):
+        stats = ProfileStats.objects.get(user=user or self.user)
+        return stats.total_collections, stats.total_items, stats.total_value
+    
+    def add_image(self, category=None, valuation=None, **kwargs):
+        return Image.objects.create(
+            title='Card', path=f'p/{Image.objects.count()}.jpg',
+            category=category or self.category, valuation=valuation, **kwargs
+        )
+    
+    def test_image_writes_move_counters(self):
+        """Test that creates, edits, wishlist transfers and deletes adjust the counters"""
+        from decimal import Decimal
+        image = self.add_image(valuation=Decimal('10.50'))
+        wanted = self.add_image(valuation=Decimal('99.00'), is_wishlist=True)
+        self.add_image(self.wishlist, valuation=Decimal('5.00'))
+        self.assertEqual(self.stats(), (1, 1, Decimal('10.50')))
+        
+        image.valuation = Decimal('20.00')
+        image.save()
+        wanted.is_wishlist = False
+        wanted.save()
+        self.assertEqual(self.stats(), (1, 2, Decimal('119.00')))
+        
+        image.category = self.wishlist
+        image.save()
+        self.assertEqual(self.stats(), (1, 1, Decimal('99.00')))
+        
+        wanted.delete()
+        self.assertEqual(self.stats(), (1, 0, Decimal('0')))
+        
+        response = self.client.get(reverse('api:profile-stats'))
+        self.assertEqual(response.json(), {'totalValue': 0.0, 'totalCollections': 1, 'totalItems': 0})
+    
+    def test_category_writes_move_counters(self):
+        """Test that wishlist flips, ownership changes and deletes carry the category's images"""
+        from decimal import Decimal
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        self.add_image(valuation=Decimal('7.00'))
+        self.add_image(valuation=Decimal('3.00'))
+        
+        self.category.is_wishlist = True
+        self.category.save()
+        self.assertEqual(self.stats(), (0, 0, Decimal('0')))
+        self.category.is_wishlist = False
+        self.category.save()
+        self.assertEqual(self.stats(), (1, 2, Decimal('10.00')))
+        
+        self.category.user = other
+        self.category.save()
+        self.assertEqual(self.stats(), (0, 0, Decimal('0')))
+        self.assertEqual(self.stats(other), (1, 2, Decimal('10.00')))
+        
+        self.category.delete()
+        self.assertEqual(self.stats(other), (0, 0, Decimal('0')))
+        other.delete()
+        self.assertFalse(ProfileStats.objects.filter(user_id=other.id).exists())
+    
+    def test_bulk_delete_writes_once(self):
+        """Test that bulk deletes write one counter update per user"""
+        from decimal import Decimal
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        images = [self.add_image(valuation=Decimal('1.00')) for _ in range(5)]
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/bulk-delete-images/',
+                {'image_ids': [image.id for image in images[:4]]},
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stats(), (1, 1, Decimal('1.00')))
+        stats_updates = [q for q in queries.captured_queries if 'UPDATE "api_profilestats"' in q['sql']]
+        self.assertEqual(len(stats_updates), 1)
+    
+    def test_recompute_command_repairs_drift(self):
+        """Test that the command finds and fixes counters changed behind the model layer"""
+        from decimal import Decimal
+        from io import StringIO
+        from django.core.management import call_command
+        self.add_image(valuation=Decimal('4.00'))
+        Image.objects.update(valuation=Decimal('6.00'))
+        ProfileStats.objects.filter(user=self.user).delete()
+        
+        out = StringIO()
+        call_command('recompute_profile_stats', dry_run=True, stdout=out)
+        self.assertIn('found 1', out.getvalue())
+        self.assertFalse(ProfileStats.objects.filter(user=self.user).exists())
+        
+        call_command('recompute_profile_stats', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(), (1, 1, Decimal('6.00')))
+    
+    def test_recompute_command_accepts_negative_months(self):
+        """Test that a month with a negative total is not reported as drift on every run"""
+        from decimal import Decimal
+        from io import StringIO
+        from django.core.management import call_command
+        from api.models import MonthlySpending
+        self.add_image(valuation=Decimal('-5.00'))
+        self.assertTrue(MonthlySpending.objects.filter(user=self.user, amount=Decimal('-5.00')).exists())
+        
+        out = StringIO()
+        call_command('recompute_profile_stats', stdout=out)
+        self.assertIn('repaired 0', out.getvalue())
+
+class FinancialAggregationTests(TestCase):
+    """Test the SQL-side financial aggregates and the MonthlySpending rollup"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Cards', user=self.user)
+        self.financial_info = FinancialInfo.objects.get(user=self.user)
+    
+    def add_image(self, valuation, category=None, **kwargs):
+        return Image.objects.create(
+            title='Card', path=f'p/{Image.objects.count()}.jpg',
+            category=category or self.category, valuation=valuation, **kwargs
+        )
+    
+    def test_monthly_spending_is_exact_and_grouped(self):
+        """Test that months are summed in SQL with Decimal precision"""
+        from datetime import timedelta
+        from decimal import Decimal
+        from django.utils import timezone
+        from api.stats import month_of
+        self.add_image(Decimal('0.10'))
+        self.add_image(Decimal('0.20'))
+        old = self.add_image(Decimal('5.00'))
+        self.add_image(Decimal('9.00'), is_wishlist=True)
+        ancient = self.add_image(Decimal('7.00'))
+        last_month = month_of(timezone.now()) - timedelta(days=1)
+        Image.objects.filter(id=old.id).update(uploaded_at=timezone.now().replace(year=last_month.year, month=last_month.month, day=1))
+        Image.objects.filter(id=ancient.id).update(uploaded_at=timezone.now() - timedelta(days=400))
+        
+        with self.assertNumQueries(2):
+            spending = self.financial_info.get_monthly_spending()
+        self.assertEqual(spending, [
+            {'month': last_month.strftime('%Y-%m'), 'amount': Decimal('5.00')},
+            {'month': timezone.now().strftime('%Y-%m'), 'amount': Decimal('0.30')},
+        ])
+    
+    def test_window_and_negative_valuations_match_the_rollup(self):
+        """Test that both paths cover the last 365 days and count negative valuations"""
+        from datetime import timedelta
+        from decimal import Decimal
+        from django.utils import timezone
+        from api.stats import month_of, recompute_monthly_spending
+        inside = self.add_image(Decimal('3.00'))
+        outside = self.add_image(Decimal('50.00'))
+        self.add_image(Decimal('-2.00'))
+        self.add_image(Decimal('4.00'))
+        Image.objects.filter(id=inside.id).update(uploaded_at=timezone.now() - timedelta(days=364))
+        Image.objects.filter(id=outside.id).update(uploaded_at=timezone.now() - timedelta(days=366))
+        # update() bypasses the receivers
+        recompute_monthly_spending([self.user.id])
+        
+        direct = self.financial_info.get_monthly_spending()
+        self.assertEqual(direct, [
+            {'month': month_of(timezone.now() - timedelta(days=364)).strftime('%Y-%m'), 'amount': Decimal('3.00')},
+            {'month': timezone.now().strftime('%Y-%m'), 'amount': Decimal('2.00')},
+        ])
+        with self.settings(FINANCIAL_ROLLUP_MIN_ITEMS=0):
+            self.assertEqual(self.financial_info.get_monthly_spending(), direct)
+    
+    def test_collection_prices_in_one_query(self):
+        """Test that collection prices are summed in SQL, empty collections included"""
+        from decimal import Decimal
+        empty = Category.objects.create(name='Empty', user=self.user)
+        Category.objects.create(name='Wants', user=self.user, is_wishlist=True)
+        self.add_image(Decimal('1.25'))
+        self.add_image(Decimal('2.50'))
+        self.add_image(None)
+        
+        with self.assertNumQueries(1):
+            prices = self.financial_info.get_collection_prices()
+        self.assertEqual(prices, [
+            {'collectionName': 'Cards', 'price': Decimal('3.75')},
+            {'collectionName': empty.name, 'price': Decimal('0')},
+        ])
+    
+    def test_rollup_tracks_image_writes(self):
+        """Test that the rollup follows writes and matches the direct aggregate"""
+        from decimal import Decimal
+        from api.models import MonthlySpending
+        image = self.add_image(Decimal('10.00'))
+        self.add_image(Decimal('4.00'))
+        image.valuation = Decimal('12.00')
+        image.save()
+        wants = Category.objects.create(name='Wants', user=self.user, is_wishlist=True)
+        self.add_image(Decimal('100.00'), category=wants)
+        
+        direct = self.financial_info.get_monthly_spending()
+        with self.settings(FINANCIAL_ROLLUP_MIN_ITEMS=0):
+            self.assertEqual(self.financial_info.get_monthly_spending(), direct)
+        self.assertEqual(direct[0]['amount'], Decimal('16.00'))
+        
+        wants.is_wishlist = False
+        wants.save()
+        image.delete()
+        self.assertEqual(MonthlySpending.objects.get(user=self.user).amount, Decimal('104.00'))
+        
+        self.category.delete()
+        wants.delete()
+        self.assertEqual(MonthlySpending.objects.get(user=self.user).amount, Decimal('0'))
+        with self.settings(FINANCIAL_ROLLUP_MIN_ITEMS=0):
+            self.assertEqual(self.financial_info.get_monthly_spending(), [])
+
+class DashboardTests(TestCase):
+    """Test the batched, cached dashboard endpoint"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Cards', user=self.user)
+        Image.objects.create(title='Card', path='p/1.jpg', category=self.category, valuation=100)
+        Goal.objects.create(user_profile=self.user.profile, monthly_spending=250)
+    
+    def test_dashboard_matches_separate_endpoints(self):
+        """Test that one response carries the financial data, stats and goals"""
+        data = self.client.get(reverse('api:dashboard')).json()
+        financial = self.client.get(reverse('api:financial-data')).json()
+        stats = self.client.get(reverse('api:profile-stats')).json()
+        
+        for key in ('totalSpending', 'collections', 'monthlySpending'):
+            self.assertEqual(data[key], financial[key])
+        for key in ('totalValue', 'totalCollections', 'totalItems'):
+            self.assertEqual(data[key], stats[key])
+        self.assertEqual([float(goal['monthly_spending']) for goal in data['goals']], [250.0])
+    
+    def test_cache_is_invalidated_by_writes(self):
+        """Test that repeated loads are cached until an item, collection or goal changes"""
+        self.client.get(reverse('api:dashboard'))
+        with self.assertNumQueries(2):  # session and user lookups only
+            self.client.get(reverse('api:dashboard'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Image.objects.create(title='Card', path='p/2.jpg', category=self.category, valuation=50)
+        self.assertEqual(self.client.get(reverse('api:dashboard')).json()['totalItems'], 2)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Renamed'
+            self.category.save()
+        self.assertEqual(self.client.get(reverse('api:dashboard')).json()['collections'][0]['collectionName'], 'Renamed')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Goal.objects.all().delete()
+        self.assertEqual(self.client.get(reverse('api:dashboard')).json()['goals'], [])
+    
+    def test_cache_follows_the_response_cache_switch(self):
+        """Test that the dashboard is built fresh whenever the response cache is off"""
+        from django.core.cache import cache
+        for overrides in ({'RESPONSE_CACHE_TTL': 0}, {'WEB_CONCURRENCY': 4}):
+            cache.clear()
+            with self.settings(**overrides):
+                self.client.get(reverse('api:dashboard'))
+                # Written elsewhere: no generation bump reaches this process
+                Goal.objects.update(monthly_spending=300)
+                goals = self.client.get(reverse('api:dashboard')).json()['goals']
+                self.assertEqual([float(goal['monthly_spending']) for goal in goals], [300.0])
+                Goal.objects.update(monthly_spending=250)
+
+@patch('api.serializers.generate_presigned_urls', return_value={})
+@patch('api.serializers.generate_presigned_url', return_value='https://signed')
+class ResponseCacheTests(TestCase):
+    """Test the generation-keyed response cache"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from api.response_cache import reset_response_cache_metrics
+        cache.clear()
+        reset_response_cache_metrics()
+        self.client = Client()
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='testpassword')
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Cards', user=self.user)
+        self.image = Image.objects.create(title='Card', path='p/1.jpg', category=self.category, valuation=100)
+
+    def test_category_list_is_cached_until_a_write(self, *mocks):
+        """Test that repeated lists skip the database and writes make them stale"""
+        self.client.get('/api/categories/')
+        with self.assertNumQueries(2):  # session and user lookups only
+            response = self.client.get('/api/categories/')
+        self.assertEqual([c['name'] for c in response.json()], ['Cards'])
+
+        self.client.post('/api/categories/', {'name': 'Coins'})
+        self.assertEqual([c['name'] for c in self.client.get('/api/categories/').json()], ['Coins', 'Cards'])
+
+        Image.objects.create(title='Coin', path='p/2.jpg', category=self.category, valuation=5)
+        self.assertEqual(self.client.get('/api/profiles/stats/').json()['totalItems'], 2)
+
+    def test_moved_image_makes_both_collections_stale(self, *mocks):
+        """Test that moving an item refreshes the collection it leaves and the one it joins"""
+        target = Category.objects.create(name='Binder', user=self.user)
+        self.assertEqual(len(self.client.get(f'/api/categories/{self.category.id}/images/').json()), 1)
+        self.assertEqual(len(self.client.get(f'/api/categories/{target.id}/images/').json()), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.image.category = target
+            self.image.save()
+        self.assertEqual(len(self.client.get(f'/api/categories/{self.category.id}/images/').json()), 0)
+        self.assertEqual(len(self.client.get(f'/api/categories/{target.id}/images/').json()), 1)
+
+    def test_profile_is_cached_per_viewer(self, *mocks):
+        """Test that follows refresh the profile and viewers never see each other's is_following"""
+        self.assertFalse(self.client.get(f'/api/profiles/{self.other.id}/').json()['is_following'])
+        self.client.post(reverse('api:follow-user'), {'user_id': self.other.id})
+        data = self.client.get(f'/api/profiles/{self.other.id}/').json()
+        self.assertTrue(data['is_following'])
+        self.assertEqual(data['follower_count'], 1)
+
+        self.client.force_login(self.other)
+        self.assertFalse(self.client.get(f'/api/profiles/{self.other.id}/').json()['is_following'])
+
+    def test_locmem_cache_is_bypassed_with_several_workers(self, *mocks):
+        """Test that per-process LocMemCache counters never serve stale lists across workers"""
+        from api.response_cache import response_cache_enabled, response_cache_metrics
+        self.assertTrue(response_cache_enabled())
+        with self.settings(WEB_CONCURRENCY=4):
+            self.assertFalse(response_cache_enabled())
+            self.client.get('/api/categories/')
+            self.client.get('/api/categories/')
+        metrics = response_cache_metrics()
+        self.assertEqual((metrics['hits'], metrics['misses']), (0, 0))
+        with self.settings(WEB_CONCURRENCY=4, CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        }):
+            self.assertTrue(response_cache_enabled())
+
+    def test_hit_rate_metrics(self, *mocks):
+        """Test that hits and misses are counted per endpoint and shown to staff only"""
+        for _ in range(3):
+            self.client.get(reverse('api:financial-data'))
+        self.assertEqual(self.client.get(reverse('api:response-cache-stats')).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        metrics = self.client.get(reverse('api:response-cache-stats')).json()
+        self.assertEqual(metrics['endpoints']['financial-data'], {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
+
+class HotQueryIndexTests(TestCase):
+    """Test the composite indexes on the hot filter paths"""
+
+    def test_hot_queries_use_composite_indexes(self):
+        """Test that the stats and spending aggregates are served by the new indexes"""
+        from api.management.commands.explain_hot_queries import analyze_tables, hot_queries, seed
+        user_id = seed(users=5, categories_per_user=3, images_per_category=4)
+        analyze_tables()
+        plans = {label: queryset.explain() for label, queryset in hot_queries(user_id)}
+
+        self.assertEqual(len(plans), 6)
+        if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+            self.assertIn('category_user_wishlist_idx', plans['collection count'])
+            self.assertIn('image_cat_wishlist_upload_idx', plans['profile stats totals'])
+
 class CategorySerializerTests(TestCase):
     """Test the Category serializers"""
     
@@ -1028,6 +3019,22 @@ class CategorySerializerTests(TestCase):
         self.assertEqual(len(data['images']), 1)
         self.assertEqual(data['images'][0]['title'], 'Test Image')
     
+    @patch('api.serializers.generate_presigned_urls')
+    def test_category_list_presigns_in_one_batch(self, mock_generate_urls):
+        """Test that listing categories signs every key in a single batch"""
+        self.category.placeholder_image = 'test_path/placeholder.jpg'
+        self.category.save()
+        other_category = Category.objects.create(name='Other Category', user=self.user)
+        Image.objects.create(title='Other Image', path='test_path/other.jpg', category=other_category)
+        
+        CategorySerializer(Category.objects.filter(user=self.user), many=True).data
+        
+        mock_generate_urls.assert_called_once()
+        self.assertCountEqual(
+            [key for key in mock_generate_urls.call_args[0][0] if key],
+            ['test_path/placeholder.jpg', 'test_path/image.jpg', 'test_path/other.jpg']
+        )
+    
     def test_category_create_serializer(self):
         """Test the CategoryCreateSerializer"""
         # Prepare data for creation
@@ -0,0 +1,143 @@
+"""
+Resized derivatives (thumbnails and WebP variants) of uploaded images.
+
+Derivatives are stored next to the original under a `derivatives/` folder,
+e.g. user_1/Cards/abc.jpg -> user_1/Cards/derivatives/abc_w320.webp, and
+their keys are recorded on Image.derivatives as
+{"320": {"webp": "<key>", "jpeg": "<key>"}, ...}.
+"""
+import io
+import os
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+from django.conf import settings
+from .utils import get_s3_client
+
+# Pillow format name -> (file extension, content type)
+DERIVATIVE_FORMATS = {
+    'webp': ('webp', 'image/webp'),
+    'jpeg': ('jpg', 'image/jpeg'),
+    'png': ('png', 'image/png'),
+}
+
+def derivative_widths():
+    return sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', [320, 640, 1280]))
+
+def derivatives_mode():
+    """
+    'upload' renders derivatives during the upload request, 'lazy' on a
+    worker queued by the first /api/media/<id>/?w= request, 'off' disables
+    them
+    """
+    return getattr(settings, 'IMAGE_DERIVATIVES_MODE', 'upload')
+
+def derivative_key(path, width, fmt):
+    folder, filename = os.path.split(path)
+    stem = os.path.splitext(filename)[0]
+    ext = DERIVATIVE_FORMATS[fmt][0]
+    return f"{folder}/derivatives/{stem}_w{width}.{ext}"
+
+def render_derivatives(source):
+    """
+    Renders every configured width smaller than the source image
+
+    Args:
+        source: A file-like object holding the original image
+
+    Returns:
+        List of (width, format, bytes) tuples, empty if the source
+        could not be decoded
+    """
+    rendered = []
+    try:
+        with PILImage.open(source) as original:
+            original = ImageOps.exif_transpose(original)
+            has_alpha = original.mode in ('RGBA', 'LA') or (
+                original.mode == 'P' and 'transparency' in original.info
+            )
+            fallback_format = 'png' if has_alpha else 'jpeg'
+            original = original.convert('RGBA' if has_alpha else 'RGB')
+
+            for width in derivative_widths():
+                if width >= original.width:
+                    continue
+                height = max(1, round(original.height * width / original.width))
+                resized = original.resize((width, height), PILImage.LANCZOS)
+
+                for fmt in ('webp', fallback_format):
+                    buffer = io.BytesIO()
+                    if fmt == 'png':
+                        resized.save(buffer, format='PNG', optimize=True)
+                    else:
+                        resized.save(buffer, format=fmt.upper(), quality=82)
+                    rendered.append((width, fmt, buffer.getvalue()))
+    except (UnidentifiedImageError, PILImage.DecompressionBombError, OSError, ValueError) as e:
+        print(f"Could not render derivatives: {str(e)}")
+        return []
+    finally:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+    return rendered
+
+def store_derivatives(image, rendered):
+    """
+    Uploads rendered derivatives next to image.path and records their keys
+
+    Returns:
+        The derivatives map saved on the image
+    """
+    client = get_s3_client()
+    derivatives = {}
+    for width, fmt, data in rendered:
+        key = derivative_key(image.path, width, fmt)
+        try:
+            client.put_object(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=key,
+                Body=data,
+                ContentType=DERIVATIVE_FORMATS[fmt][1],
+                # The key changes whenever the original does
+                CacheControl='public, max-age=31536000, immutable'
+            )
+        except Exception as e:
+            print(f"Error uploading derivative {key}: {str(e)}")
+            continue
+        derivatives.setdefault(str(width), {})[fmt] = key
+
+    image.set_derivatives(derivatives)
+    image.save(update_fields=['derivatives'])
+    return derivatives
+
+def create_derivatives(image, source=None):
+    """
+    Renders and stores derivatives for an image. Downloads the original
+    from S3 when no source file is given.
+
+    An original that cannot be decoded is recorded with an empty map, so it
+    is never rendered again. A failed download records nothing.
+    """
+    if source is None:
+        try:
+            response = get_s3_client().get_object(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=image.path
+            )
+            source = io.BytesIO(response['Body'].read())
+        except Exception as e:
+            print(f"Error downloading original for derivatives: {str(e)}")
+            return {}
+    return store_derivatives(image, render_derivatives(source))
+
+def pick_derivative(image, width, fmt):
+    """
+    Returns the key of the smallest derivative at least `width` wide in
+    format `fmt`, or the original path if none is large enough
+    """
+    derivatives = image.get_derivatives()
+    for candidate in sorted(int(w) for w in derivatives):
+        if candidate >= width:
+            formats = derivatives[str(candidate)]
+            if fmt in formats:
+                return formats[fmt]
+            # Fall back to the JPEG/PNG variant, which every browser can show
+            return next((key for name, key in formats.items() if name != 'webp'), formats.get('webp'))
+    return image.path
@@ -13,7 +13,13 @@ from .views import (
     test_auth,
     financial_data,
     profile_stats,
+    dashboard,
+    response_cache_stats,
     search_by_tag,  # Added import for search_by_tag
+    full_text_search,
+    tag_suggestions,
+    user_search,
+    media_redirect,
 )
 from .auth import (
     GoogleLoginView,
@@ -61,7 +67,9 @@ urlpatterns = [
     path('profiles/<int:pk>/followers/', UserProfileViewSet.as_view({'get': 'followers'}), name='user-followers'),
     path('profiles/<int:pk>/following/', UserProfileViewSet.as_view({'get': 'following'}), name='user-following'),
     path('profiles/stats/', profile_stats, name='profile-stats'),
+    path('dashboard/', dashboard, name='dashboard'),
     path('financial-data/', financial_data, name='financial-data'),
+    path('response-cache/stats/', response_cache_stats, name='response-cache-stats'),
     path('profiles/<int:pk>/goals/', UserProfileViewSet.as_view({'get': 'list_goal', 'post': 'create_goal'})),
     # path('profiles/goals/', UserGoalsViewSet.as_view({'get': 'list_goal', 'post': 'create_goal'})),
 
@@ -85,4 +93,9 @@ urlpatterns = [
     # for goals url
     path('profiles/<int:pk>/goals/', UserProfileViewSet.as_view({'get': 'list_goal', 'post': 'create_goal'}), name='userprofile-goals'),
     path('search/by-tag/', search_by_tag, name='search-by-tag'),
+    path('search/', full_text_search, name='search'),
+    path('tags/suggest/', tag_suggestions, name='tag-suggest'),
+    path('users/search/', user_search, name='user-search'),
+    # Stable, browser-cacheable image URLs
+    path('media/<int:image_id>/', media_redirect, name='media-redirect'),
 ]
\ No newline at end of file
@@ -1,18 +1,119 @@
 import os
+import re
 import uuid
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, urlsplit
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.auth import S3SigV4QueryAuth
+from botocore.awsrequest import AWSRequest
+from botocore.config import Config
 from django.conf import settings
+from django.db import transaction
+
+class S3ClientManager:
+    """
+    Builds and hands out a single process-wide S3 client.
+
+    botocore clients are thread-safe, so one client (and its connection pool)
+    is shared by every request thread instead of being rebuilt per call. The
+    client is rebuilt only when the relevant settings change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._client_key = None
+        self._session = None
+        self._session_key = None
+
+    def _settings_key(self):
+        return (
+            settings.AWS_ACCESS_KEY_ID,
+            settings.AWS_SECRET_ACCESS_KEY,
+            settings.AWS_S3_REGION_NAME,
+            getattr(settings, 'AWS_S3_MAX_POOL_CONNECTIONS', 50),
+            getattr(settings, 'AWS_S3_TCP_KEEPALIVE', True),
+            getattr(settings, 'AWS_S3_RETRY_MODE', 'standard'),
+            getattr(settings, 'AWS_S3_MAX_ATTEMPTS', 3),
+            getattr(settings, 'AWS_S3_CONNECT_TIMEOUT', 5),
+            getattr(settings, 'AWS_S3_READ_TIMEOUT', 30),
+        )
+
+    def build_config(self):
+        """
+        Returns the botocore Config used for the shared client
+        """
+        return Config(
+            max_pool_connections=getattr(settings, 'AWS_S3_MAX_POOL_CONNECTIONS', 50),
+            tcp_keepalive=getattr(settings, 'AWS_S3_TCP_KEEPALIVE', True),
+            retries={
+                'mode': getattr(settings, 'AWS_S3_RETRY_MODE', 'standard'),
+                'max_attempts': getattr(settings, 'AWS_S3_MAX_ATTEMPTS', 3),
+            },
+            connect_timeout=getattr(settings, 'AWS_S3_CONNECT_TIMEOUT', 5),
+            read_timeout=getattr(settings, 'AWS_S3_READ_TIMEOUT', 30),
+        )
+
+    def get_client(self):
+        key = self._settings_key()
+        client = self._client
+        if client is not None and self._client_key == key:
+            return client
+
+        with self._lock:
+            # Another thread may have built the client while we waited
+            if self._client is None or self._client_key != key:
+                self._client = boto3.client(
+                    's3',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_S3_REGION_NAME,
+                    config=self.build_config()
+                )
+                self._client_key = key
+            return self._client
+
+    def get_credentials(self):
+        """
+        Returns frozen credentials for the settings the shared client is
+        built from, resolved by a boto3 Session (explicit keys, then the
+        default chain), or None if there are none
+        """
+        key = self._settings_key()
+        with self._lock:
+            if self._session is None or self._session_key != key:
+                self._session = boto3.Session(
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_S3_REGION_NAME
+                )
+                self._session_key = key
+            session = self._session
+        credentials = session.get_credentials()
+        return credentials.get_frozen_credentials() if credentials is not None else None
+
+    def reset(self):
+        """
+        Drops the shared client so the next call builds a fresh one
+        """
+        with self._lock:
+            self._client = None
+            self._client_key = None
+            self._session = None
+            self._session_key = None
+
+s3_client_manager = S3ClientManager()
 
 def get_s3_client():
     """
-    Creates and returns an S3 client
+    Returns the shared, pooled S3 client
     """
-    return boto3.client(
-        's3',
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_S3_REGION_NAME
-    )
+    return s3_client_manager.get_client()
 
 def upload_file_to_s3(file, category_name, user_id=None):
     """Uploads a file to S3 bucket"""
@@ -64,10 +165,99 @@ def upload_file_to_s3(file, category_name, user_id=None):
         print(traceback.format_exc())
         return None
 
+class PresignedUrlCache:
+    """
+    Bounded LRU cache of presigned GET URLs keyed by S3 object key.
+
+    A cached URL is handed back only while it still has at least
+    PRESIGNED_URL_CACHE_MIN_REMAINING seconds of validity left; otherwise
+    the key is re-signed. Entries must be invalidated when the object is
+    deleted or moved.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # object_key -> (url, expires_at)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'PRESIGNED_URL_CACHE_MAX_ENTRIES', 10000)
+
+    @property
+    def min_remaining(self):
+        return getattr(settings, 'PRESIGNED_URL_CACHE_MIN_REMAINING', 900)
+
+    def get(self, object_key, expiration=3600):
+        """
+        Returns a cached URL for object_key, or None on a miss
+        """
+        entry = self.get_entry(object_key, expiration)
+        return entry[0] if entry else None
+
+    def get_entry(self, object_key, expiration=3600):
+        """
+        Returns a cached (url, expires_at) pair for object_key, or None on a miss
+        """
+        min_remaining = min(self.min_remaining, expiration)
+        with self._lock:
+            entry = self._entries.get(object_key)
+            if entry is not None:
+                url, expires_at = entry
+                remaining = expires_at - time.time()
+                # Never hand out a URL that outlives the expiry the caller asked for
+                if min_remaining <= remaining <= expiration:
+                    self._entries.move_to_end(object_key)
+                    self.hits += 1
+                    return entry
+                del self._entries[object_key]
+            self.misses += 1
+            return None
+
+    def set(self, object_key, url, expiration=3600):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[object_key] = (url, time.time() + expiration)
+            self._entries.move_to_end(object_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, object_key):
+        with self._lock:
+            self._entries.pop(object_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+presigned_url_cache = PresignedUrlCache()
+
 def generate_presigned_url(object_key, expiration=3600):
     """
     Generate a presigned URL for an S3 object
     
+    URLs are served from presigned_url_cache while they are still valid
+    for long enough.
+    
     Args:
         object_key: The S3 object key
         expiration: URL expiration time in seconds (default: 1 hour)
@@ -75,20 +265,120 @@ def generate_presigned_url(object_key, expiration=3600):
     Returns:
         Presigned URL string or None if error
     """
+    url, _ = generate_presigned_url_with_expiry(object_key, expiration)
+    return url
+
+def generate_presigned_url_with_expiry(object_key, expiration=3600):
+    """
+    Same as generate_presigned_url, but also returns when the URL expires
+    
+    Returns:
+        (url, expires_at) where expires_at is a unix timestamp,
+        or (None, None) if error
+    """
+    entry = presigned_url_cache.get_entry(object_key, expiration)
+    if entry:
+        return entry
+
     try:
-        client = get_s3_client()
-        url = client.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
-                'Key': object_key
-            },
-            ExpiresIn=expiration
-        )
-        return url
+        url = _presign_one(object_key, expiration)
+        return url, time.time() + expiration
     except Exception as e:
         print(f"Error generating presigned URL: {str(e)}")
-        return None
+        return None, None
+
+def _presign_one(object_key, expiration):
+    client = get_s3_client()
+    url = client.generate_presigned_url(
+        'get_object',
+        Params={
+            'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+            'Key': object_key
+        },
+        ExpiresIn=expiration
+    )
+    presigned_url_cache.set(object_key, url, expiration)
+    return url
+
+def _sign_get_urls(object_keys, expiration):
+    """
+    Presigns GET URLs for many keys with botocore's SigV4 query signer,
+    skipping the client's per-call request pipeline. The URLs are
+    virtual-hosted on the client's regional endpoint, as an s3v4 client
+    would build them.
+    """
+    credentials = s3_client_manager.get_credentials()
+    if credentials is None:
+        raise ValueError("No AWS credentials available")
+
+    bucket = settings.AWS_STORAGE_BUCKET_NAME
+    if not bucket or not re.fullmatch(r'[a-z0-9][a-z0-9-]{1,61}[a-z0-9]', bucket):
+        raise ValueError(f"Bucket {bucket!r} cannot be addressed virtual-host style")
+
+    client = get_s3_client()
+    host = f"{bucket}.{urlsplit(client.meta.endpoint_url).netloc}"
+    signer = S3SigV4QueryAuth(credentials, 's3', client.meta.region_name, expires=expiration)
+
+    urls = {}
+    for object_key in object_keys:
+        request = AWSRequest(method='GET', url=f"https://{host}/{quote(object_key, safe='/-_.~')}")
+        signer.add_auth(request)
+        urls[object_key] = request.url
+    return urls
+
+def generate_presigned_urls(object_keys, expiration=3600):
+    """
+    Generate presigned URLs for many S3 objects in one pass
+    
+    Keys already in presigned_url_cache are served from it; the rest are
+    signed together by botocore's SigV4 query signer and cached.
+    
+    Args:
+        object_keys: Iterable of S3 object keys (empty keys are skipped)
+        expiration: URL expiration time in seconds (default: 1 hour)
+        
+    Returns:
+        Dict mapping each object key to its URL (None if signing failed)
+    """
+    urls = {}
+    missing = []
+    for object_key in object_keys:
+        if not object_key or object_key in urls:
+            continue
+        urls[object_key] = presigned_url_cache.get(object_key, expiration)
+        if urls[object_key] is None:
+            missing.append(object_key)
+
+    if not missing:
+        return urls
+
+    try:
+        signed = _sign_get_urls(missing, expiration)
+        for object_key, url in signed.items():
+            presigned_url_cache.set(object_key, url, expiration)
+        urls.update(signed)
+    except Exception as e:
+        print(f"Batch presigning unavailable, signing one at a time: {str(e)}")
+        for object_key in missing:
+            try:
+                urls[object_key] = _presign_one(object_key, expiration)
+            except Exception as sign_error:
+                print(f"Error generating presigned URL: {str(sign_error)}")
+    return urls
+
+def list_s3_objects(prefix):
+    """
+    Lists every object under a prefix, following pagination
+    
+    Raises:
+        botocore exceptions if the listing fails
+    """
+    client = get_s3_client()
+    paginator = client.get_paginator('list_objects_v2')
+    objects = []
+    for page in paginator.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=prefix):
+        objects.extend(page.get('Contents', []))
+    return objects
 
 def list_files_in_category(category_name):
     """
@@ -126,11 +416,17 @@ def delete_s3_file(object_key):
         True if successful, False otherwise
     """
     try:
+        # Shared content-addressed objects stay while anything still uses them
+        if count_s3_references(object_key) or pinned_s3_keys([object_key]):
+            print(f"Keeping {object_key}, it is still referenced")
+            return True
+        
         client = get_s3_client()
         client.delete_object(
             Bucket=settings.AWS_STORAGE_BUCKET_NAME,
             Key=object_key
         )
+        presigned_url_cache.invalidate(object_key)
         return True
     except Exception as e:
         print(f"Error deleting S3 file: {str(e)}")
@@ -231,6 +527,12 @@ def delete_s3_folder(prefix, user_id=None, include_prefix=False):
                     objects.append({'Key': obj['Key']})
                     print(f"Found object to delete: {obj['Key']}")
         
+        # Skip shared content-addressed objects that are still referenced
+        referenced = referenced_s3_keys([obj['Key'] for obj in objects])
+        if referenced:
+            print(f"Keeping {len(referenced)} objects that are still referenced")
+            objects = [obj for obj in objects if obj['Key'] not in referenced]
+        
         # If no objects found, return 0
         if not objects:
             print(f"No objects found with prefix: {full_prefix}")
@@ -246,6 +548,8 @@ def delete_s3_folder(prefix, user_id=None, include_prefix=False):
                 Bucket=settings.AWS_STORAGE_BUCKET_NAME,
                 Delete={'Objects': batch}
             )
+            for obj in batch:
+                presigned_url_cache.invalidate(obj['Key'])
             deleted_count += len(batch)
             print(f"Deleted batch of {len(batch)} objects")
         
@@ -264,33 +568,37 @@ def upload_file_to_s3(file, category_name, user_id=None, is_wishlist=False):
         print(f"DEBUG: User ID: {user_id}")
         print(f"DEBUG: Is wishlist: {is_wishlist}")
         
-        # Generate a unique filename
-        ext = os.path.splitext(file.name)[1]
-        unique_filename = f"{uuid.uuid4()}{ext}"
-        
         # Check user_id
         if not user_id:
             print("ERROR: User ID is required for uploads")
             return None
             
-        # Define the S3 path with user ID
-        if is_wishlist:
-            s3_path = f"user_{user_id}/{category_name}/wishlist/{unique_filename}"
+        client = get_s3_client()
+        
+        if getattr(settings, 'S3_CONTENT_ADDRESSED_UPLOADS', False):
+            # Identical bytes map to the same key, so re-uploads are free
+            s3_path = build_content_addressed_path(file, user_id)
+            pin_s3_object(s3_path)
+            if s3_object_exists(s3_path):
+                print(f"DEBUG: Reusing stored object: {s3_path}")
+                return s3_path
         else:
-            s3_path = f"user_{user_id}/{category_name}/{unique_filename}"
-            
+            # Define the S3 path with user ID
+            s3_path = build_s3_path(file.name, category_name, user_id, is_wishlist)
         print(f"DEBUG: Generated S3 path: {s3_path}")
         
-        # Upload to S3
-        client = get_s3_client()
+        # Upload to S3 (multipart and concurrent above the threshold)
+        started = time.monotonic()
         client.upload_fileobj(
             file,
             settings.AWS_STORAGE_BUCKET_NAME,
             s3_path,
             ExtraArgs={
                 'ContentType': file.content_type
-            }
+            },
+            Config=get_transfer_config()
         )
+        log_upload_metrics(s3_path, getattr(file, 'size', None), time.monotonic() - started)
         print(f"DEBUG: Successfully uploaded to S3 at path: {s3_path}")
         return s3_path
             
@@ -298,4 +606,193 @@ def upload_file_to_s3(file, category_name, user_id=None, is_wishlist=False):
         print(f"ERROR: General upload error: {str(e)}")
         import traceback
         print(traceback.format_exc())
+        return None
+
+def get_transfer_config():
+    """
+    Returns the s3transfer profile used for uploads, built from the
+    AWS_S3_MULTIPART_* / AWS_S3_MAX_CONCURRENCY / AWS_S3_MAX_BANDWIDTH settings
+    """
+    return TransferConfig(
+        multipart_threshold=getattr(settings, 'AWS_S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+        multipart_chunksize=getattr(settings, 'AWS_S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024),
+        max_concurrency=getattr(settings, 'AWS_S3_MAX_CONCURRENCY', 10),
+        max_bandwidth=getattr(settings, 'AWS_S3_MAX_BANDWIDTH', None),
+        use_threads=True
+    )
+
+def log_upload_metrics(object_key, size, elapsed):
+    """
+    Logs the latency and throughput of one upload
+    """
+    if size:
+        throughput = size / elapsed / (1024 * 1024) if elapsed > 0 else float('inf')
+        print(f"S3 upload {object_key}: {size} bytes in {elapsed * 1000:.0f} ms ({throughput:.2f} MiB/s)")
+    else:
+        print(f"S3 upload {object_key}: {elapsed * 1000:.0f} ms")
+
+def build_s3_path(filename, category_name, user_id, is_wishlist=False):
+    """
+    Builds a unique object key under the user's category folder
+    """
+    # Generate a unique filename
+    ext = os.path.splitext(filename)[1]
+    unique_filename = f"{uuid.uuid4()}{ext}"
+    
+    if is_wishlist:
+        return f"user_{user_id}/{category_name}/wishlist/{unique_filename}"
+    return f"user_{user_id}/{category_name}/{unique_filename}"
+
+CONTENT_ADDRESSED_KEY_RE = re.compile(r'^(user_\d+/cas/)(?:derivatives/)?([0-9a-f]{64})')
+
+def build_content_addressed_path(file, user_id):
+    """
+    Builds the key for a file from the SHA-256 of its contents, hashing
+    chunk by chunk so large files are never read into memory at once
+    """
+    digest = hashlib.sha256()
+    if hasattr(file, 'chunks'):
+        for chunk in file.chunks():
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    file.seek(0)
+    return f"user_{user_id}/cas/{digest.hexdigest()}"
+
+def is_content_addressed_key(object_key):
+    return bool(object_key and CONTENT_ADDRESSED_KEY_RE.match(object_key))
+
+def _content_addressed_original(object_key):
+    """Maps a content-addressed key (or one of its derivatives) to the original key"""
+    match = CONTENT_ADDRESSED_KEY_RE.match(object_key or '')
+    return f"{match.group(1)}{match.group(2)}" if match else None
+
+def count_s3_references(object_key):
+    """
+    Counts the images, category placeholders and profile pictures that use
+    a content-addressed object. Other keys belong to a single owner and
+    always count as unreferenced.
+    """
+    original = _content_addressed_original(object_key)
+    if not original:
+        return 0
+    
+    from .models import Image, Category, UserProfile
+    return (
+        Image.objects.filter(path=original).count()
+        + Category.objects.filter(placeholder_image=original).count()
+        + UserProfile.objects.filter(profile_picture=original).count()
+    )
+
+def referenced_s3_keys(object_keys):
+    """
+    Returns the subset of object_keys that are content-addressed and still
+    referenced, using one query per referencing table
+    """
+    originals = {key: _content_addressed_original(key) for key in object_keys}
+    candidates = {original for original in originals.values() if original}
+    if not candidates:
+        return set()
+    
+    from .models import Image, Category, UserProfile
+    referenced = set(Image.objects.filter(path__in=candidates).values_list('path', flat=True))
+    referenced |= set(Category.objects.filter(
+        placeholder_image__in=candidates
+    ).values_list('placeholder_image', flat=True))
+    referenced |= set(UserProfile.objects.filter(
+        profile_picture__in=candidates
+    ).values_list('profile_picture', flat=True))
+    return {key for key, original in originals.items() if original in referenced}
+
+def pin_s3_object(object_key):
+    """
+    Protects a content-addressed object from queued deletions before an
+    upload decides whether it still has to store the bytes
+    
+    The pin is committed while holding the locks on the key's pending
+    S3Deletion entries. A drain that is deleting the object right now holds
+    those locks, so it finishes first and the existence check that follows
+    misses and uploads the object again. Any later drain sees the pin and
+    defers the deletion until the pin expires, by which time the row that
+    references the object exists.
+    """
+    from .models import S3Deletion, S3UploadPin
+    with transaction.atomic():
+        S3UploadPin.objects.create(object_key=_content_addressed_original(object_key) or object_key)
+        list(S3Deletion.objects.select_for_update().filter(object_key=object_key).values_list('id', flat=True))
+
+def pinned_s3_keys(object_keys):
+    """
+    Maps the keys in object_keys (originals or their derivatives) that are
+    pinned by an upload to the time their newest pin expires
+    """
+    originals = {key: _content_addressed_original(key) for key in object_keys}
+    candidates = {original for original in originals.values() if original}
+    if not candidates:
+        return {}
+    
+    from .models import S3UploadPin
+    ttl = timedelta(seconds=settings.S3_UPLOAD_PIN_TTL)
+    expires = {}
+    for key, created_at in S3UploadPin.objects.filter(
+        object_key__in=candidates,
+        created_at__gt=datetime.now(timezone.utc) - ttl
+    ).values_list('object_key', 'created_at'):
+        expires[key] = max(expires.get(key, created_at + ttl), created_at + ttl)
+    return {key: expires[original] for key, original in originals.items() if original in expires}
+
+def s3_object_exists(object_key):
+    try:
+        get_s3_client().head_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=object_key
+        )
+        return True
+    except Exception:
+        return False
+
+def generate_presigned_post(object_key, content_type, max_bytes, expiration=900):
+    """
+    Generate a presigned POST so a browser can upload straight to S3
+    
+    The policy pins the key and content type and caps the object size.
+    
+    Args:
+        object_key: The S3 object key the browser must upload to
+        content_type: The Content-Type the browser must send
+        max_bytes: Largest accepted upload in bytes
+        expiration: Policy expiration time in seconds (default: 15 minutes)
+        
+    Returns:
+        Dict with 'url' and form 'fields', or None if error
+    """
+    try:
+        client = get_s3_client()
+        return client.generate_presigned_post(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=object_key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_bytes],
+            ],
+            ExpiresIn=expiration
+        )
+    except Exception as e:
+        print(f"Error generating presigned POST: {str(e)}")
+        return None
+
+def head_s3_object(object_key):
+    """
+    Returns the HEAD metadata for an S3 object, or None if it does not exist
+    """
+    try:
+        client = get_s3_client()
+        return client.head_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=object_key
+        )
+    except Exception as e:
+        print(f"Error checking S3 object {object_key}: {str(e)}")
         return None
\ No newline at end of file
@@ -1,17 +1,56 @@
 # backend/api/views.py
 import json
-from django.http import JsonResponse
+import time
+import uuid
+import hashlib
+from functools import partial
+from django.http import JsonResponse, HttpResponseRedirect, HttpResponseNotModified
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-from .utils import get_s3_client, delete_s3_file, delete_s3_folder, upload_file_to_s3
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from .utils import (
+    get_s3_client,
+    delete_s3_file,
+    delete_s3_folder,
+    upload_file_to_s3,
+    presigned_url_cache,
+    generate_presigned_url_with_expiry,
+    build_s3_path,
+    generate_presigned_post,
+    head_s3_object,
+    is_content_addressed_key
+)
+from .tasks import spool_upload, enqueue_upload_job, enqueue_derivatives, queue_s3_deletions
+from .fulltext import search_images, filter_images, highlight
+from .tag_suggest import suggest_tags
+from .search_index import tag_candidates
+from .stats import batched_profile_stats
+from .dashboard import get_dashboard
+from .response_cache import cached_response, response_cache_metrics
+from .pagination import (
+    KeysetPagination,
+    ImageKeysetPagination,
+    page_size_from_request,
+    decode_cursor,
+    next_page_url,
+    paginated_list_response
+)
+from .thumbnails import (
+    derivatives_mode,
+    render_derivatives,
+    store_derivatives,
+    pick_derivative
+)
 import google.generativeai as genai
 import re
 
@@ -21,6 +60,7 @@ from .serializers import (
     UserProfileSerializer,
     UserFollowSerializer,
     CategorySerializer, 
+    CategorySummarySerializer,
     CategoryCreateSerializer,
     ImageSerializer, 
     ImageUploadSerializer,
@@ -33,7 +73,10 @@ from .models import (
     Image,
     ProfileStats,
     Goal,
-    FinancialInfo
+    FinancialInfo,
+    UploadJob,
+    UserSearchTerm,
+    normalize_tag
 )
 from .utils import get_s3_client, delete_s3_file, delete_s3_folder, upload_file_to_s3
 # from .gemini import generate_ai_fields
@@ -56,14 +99,45 @@ def test_auth(request):
     else:
         return JsonResponse({'authenticated': False}, status=401)
 
+def _is_true(value):
+    return value is True or str(value).lower() == 'true'
+
+def _wants_category_summary(request):
+    """?view=summary asks for CategorySummarySerializer instead of nested images"""
+    return request.query_params.get('view') == 'summary'
+
+def _scope_id(pk):
+    """A URL pk as the int the write receivers bump generations for, or None"""
+    try:
+        return int(pk)
+    except (TypeError, ValueError):
+        return None
+
+def _check_direct_upload(object_key):
+    """
+    HEAD-checks an object uploaded through a presigned POST.
+    Returns an error message, or None if the object is acceptable.
+    """
+    head = head_s3_object(object_key)
+    if head is None:
+        return 'Uploaded file not found'
+    if head.get('ContentLength', 0) > settings.DIRECT_UPLOAD_MAX_BYTES or \
+            head.get('ContentType') not in settings.DIRECT_UPLOAD_CONTENT_TYPES:
+        delete_s3_file(object_key)
+        return 'Uploaded file is too large or not a supported image type'
+    return None
+
 class CategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]  # Or appropriate permission
     serializer_class = CategorySerializer
     queryset = Category.objects.all()
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
             return CategoryCreateSerializer
+        if self.action == 'list' and _wants_category_summary(self.request):
+            return CategorySummarySerializer
         return CategorySerializer
     
     def perform_create(self, serializer):
@@ -87,9 +161,21 @@ class CategoryViewSet(viewsets.ModelViewSet):
         
         # Get the file from request
         placeholder_image = request.FILES.get('placeholder_image')
+        placeholder_key = request.data.get('placeholder_key')
         s3_path = None
         
-        if placeholder_image:
+        if not placeholder_image and placeholder_key:
+            # The placeholder was uploaded straight to S3 through images/upload-url/
+            if not placeholder_key.startswith(f"user_{request.user.id}/category_placeholders/"):
+                return Response(
+                    {'error': 'Invalid placeholder key'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            error = _check_direct_upload(placeholder_key)
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+            s3_path = placeholder_key
+        elif placeholder_image:
             # Upload the image to S3 with user_id
             s3_path = upload_file_to_s3(
                 placeholder_image, 
@@ -140,9 +226,48 @@ class CategoryViewSet(viewsets.ModelViewSet):
     # @permission_classes([AllowAny])  
     def get_queryset(self):
         # Always filter by the current user
-        if self.request.user.is_authenticated:
-            return Category.objects.filter(user=self.request.user)
-        return Category.objects.none()
+        if not self.request.user.is_authenticated:
+            return Category.objects.none()
+        queryset = Category.objects.filter(user=self.request.user)
+        if self.action == 'list' and _wants_category_summary(self.request):
+            return CategorySummarySerializer.prepare_queryset(queryset)
+        if self.action in ('list', 'retrieve'):
+            return queryset.prefetch_related('images')
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        # Cached until the user's collections or items change, see api.response_cache
+        return cached_response(
+            request, 'categories-list', [('user', request.user.id)],
+            partial(super().list, request, *args, **kwargs)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        category_id = _scope_id(kwargs.get('pk'))
+        if category_id is None:
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            request, 'categories-detail', [('category', category_id)],
+            partial(super().retrieve, request, *args, **kwargs)
+        )
+    
+    @action(detail=True, methods=['get'])
+    def images(self, request, pk=None):
+        """Paginated images of one category, newest first"""
+        category_id = _scope_id(pk)
+        if category_id is None:
+            return self._images_response(request)
+        return cached_response(
+            request, 'categories-images', [('category', category_id)],
+            partial(self._images_response, request)
+        )
+    
+    def _images_response(self, request):
+        category = self.get_object()
+        paginator = ImageKeysetPagination()
+        page = paginator.paginate_queryset(category.images.all(), request, view=self)
+        serializer = ImageSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
     
     # @permission_classes([AllowAny])  
     def perform_create(self, serializer):
@@ -189,18 +314,23 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         """Override to clean up S3 resources before deleting the category"""
         try:
-            # Delete the placeholder image if exists
-            if instance.placeholder_image:
-                delete_s3_file(instance.placeholder_image)
+            # Shared content-addressed objects live outside the category folder,
+            # so they are released one by one once the rows are gone
+            released_keys = [instance.placeholder_image] if instance.placeholder_image else []
+            for image in instance.images.only('path', 'derivatives'):
+                released_keys.extend(
+                    key for key in image.get_object_keys() if is_content_addressed_key(key)
+                )
                 
-            # Delete all images in the category from S3
-            folder_name = instance.name
-            user_id = instance.user.id if instance.user else None
-            delete_count = delete_s3_folder(folder_name, user_id)
-            print(f"Deleted {delete_count} files from S3 folder: {folder_name}")
+            folder_prefix = f"{instance.name}/"
+            if instance.user_id:
+                folder_prefix = f"user_{instance.user_id}/{folder_prefix}"
                 
-            # Delete the category (will cascade to images in DB)
-            instance.delete()
+            # Delete the category (will cascade to images in DB) and queue
+            # its S3 folder, placeholder and shared objects for deletion
+            with transaction.atomic():
+                instance.delete()
+                queue_s3_deletions(released_keys, prefixes=[folder_prefix])
             
             # Send WebSocket update
             try:
@@ -273,6 +403,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 class ImageViewSet(viewsets.ModelViewSet):
     queryset = Image.objects.all()
+    pagination_class = ImageKeysetPagination
     serializer_class = ImageSerializer
     parser_classes = (MultiPartParser, FormParser, JSONParser) 
     permission_classes = [IsAuthenticated]
@@ -299,8 +430,18 @@ class ImageViewSet(viewsets.ModelViewSet):
                 
             print(f"DEBUG: Serializer valid. Category: {category.name} (ID: {category.id})")
             
-            # Upload file to S3 with user ID
             is_wishlist = 'is_wishlist' in request.data and request.data['is_wishlist'] == 'true'
+            
+            # ?async=true spools the file and finishes the upload in the background
+            if _is_true(request.query_params.get('async', request.data.get('async', False))):
+                return self._start_upload_job(request, data, category, is_wishlist)
+            
+            # Render thumbnails from the in-memory file before it is streamed to S3
+            rendered_derivatives = []
+            if derivatives_mode() == 'upload':
+                rendered_derivatives = render_derivatives(data['file'])
+            
+            # Upload file to S3 with user ID
             s3_path = upload_file_to_s3(data['file'], category.name, request.user.id, is_wishlist)
             print(f"DEBUG: S3 path: {s3_path}")
             
@@ -312,47 +453,18 @@ class ImageViewSet(viewsets.ModelViewSet):
                     category=category,
                     is_wishlist=is_wishlist
                 )
-                if 'purchase_url' in request.data and request.data['purchase_url']:
-                    image.purchase_url = request.data['purchase_url']
-
-                if 'is_wishlist' in request.data:
-                    image.is_wishlist = request.data['is_wishlist'] == 'true'
-
                 if 'purchase_url' in request.data:
                     image.purchase_url = request.data['purchase_url']
                 
                 # Process additional fields if present in request data
-                if 'description' in request.data:
-                    image.description = request.data['description']
-                    
-                if 'valuation' in request.data:
-                    try:
-                        value = request.data['valuation']
-                        if value:
-                            image.valuation = float(value)
-                    except (ValueError, TypeError):
-                        pass  # Invalid value, just skip
-                    
-                # Handle tags if present
-                if 'tags' in request.data:
-                    try:
-                        tags_data = request.data['tags']
-                        
-                        # If tags comes as a string (stringified JSON), parse it
-                        if isinstance(tags_data, str):
-                            import json
-                            try:
-                                tags = json.loads(tags_data)
-                                if isinstance(tags, list):
-                                    image.set_tags(tags)
-                            except json.JSONDecodeError:
-                                pass  # Invalid JSON, skip
-                    except Exception as e:
-                        print(f"DEBUG: Error processing tags: {str(e)}")
+                image.apply_upload_fields(request.data)
                 
                 # Save the image with all fields
                 image.save()
                 
+                if rendered_derivatives:
+                    store_derivatives(image, rendered_derivatives)
+                
                 print(f"DEBUG: Image created with ID: {image.id}")
                 
                 # WebSocket update code...
@@ -372,18 +484,178 @@ class ImageViewSet(viewsets.ModelViewSet):
         print("DEBUG: Serializer errors:", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    def _start_upload_job(self, request, data, category, is_wishlist):
+        """Spool an upload to disk and hand it to the upload workers."""
+        job_id = uuid.uuid4()
+        fields = {
+            key: request.data[key]
+            for key in ('title', 'description', 'valuation', 'tags', 'purchase_url')
+            if key in request.data
+        }
+        job = UploadJob.objects.create(
+            id=job_id,
+            user=request.user,
+            category=category,
+            spool_path=spool_upload(data['file'], job_id),
+            filename=data['file'].name,
+            content_type=data['file'].content_type,
+            is_wishlist=is_wishlist,
+            fields=json.dumps(fields)
+        )
+        transaction.on_commit(lambda: enqueue_upload_job(job))
+        
+        return Response(
+            {
+                'job_id': str(job.id),
+                'status': job.status,
+                'status_url': reverse('api:image-upload-job', args=[job.id])
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+    
+    @action(detail=False, methods=['get'], url_path=r'upload-jobs/(?P<job_id>[0-9a-f-]+)', url_name='upload-job')
+    def upload_job(self, request, job_id=None):
+        """Report the status of a background upload."""
+        try:
+            job = UploadJob.objects.get(id=job_id, user=request.user)
+        except (UploadJob.DoesNotExist, ValidationError):
+            return Response({'error': 'Upload job not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'job_id': str(job.id),
+            'status': job.status,
+            'error': job.error,
+            'image': ImageSerializer(job.image, context=self.get_serializer_context()).data if job.image else None,
+            'created_at': job.created_at,
+            'updated_at': job.updated_at
+        })
+    
+    @action(detail=False, methods=['post'], url_path='upload-url')
+    def upload_url(self, request):
+        """Issue a presigned POST so the browser can upload a file straight to S3."""
+        purpose = request.data.get('purpose', 'image')
+        filename = request.data.get('filename')
+        content_type = request.data.get('content_type')
+        
+        if not filename or not content_type:
+            return Response(
+                {'error': 'filename and content_type are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if content_type not in settings.DIRECT_UPLOAD_CONTENT_TYPES:
+            return Response(
+                {'error': f'Unsupported content type: {content_type}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        max_bytes = settings.DIRECT_UPLOAD_MAX_BYTES
+        try:
+            if int(request.data.get('size', 0)) > max_bytes:
+                return Response(
+                    {'error': f'File is larger than {max_bytes} bytes'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        except (ValueError, TypeError):
+            return Response({'error': 'Invalid size'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if purpose == 'category_placeholder':
+            object_key = build_s3_path(filename, 'category_placeholders', request.user.id)
+        elif purpose == 'image':
+            try:
+                category = Category.objects.get(id=request.data.get('category'))
+            except (Category.DoesNotExist, ValueError, TypeError):
+                return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+            if category.user != request.user:
+                return Response(
+                    {'error': 'You do not have permission to modify this collection'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            is_wishlist = _is_true(request.data.get('is_wishlist', False))
+            object_key = build_s3_path(filename, category.name, request.user.id, is_wishlist)
+        else:
+            return Response({'error': f'Unknown purpose: {purpose}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        expiration = settings.DIRECT_UPLOAD_EXPIRATION
+        post = generate_presigned_post(object_key, content_type, max_bytes, expiration)
+        if not post:
+            return Response(
+                {'error': 'Failed to create upload URL'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        return Response({
+            'url': post['url'],
+            'fields': post['fields'],
+            'key': object_key,
+            'expires_in': expiration
+        })
+    
+    @action(detail=False, methods=['post'], url_path='confirm-upload')
+    def confirm_upload(self, request):
+        """Create the image record for a file uploaded through upload-url."""
+        object_key = request.data.get('key')
+        title = request.data.get('title')
+        
+        if not object_key or not title:
+            return Response(
+                {'error': 'key and title are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            category = Category.objects.get(id=request.data.get('category'))
+        except (Category.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+        if category.user != request.user:
+            return Response(
+                {'error': 'You do not have permission to modify this collection'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        # The key must be one upload-url could have issued for this collection
+        is_wishlist = _is_true(request.data.get('is_wishlist', False))
+        folder = f"user_{request.user.id}/{category.name}/"
+        if is_wishlist:
+            folder += 'wishlist/'
+        if not object_key.startswith(folder) or '/' in object_key[len(folder):]:
+            return Response(
+                {'error': 'Upload key does not belong to this collection'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if Image.objects.filter(path=object_key).exists():
+            return Response(
+                {'error': 'This upload has already been confirmed'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        error = _check_direct_upload(object_key)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Derivatives are left for the lazy /api/media/<id>/?w= path so the
+        # file never has to pass through this server
+        image = Image(title=title, path=object_key, category=category, is_wishlist=is_wishlist)
+        image.apply_upload_fields(request.data)
+        image.save()
+        
+        return Response(
+            ImageSerializer(image, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+    
     def perform_destroy(self, instance):
         """Override to clean up S3 resources before deleting the image"""
         try:
             category_id = instance.category.id
             image_id = instance.id
             
-            # Delete the file from S3
-            if instance.path:
-                delete_s3_file(instance.path)
+            object_keys = instance.get_object_keys()
                 
-            # Delete the image from database
-            instance.delete()
+            # Delete the image from database and queue the file and its
+            # derivatives for deletion from S3
+            with transaction.atomic():
+                instance.delete()
+                queue_s3_deletions(object_keys)
             
             # Send WebSocket update
             try:
@@ -408,63 +680,7 @@ class ImageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def bulk_delete(self, request):
         """Delete multiple images at once"""
-        print("BULK DELETE ENDPOINT REACHED")
-        print("Request data:", request.data)
-        
-        image_ids = request.data.get('image_ids', [])
-        
-        if not image_ids:
-            print("No image IDs provided")
-            return Response(
-                {'error': 'No image IDs provided'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        print(f"Attempting to delete {len(image_ids)} images: {image_ids}")
-        # Get the images
-        images = Image.objects.filter(id__in=image_ids)
-        
-        # Group images by category for WebSocket updates
-        images_by_category = {}
-        for image in images:
-            if image.category.id not in images_by_category:
-                images_by_category[image.category.id] = []
-            images_by_category[image.category.id].append(image.id)
-        
-        deleted_count = 0
-        for image in images:
-            try:
-                # Delete the file from S3
-                if image.path:
-                    delete_s3_file(image.path)
-                    
-                # Delete the image from database
-                image.delete()
-                deleted_count += 1
-            except Exception as e:
-                print(f"Error deleting image {image.id}: {str(e)}")
-        
-        # Send WebSocket updates for each category
-        channel_layer = get_channel_layer()
-        for category_id, image_ids in images_by_category.items():
-            try:
-                async_to_sync(channel_layer.group_send)(
-                    f'collection_{category_id}',
-                    {
-                        'type': 'collection_update',
-                        'message': {
-                            'action': 'images_bulk_deleted',
-                            'image_ids': image_ids
-                        }
-                    }
-                )
-            except Exception as e:
-                print(f"WebSocket error for category {category_id}: {str(e)}")
-                
-        return Response(
-            {'deleted_count': deleted_count},
-            status=status.HTTP_200_OK
-        )
+        return bulk_delete_response(request)
     
     def get_queryset(self):
         # Filter by the current user
@@ -568,6 +784,13 @@ class ImageViewSet(viewsets.ModelViewSet):
             # Get the S3 path
             current_path = image.path
             
+            # Content-addressed objects are shared and never move
+            if is_content_addressed_key(current_path):
+                image.is_wishlist = False
+                image.purchase_url = None
+                image.save()
+                return Response(ImageSerializer(image).data)
+            
             # Parse the path to create new destination path
             if 'wishlist/' in current_path:
                 # Replace 'wishlist/' with empty string
@@ -596,6 +819,28 @@ class ImageViewSet(viewsets.ModelViewSet):
                     Bucket=settings.AWS_STORAGE_BUCKET_NAME,
                     Key=current_path
                 )
+                presigned_url_cache.invalidate(current_path)
+                
+                # Move the derivatives along with the original
+                derivatives = image.get_derivatives()
+                for formats in derivatives.values():
+                    for fmt, old_key in formats.items():
+                        formats[fmt] = old_key.replace('wishlist/', '')
+                        s3_client.copy_object(
+                            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                            CopySource={
+                                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+                                'Key': old_key
+                            },
+                            Key=formats[fmt]
+                        )
+                        s3_client.delete_object(
+                            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                            Key=old_key
+                        )
+                        presigned_url_cache.invalidate(old_key)
+                if derivatives:
+                    image.set_derivatives(derivatives)
                 
                 # Update the image record
                 image.path = new_path
@@ -623,50 +868,52 @@ class ImageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-@api_view(['POST'])
-def bulk_delete_images(request):
-    """Standalone view to delete multiple images at once"""
-    print("BULK DELETE STANDALONE VIEW REACHED")
-    print("Request data:", request.data)
+def delete_images_for_user(user, image_ids):
+    """
+    Deletes the given images that belong to user in one query
     
-    image_ids = request.data.get('image_ids', [])
+    Args:
+        user: The requesting user; images in other users' collections are refused
+        image_ids: List of image IDs
     
-    if not image_ids:
-        print("No image IDs provided")
-        return Response(
-            {'error': 'No image IDs provided'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-        
-    print(f"Attempting to delete {len(image_ids)} images: {image_ids}")
+    Returns:
+        Tuple of (deleted image IDs, list of {'id', 'error'} for refused IDs)
+    """
+    refused = []
+    requested_ids = []
+    for image_id in dict.fromkeys(image_ids):
+        try:
+            requested_ids.append(int(image_id))
+        except (TypeError, ValueError):
+            refused.append({'id': image_id, 'error': 'invalid id'})
     
-    # Get the images
-    images = Image.objects.filter(id__in=image_ids)
+    rows = list(
+        Image.objects.filter(id__in=requested_ids, category__user=user)
+        .values_list('id', 'category_id', 'path', 'derivatives')
+    )
+    found_ids = {row[0] for row in rows}
+    # Images of other users are reported like missing ones
+    refused.extend(
+        {'id': image_id, 'error': 'not found'}
+        for image_id in requested_ids if image_id not in found_ids
+    )
+    if not rows:
+        return [], refused
     
-    # Group images by category for WebSocket updates
     images_by_category = {}
-    for image in images:
-        if image.category.id not in images_by_category:
-            images_by_category[image.category.id] = []
-        images_by_category[image.category.id].append(image.id)
+    object_keys = []
+    for image_id, category_id, path, derivatives in rows:
+        images_by_category.setdefault(category_id, []).append(image_id)
+        object_keys.extend(Image(path=path, derivatives=derivatives).get_object_keys())
     
-    deleted_count = 0
-    for image in images:
-        try:
-            # Delete the file from S3
-            if image.path:
-                delete_s3_file(image.path)
-                
-            # Delete the image from database
-            image.delete()
-            deleted_count += 1
-            print(f"Deleted image {image.id}")
-        except Exception as e:
-            print(f"Error deleting image {image.id}: {str(e)}")
+    # Delete the rows and queue their files and derivatives for deletion from S3
+    with transaction.atomic(), batched_profile_stats():
+        Image.objects.filter(id__in=found_ids).delete()
+        queue_s3_deletions(object_keys)
     
-    # Send WebSocket updates for each category
+    # Send one WebSocket update per category
     channel_layer = get_channel_layer()
-    for category_id, image_ids in images_by_category.items():
+    for category_id, deleted_ids in images_by_category.items():
         try:
             async_to_sync(channel_layer.group_send)(
                 f'collection_{category_id}',
@@ -674,19 +921,94 @@ def bulk_delete_images(request):
                     'type': 'collection_update',
                     'message': {
                         'action': 'images_bulk_deleted',
-                        'image_ids': image_ids
+                        'image_ids': deleted_ids
                     }
                 }
             )
-            print(f"Sent WebSocket update for category {category_id}")
         except Exception as e:
             print(f"WebSocket error for category {category_id}: {str(e)}")
-            
+    
+    return [row[0] for row in rows], refused
+
+def bulk_delete_response(request):
+    image_ids = request.data.get('image_ids', [])
+    
+    if not image_ids or not isinstance(image_ids, list):
+        return Response(
+            {'error': 'No image IDs provided'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    deleted_ids, refused = delete_images_for_user(request.user, image_ids)
+    print(f"Bulk deleted {len(deleted_ids)} images, refused {len(refused)}")
+    
     return Response(
-        {'deleted_count': deleted_count},
+        {
+            'deleted_count': len(deleted_ids),
+            'deleted_ids': deleted_ids,
+            'refused': refused
+        },
         status=status.HTTP_200_OK
     )
 
+@api_view(['POST'])
+def bulk_delete_images(request):
+    """Standalone view to delete multiple images at once"""
+    return bulk_delete_response(request)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def media_redirect(request, image_id):
+    """Redirect to a presigned URL for an image through a stable, cacheable URL"""
+    try:
+        image = Image.objects.select_related('category').get(id=image_id)
+    except Image.DoesNotExist:
+        return Response({'error': 'Image not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # Only the owner can see images in private collections
+    is_owner = request.user.is_authenticated and image.category.user_id == request.user.id
+    if not is_owner and not image.category.is_public:
+        return Response({'error': 'Image not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # ?w=<width>&fmt=webp|jpeg selects a resized derivative
+    object_key = image.path
+    rendering = False
+    width = request.query_params.get('w')
+    if width and width.isdigit() and derivatives_mode() != 'off':
+        if image.derivatives is None:
+            # Serve the original until a worker has rendered the derivatives
+            enqueue_derivatives(image.id)
+            rendering = True
+        fmt = request.query_params.get('fmt')
+        if not fmt:
+            fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+        object_key = pick_derivative(image, int(width), fmt)
+    
+    url, expires_at = generate_presigned_url_with_expiry(
+        object_key,
+        getattr(settings, 'MEDIA_REDIRECT_URL_EXPIRATION', 3600)
+    )
+    if not url:
+        return Response(
+            {'error': 'Failed to generate image URL'},
+            status=status.HTTP_502_BAD_GATEWAY
+        )
+    
+    # The redirect must go stale while the signed URL still has time left
+    max_age = int(expires_at - time.time() - presigned_url_cache.min_remaining)
+    if rendering:
+        max_age = 0
+    etag = '"%s"' % hashlib.md5(url.encode()).hexdigest()
+    
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponseRedirect(url)
+    response['ETag'] = etag
+    response['Cache-Control'] = f'private, max-age={max(max_age, 0)}'
+    response['Vary'] = 'Cookie'
+    return response
+
 class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserProfileSerializer
@@ -694,15 +1016,37 @@ class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
     filter_backends = [filters.SearchFilter]
     search_fields = ['username', 'email', 'first_name', 'last_name', 'profile__display_name']
+    pagination_class = KeysetPagination
+    
+    def get_queryset(self):
+        return UserProfileSerializer.prepare_queryset(User.objects.all(), self.request)
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
     
+    def retrieve(self, request, *args, **kwargs):
+        user_id = _scope_id(kwargs.get('pk'))
+        if user_id is None:
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            request, 'profiles-detail', [('user', user_id)],
+            partial(super().retrieve, request, *args, **kwargs)
+        )
+    
     @action(detail=True, methods=['get'])
     def categories(self, request, pk=None):
         """Get categories for a user"""
+        user_id = _scope_id(pk)
+        if user_id is None:
+            return self._categories_response(request)
+        return cached_response(
+            request, 'profiles-categories', [('user', user_id)],
+            partial(self._categories_response, request)
+        )
+    
+    def _categories_response(self, request):
         user = self.get_object()
         public_only = request.query_params.get('public_only', 'false').lower() == 'true'
         
@@ -713,8 +1057,15 @@ class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):
             # Otherwise, only show public categories
             categories = Category.objects.filter(user=user, is_public=True)
             
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        if _wants_category_summary(request):
+            categories = CategorySummarySerializer.prepare_queryset(categories)
+            serializer_class = CategorySummarySerializer
+        else:
+            categories = categories.prefetch_related('images')
+            serializer_class = CategorySerializer
+        page = self.paginate_queryset(categories)
+        serializer = serializer_class(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
     
     # @action(detail=True, methods=['get'])
     # def stats(self, request, pk=None):
@@ -736,9 +1087,10 @@ class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):
         user = self.get_object()
         followers = UserFollow.objects.filter(followed=user)
         user_ids = followers.values_list('follower_id', flat=True)
-        users = User.objects.filter(id__in=user_ids)
-        serializer = UserProfileSerializer(users, many=True, context={'request': request})
-        return Response(serializer.data)
+        users = UserProfileSerializer.prepare_queryset(User.objects.filter(id__in=user_ids), request)
+        page = self.paginate_queryset(users)
+        serializer = UserProfileSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def following(self, request, pk=None):
@@ -746,9 +1098,10 @@ class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):
         user = self.get_object()
         following = UserFollow.objects.filter(follower=user)
         user_ids = following.values_list('followed_id', flat=True)
-        users = User.objects.filter(id__in=user_ids)
-        serializer = UserProfileSerializer(users, many=True, context={'request': request})
-        return Response(serializer.data)
+        users = UserProfileSerializer.prepare_queryset(User.objects.filter(id__in=user_ids), request)
+        page = self.paginate_queryset(users)
+        serializer = UserProfileSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
     
     # Replace the update_profile action in views.py with this version
     @action(detail=True, methods=['put', 'patch'], permission_classes=[IsAuthenticated])
@@ -884,6 +1237,7 @@ class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):
 class UserFollowViewSet(viewsets.ModelViewSet):
     serializer_class = UserFollowSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         return UserFollow.objects.filter(
@@ -960,24 +1314,30 @@ class UserFollowViewSet(viewsets.ModelViewSet):
         """Get users who follow the current user"""
         followers = UserFollow.objects.filter(followed=request.user)
         user_ids = followers.values_list('follower_id', flat=True)
-        users = User.objects.filter(id__in=user_ids)
-        serializer = UserProfileSerializer(users, many=True, context={'request': request})
-        return Response(serializer.data)
+        users = UserProfileSerializer.prepare_queryset(User.objects.filter(id__in=user_ids), request)
+        page = self.paginate_queryset(users)
+        serializer = UserProfileSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def following(self, request):
         """Get users the current user follows"""
         following = UserFollow.objects.filter(follower=request.user)
         user_ids = following.values_list('followed_id', flat=True)
-        users = User.objects.filter(id__in=user_ids)
-        serializer = UserProfileSerializer(users, many=True, context={'request': request})
-        return Response(serializer.data) 
+        users = UserProfileSerializer.prepare_queryset(User.objects.filter(id__in=user_ids), request)
+        page = self.paginate_queryset(users)
+        serializer = UserProfileSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data) 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def financial_data(request):
-    user = request.user
+    return cached_response(
+        request, 'financial-data', [('user', request.user.id)],
+        partial(_financial_data_response, request.user)
+    )
 
+def _financial_data_response(user):
     # Get or create FinancialInfo object
     financial_info, created = FinancialInfo.objects.get_or_create(user=user)
 
@@ -991,12 +1351,27 @@ def financial_data(request):
         "monthlySpending": monthly_spending,
     })
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard(request):
+    """
+    Financial data, profile stats and goals of the requesting user in one
+    response, cached until their items change (see api.dashboard)
+    """
+    return Response(get_dashboard(request.user))
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def profile_stats(request):
     """Retrieve total value, collections, and items for a user's profile."""
-    user = request.user
+    return cached_response(
+        request, 'profile-stats', [('user', request.user.id)],
+        partial(_profile_stats_response, request.user)
+    )
+
+def _profile_stats_response(user):
     try:
+        # Materialized counters, see api.stats
         profile_stats, _ = ProfileStats.objects.get_or_create(user=user)
         return Response({
             "totalValue": profile_stats.get_total_value(),
@@ -1006,6 +1381,12 @@ def profile_stats(request):
     except Exception as e:
         return Response({"error": f"Failed to fetch profile stats: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def response_cache_stats(request):
+    """Hit rates of the response cache in the process serving the request"""
+    return Response(response_cache_metrics())
+
     
 @csrf_exempt
 @api_view(['POST'])
@@ -1073,7 +1454,50 @@ from django.db.models import Q
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .utils import generate_presigned_url
+from .utils import generate_presigned_urls
+
+def _search_user_data(user, presigned_urls, cache):
+    """Profile data shown with each search result, built once per user"""
+    if user.id not in cache:
+        user_data = {
+            'id': user.id,
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'email': user.email,
+            'profile_picture_url': None,
+            'display_name': None
+        }
+        
+        # Add profile data if exists
+        profile = getattr(user, 'profile', None)
+        if profile is not None:
+            if profile.profile_picture:
+                user_data['profile_picture_url'] = presigned_urls.get(profile.profile_picture)
+            user_data['display_name'] = profile.display_name
+        cache[user.id] = user_data
+    return cache[user.id]
+
+TAG_SEARCH_ID_CHUNK = 500
+
+def _tag_search_rows(queryset, kind, tag, before_id, count):
+    """
+    Up to count rows of an id-descending queryset below before_id
+
+    With SEARCH_INDEX_ENABLED the in-memory index supplies the candidate ids
+    and the queryset only re-checks them by primary key, a chunk at a time.
+    """
+    if before_id is not None:
+        queryset = queryset.filter(id__lt=before_id)
+    candidates = tag_candidates(kind, tag, before_id) if settings.SEARCH_INDEX_ENABLED else None
+    if candidates is None:
+        return list(queryset[:count])
+    rows = []
+    for start in range(0, len(candidates), TAG_SEARCH_ID_CHUNK):
+        if len(rows) >= count:
+            break
+        rows.extend(queryset.filter(id__in=candidates[start:start + TAG_SEARCH_ID_CHUNK])[:count - len(rows)])
+    return rows
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -1084,88 +1508,83 @@ def search_by_tag(request):
     if not tag:
         return Response({"error": "Tag parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
     
+    # Keyset position: categories come first, newest first, then images
+    position = decode_cursor(request) or {'type': 'category', 'id': None}
+    cursor_id = position.get('id')
+    # Only the category walk may start without an id; an image position always has one
+    if cursor_id is None:
+        valid_id = position.get('type') == 'category'
+    else:
+        valid_id = isinstance(cursor_id, int) and not isinstance(cursor_id, bool)
+    if position.get('type') not in ('category', 'image') or not valid_id:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
+    page_size = page_size_from_request(request)
+    normalized = normalize_tag(tag)
+    
     try:
-        # Search for categories with the tag
-        categories = Category.objects.filter(
-            is_public=True  # Only public categories
-        ).exclude(
-            user=request.user  # Exclude current user's categories
-        )
+        # Public categories of other users with the tag, via the indexed tag links
+        categories = []
+        if position['type'] == 'category':
+            queryset = Category.objects.filter(
+                is_public=True,
+                tag_links__normalized=normalized
+            ).exclude(
+                user=request.user
+            ).select_related('user__profile').order_by('-id')
+            categories = _tag_search_rows(queryset, 'category', tag, position['id'], page_size + 1)
         
-        # Find categories with matching tags
-        category_results = []
-        for category in categories:
-            tags = category.get_tags()
-            if tag.lower() in [t.lower() for t in tags]:
-                user = category.user
-                # Create user profile data
-                user_data = {
-                    'id': user.id,
-                    'username': user.username,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'email': user.email,
-                    'profile_picture_url': None,
-                    'display_name': None
-                }
-                
-                # Add profile data if exists
-                if hasattr(user, 'profile'):
-                    user_data['profile_picture_url'] = generate_presigned_url(user.profile.profile_picture) if user.profile.profile_picture else None
-                    user_data['display_name'] = user.profile.display_name
-                
-                category_results.append({
-                    'type': 'category',
-                    'id': category.id,
-                    'title': category.name,
-                    'image_url': generate_presigned_url(category.placeholder_image) if category.placeholder_image else None,
-                    'user': user_data
-                })
+        # Then public, non-wishlist images of other users with the tag
+        images = []
+        if len(categories) <= page_size:
+            queryset = Image.objects.filter(
+                category__is_public=True,
+                is_wishlist=False,
+                tag_links__normalized=normalized
+            ).exclude(
+                category__user=request.user
+            ).select_related('category__user__profile').order_by('-id')
+            before_id = position['id'] if position['type'] == 'image' else None
+            images = _tag_search_rows(queryset, 'image', tag, before_id, page_size + 1 - len(categories))
         
-        # Search for images with the tag
-        images = Image.objects.filter(
-            category__is_public=True,  # Only public categories
-            is_wishlist=False  # Exclude wishlist items
-        ).exclude(
-            category__user=request.user  # Exclude current user's images
+        # Sign every URL on the page in one batch
+        users = [category.user for category in categories] + [image.category.user for image in images]
+        presigned_urls = generate_presigned_urls(
+            [category.placeholder_image for category in categories if category.placeholder_image]
+            + [image.path for image in images if image.path]
+            + [user.profile.profile_picture for user in users
+               if getattr(user, 'profile', None) is not None and user.profile.profile_picture]
         )
         
-        # Find images with matching tags
-        image_results = []
-        for image in images:
-            tags = image.get_tags()
-            if tag.lower() in [t.lower() for t in tags]:
-                user = image.category.user
-                # Create user profile data
-                user_data = {
-                    'id': user.id,
-                    'username': user.username,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'email': user.email,
-                    'profile_picture_url': None,
-                    'display_name': None
-                }
-                
-                # Add profile data if exists
-                if hasattr(user, 'profile'):
-                    user_data['profile_picture_url'] = generate_presigned_url(user.profile.profile_picture) if user.profile.profile_picture else None
-                    user_data['display_name'] = user.profile.display_name
-                
-                image_results.append({
-                    'type': 'image',
-                    'id': image.id,
-                    'title': image.title,
-                    'image_url': generate_presigned_url(image.path) if image.path else None,
-                    'category_id': image.category.id,
-                    'category_name': image.category.name,
-                    'user': user_data
-                })
+        user_cache = {}
+        all_results = [
+            {
+                'type': 'category',
+                'id': category.id,
+                'title': category.name,
+                'image_url': presigned_urls.get(category.placeholder_image) if category.placeholder_image else None,
+                'user': _search_user_data(category.user, presigned_urls, user_cache)
+            }
+            for category in categories
+        ] + [
+            {
+                'type': 'image',
+                'id': image.id,
+                'title': image.title,
+                'image_url': presigned_urls.get(image.path) if image.path else None,
+                'category_id': image.category.id,
+                'category_name': image.category.name,
+                'user': _search_user_data(image.category.user, presigned_urls, user_cache)
+            }
+            for image in images
+        ]
         
-        # Combine results
-        all_results = category_results + image_results
+        next_url = None
+        if len(all_results) > page_size:
+            all_results = all_results[:page_size]
+            last = all_results[-1]
+            next_url = next_page_url(request, {'type': last['type'], 'id': last['id']})
         
-        return Response(all_results)
+        return paginated_list_response(all_results, next_url)
     except Exception as e:
         print(f"Error in tag search: {str(e)}")
         import traceback
@@ -1173,4 +1592,135 @@ def search_by_tag(request):
         return Response(
             {"error": f"Search failed: {str(e)}"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+def _optional_float(value):
+    return float(value) if value not in (None, '') else None
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def full_text_search(request):
+    """
+    Ranked full-text search over image titles, descriptions and tags
+    
+    Query params: q (required), owner, is_wishlist, min_valuation,
+    max_valuation, page_size and cursor
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({"error": "q parameter is required"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        owner = request.query_params.get('owner')
+        is_wishlist = request.query_params.get('is_wishlist')
+        filters = {
+            'viewer_id': request.user.id,
+            'owner_id': int(owner) if owner else None,
+            'is_wishlist': _is_true(is_wishlist) if is_wishlist is not None else None,
+            'min_valuation': _optional_float(request.query_params.get('min_valuation')),
+            'max_valuation': _optional_float(request.query_params.get('max_valuation')),
+        }
+    except ValueError:
+        return Response({"error": "Invalid filter value"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    position = decode_cursor(request) or {'offset': 0}
+    offset = position.get('offset')
+    if not isinstance(offset, int) or offset < 0:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_404_NOT_FOUND)
+    page_size = page_size_from_request(request)
+    limit = min(offset + page_size + 1, settings.FULLTEXT_SEARCH_MAX_RESULTS)
+    
+    ranked = search_images(query, filters, limit)
+    page = ranked[offset:offset + page_size]
+    
+    # Another process may have made a collection private since this index saw it
+    images = filter_images(Image.objects.all(), filters).in_bulk([image_id for image_id, _ in page])
+    hits = [(images[image_id], score) for image_id, score in page if image_id in images]
+    data = ImageSerializer(
+        [image for image, _ in hits],
+        many=True,
+        context={'request': request}
+    ).data
+    results = []
+    for item, (image, score) in zip(data, hits):
+        item['score'] = round(score, 4)
+        item['highlighted_title'] = highlight(image.title, query)
+        item['snippet'] = highlight(image.description, query, max_length=160)
+        results.append(item)
+    
+    next_url = None
+    if len(ranked) > offset + page_size:
+        next_url = next_page_url(request, {'offset': offset + page_size})
+    return paginated_list_response(results, next_url)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def tag_suggestions(request):
+    """
+    Most used tags starting with ?prefix=, for autocomplete: tags in use on
+    public collections plus the requesting user's own
+    
+    Query params: prefix (may be empty) and limit (at most TAG_SUGGEST_LIMIT)
+    """
+    try:
+        limit = int(request.query_params.get('limit', settings.TAG_SUGGEST_LIMIT))
+    except ValueError:
+        return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, settings.TAG_SUGGEST_LIMIT))
+    suggestions = suggest_tags(request.query_params.get('prefix', ''), limit, user_id=request.user.id)
+    return Response([{'name': name, 'count': count} for name, count in suggestions])
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_search(request):
+    """
+    Prefix search over usernames, emails, names and display names
+    
+    Every word of ?q= must start one of the user's UserSearchTerms. Results
+    are a lean projection (no categories or follow counts) ordered by
+    username, paginated with ?page_size= and a cursor, and cached for
+    USER_SEARCH_CACHE_TTL seconds since clients search on every keystroke.
+    """
+    words = request.query_params.get('q', '').lower().split()[:5]
+    if not words:
+        return Response([])
+    position = decode_cursor(request) or {}
+    after = position.get('username')
+    page_size = page_size_from_request(request)
+    
+    cache_key = 'user_search:' + hashlib.sha1(
+        json.dumps([words, after, page_size]).encode()
+    ).hexdigest()
+    cached = cache.get(cache_key)
+    if cached is None:
+        users = User.objects.all()
+        for word in words:
+            # istartswith compiles to LIKE 'word%' on MySQL, a range scan of the term index
+            users = users.filter(id__in=UserSearchTerm.objects.filter(term__istartswith=word).values('user_id'))
+        if after is not None:
+            users = users.filter(username__gt=after)
+        rows = list(
+            users.order_by('username').values_list(
+                'id', 'username', 'first_name', 'last_name',
+                'profile__display_name', 'profile__profile_picture'
+            )[:page_size + 1]
+        )
+        presigned_urls = generate_presigned_urls([row[5] for row in rows[:page_size] if row[5]])
+        results = [
+            {
+                'id': user_id,
+                'username': username,
+                'first_name': first_name,
+                'last_name': last_name,
+                'display_name': display_name,
+                'profile_picture_url': presigned_urls.get(picture) if picture else None,
+            }
+            for user_id, username, first_name, last_name, display_name, picture in rows[:page_size]
+        ]
+        next_after = rows[page_size - 1][1] if len(rows) > page_size else None
+        cached = (results, next_after)
+        cache.set(cache_key, cached, settings.USER_SEARCH_CACHE_TTL)
+    
+    results, next_after = cached
+    next_url = next_page_url(request, {'username': next_after}) if next_after is not None else None
+    return paginated_list_response(results, next_url)
@@ -135,6 +135,116 @@ AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
 AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME', 'us-east-1')
 AWS_S3_CUSTOM_DOMAIN = f"{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com"
 
+# Shared S3 client tuning (see api.utils.S3ClientManager)
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_S3_MAX_POOL_CONNECTIONS', '50'))
+AWS_S3_TCP_KEEPALIVE = os.environ.get('AWS_S3_TCP_KEEPALIVE', 'true').lower() == 'true'
+AWS_S3_RETRY_MODE = os.environ.get('AWS_S3_RETRY_MODE', 'standard')
+AWS_S3_MAX_ATTEMPTS = int(os.environ.get('AWS_S3_MAX_ATTEMPTS', '3'))
+AWS_S3_CONNECT_TIMEOUT = float(os.environ.get('AWS_S3_CONNECT_TIMEOUT', '5'))
+AWS_S3_READ_TIMEOUT = float(os.environ.get('AWS_S3_READ_TIMEOUT', '30'))
+
+# Upload transfer profile (see api.utils.get_transfer_config). Keep
+# AWS_S3_MAX_CONCURRENCY below AWS_S3_MAX_POOL_CONNECTIONS.
+AWS_S3_MULTIPART_THRESHOLD = int(os.environ.get('AWS_S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+AWS_S3_MULTIPART_CHUNKSIZE = int(os.environ.get('AWS_S3_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+AWS_S3_MAX_CONCURRENCY = int(os.environ.get('AWS_S3_MAX_CONCURRENCY', '10'))
+# Bytes per second per upload; unset means unlimited
+AWS_S3_MAX_BANDWIDTH = int(os.environ['AWS_S3_MAX_BANDWIDTH']) if os.environ.get('AWS_S3_MAX_BANDWIDTH') else None
+
+# Store uploads under user_<id>/cas/<sha256> so identical files are kept once
+S3_CONTENT_ADDRESSED_UPLOADS = os.environ.get('S3_CONTENT_ADDRESSED_UPLOADS', 'false').lower() == 'true'
+
+# Presigned URL cache (see api.utils.PresignedUrlCache)
+PRESIGNED_URL_CACHE_MAX_ENTRIES = int(os.environ.get('PRESIGNED_URL_CACHE_MAX_ENTRIES', '10000'))
+PRESIGNED_URL_CACHE_MIN_REMAINING = int(os.environ.get('PRESIGNED_URL_CACHE_MIN_REMAINING', '900'))
+
+# Serve image URLs through /api/media/<id>/ redirects instead of raw presigned URLs
+MEDIA_STABLE_URLS = os.environ.get('MEDIA_STABLE_URLS', 'false').lower() == 'true'
+MEDIA_REDIRECT_URL_EXPIRATION = int(os.environ.get('MEDIA_REDIRECT_URL_EXPIRATION', '3600'))
+
+# Resized/WebP image derivatives (see api.thumbnails): 'upload', 'lazy' or 'off'
+IMAGE_DERIVATIVES_MODE = os.environ.get('IMAGE_DERIVATIVES_MODE', 'upload')
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1280]
+# Lazy mode: seconds before an image whose original failed to download is queued again
+IMAGE_DERIVATIVES_RETRY_AFTER = int(os.environ.get('IMAGE_DERIVATIVES_RETRY_AFTER', '900'))
+
+# Background uploads (POST /api/images/upload/?async=true, see api.tasks)
+UPLOAD_WORKER_THREADS = int(os.environ.get('UPLOAD_WORKER_THREADS', '4'))
+UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR', str(BASE_DIR / 'upload_spool'))
+# Unfinished jobs idle this many seconds are recovered at startup and by
+# manage.py recover_upload_jobs (see api.tasks.recover_upload_jobs). Jobs
+# run on an in-process pool, so schedule that command (or
+# api.tasks.scheduled_upload_job_recovery on zappa) as well; a recycled
+# worker or frozen Lambda loses its queue without restarting. See
+# "Scheduled jobs" in the README.
+UPLOAD_JOB_STALE_AFTER = int(os.environ.get('UPLOAD_JOB_STALE_AFTER', '3600'))
+
+# S3 deletion outbox (see api.tasks.drain_s3_deletions). Failed deletes are
+# retried after S3_DELETE_RETRY_BACKOFF seconds, doubling on each attempt.
+# The retries are in-process timers, so schedule manage.py
+# drain_s3_deletions (or api.tasks.scheduled_s3_deletion_drain on zappa)
+# every few minutes; see "Scheduled jobs" in the README.
+S3_DELETE_MAX_ATTEMPTS = int(os.environ.get('S3_DELETE_MAX_ATTEMPTS', '8'))
+S3_DELETE_RETRY_BACKOFF = int(os.environ.get('S3_DELETE_RETRY_BACKOFF', '30'))
+# Seconds a deduplicated upload protects its object from queued deletions
+S3_UPLOAD_PIN_TTL = int(os.environ.get('S3_UPLOAD_PIN_TTL', '3600'))
+
+# Direct browser-to-S3 uploads (presigned POST + confirm)
+DIRECT_UPLOAD_MAX_BYTES = int(os.environ.get('DIRECT_UPLOAD_MAX_BYTES', str(50 * 1024 * 1024)))
+DIRECT_UPLOAD_EXPIRATION = int(os.environ.get('DIRECT_UPLOAD_EXPIRATION', '900'))
+DIRECT_UPLOAD_CONTENT_TYPES = [
+    'image/jpeg',
+    'image/png',
+    'image/gif',
+    'image/webp',
+    'image/heic',
+    'image/heif',
+]
+
+# Optional in-memory tag/title index (see api.search_index)
+SEARCH_INDEX_ENABLED = os.environ.get('SEARCH_INDEX_ENABLED', 'false').lower() == 'true'
+SEARCH_INDEX_SNAPSHOT_PATH = os.environ.get('SEARCH_INDEX_SNAPSHOT_PATH', str(BASE_DIR / 'search_index.json'))
+SEARCH_INDEX_MAX_AGE = int(os.environ.get('SEARCH_INDEX_MAX_AGE', '3600'))
+
+# Full-text image search, GET /api/search/ (see api.fulltext): 'bm25' or 'mysql'
+FULLTEXT_SEARCH_BACKEND = os.environ.get('FULLTEXT_SEARCH_BACKEND', 'bm25')
+FULLTEXT_INDEX_MAX_AGE = int(os.environ.get('FULLTEXT_INDEX_MAX_AGE', '3600'))
+# Deepest result a client can page to
+FULLTEXT_SEARCH_MAX_RESULTS = int(os.environ.get('FULLTEXT_SEARCH_MAX_RESULTS', '1000'))
+# p95 budget enforced by `manage.py benchmark_search`
+FULLTEXT_SEARCH_LATENCY_BUDGET_MS = float(os.environ.get('FULLTEXT_SEARCH_LATENCY_BUDGET_MS', '50'))
+
+# Tag autocomplete, GET /api/tags/suggest/ (see api.tag_suggest)
+TAG_SUGGEST_LIMIT = int(os.environ.get('TAG_SUGGEST_LIMIT', '10'))
+TAG_SUGGEST_MAX_AGE = int(os.environ.get('TAG_SUGGEST_MAX_AGE', '3600'))
+
+# Seconds a user search result page is reused for repeated queries
+USER_SEARCH_CACHE_TTL = int(os.environ.get('USER_SEARCH_CACHE_TTL', '30'))
+
+# Accounts with at least this many items read monthly spending from the
+# MonthlySpending rollup instead of aggregating their images
+FINANCIAL_ROLLUP_MIN_ITEMS = int(os.environ.get('FINANCIAL_ROLLUP_MIN_ITEMS', '5000'))
+
+# Seconds a cached /api/dashboard/ payload lives; writes drop it sooner
+DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', '300'))
+
+# Seconds a cached category, profile and financial response lives (see
+# api.response_cache); 0 disables the cache. Keep it below
+# PRESIGNED_URL_CACHE_MIN_REMAINING so cached image URLs stay valid.
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '300'))
+
+# Worker processes serving requests (the variable gunicorn reads). With
+# more than one, the response cache is off unless CACHES points at a shared
+# backend, since LocMemCache keeps separate generation counters per process.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+# Keyset pagination for list endpoints (see api.pagination)
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '100'))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '500'))
+
+# Thumbnails per collection in ?view=summary category lists
+CATEGORY_COVER_IMAGES = int(os.environ.get('CATEGORY_COVER_IMAGES', '4'))
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -146,6 +256,15 @@ REST_FRAMEWORK = {
 }
 
 ASGI_APPLICATION = 'backend.asgi.application'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',  # Per process
+        # Shared between processes:
+        # 'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        # 'LOCATION': 'redis://127.0.0.1:6379',
+    },
+}
+
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels.layers.InMemoryChannelLayer'  # For development only
@@ -206,6 +325,11 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Pagination links (see api.pagination) must be readable cross-origin
+CORS_EXPOSE_HEADERS = [
+    'link',
+]
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
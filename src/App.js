@@ -11,7 +11,7 @@ import DeleteAccountModal from "./components/DeleteAccountModal";
 import { fetchCategories } from "./services/api";
 import { logout, deleteUserAccount } from "./services/auth";
 import { useUser } from "./context/UserContext";
-import { getFollowers, getFollowing, getUserProfile } from "./services/api";
+import { getUserProfile } from "./services/api";
 import FollowListModal from "./components/FollowListModal";
 import EditProfileForm from "./components/EditProfileForm";
 import WishlistGrid from "./components/WishlistGrid";
@@ -25,6 +25,8 @@ const App = () => {
   const [isDeletingAccount, setIsDeletingAccount] = useState(false);
   const { user, loginUser, logoutUser, loading: authLoading } = useUser();
   const [categories, setCategories] = useState([]);
+  const [categoriesNext, setCategoriesNext] = useState(null);
+  const [loadingMoreCategories, setLoadingMoreCategories] = useState(false);
   const [selectedCategory, setSelectedCategory] = useState("");
   const [imageCache, setImageCache] = useState({});
   const [images, setImages] = useState([]);
@@ -64,12 +66,22 @@ const App = () => {
     
     try {
       setLoading(true);
-      const data = await fetchCategories();
+      const { results: firstPage, next } = await fetchCategories();
+      
+      // Refresh the first page but keep the collections already loaded with
+      // "Load more" (pages are newest first)
+      const firstPageIds = new Set(firstPage.map(cat => cat.id));
+      const oldestId = firstPage.length > 0 ? firstPage[firstPage.length - 1].id : null;
+      const laterPages = next
+        ? categories.filter(cat => !firstPageIds.has(cat.id) && cat.id < oldestId)
+        : [];
+      const data = [...firstPage, ...laterPages];
       setCategories(data);
+      setCategoriesNext(laterPages.length > 0 ? categoriesNext : next);
       
       // Initialize or update cache with fetched data
       const newCache = { ...imageCache };
-      data.forEach(category => {
+      firstPage.forEach(category => {
         if (category.images) {
           newCache[category.id] = category.images;
         }
@@ -101,22 +113,28 @@ const App = () => {
     }
   };
 
-  // Load user follower and following counts
-  const loadUserStats = async () => {
-    if (!user) return;
+  const loadMoreCategories = async () => {
+    if (!categoriesNext) return;
     
     try {
-      // Get followers count
-      const followers = await getFollowers();
-      console.log("Followers data:", followers);
-      setFollowerCount(followers.length);
-      
-      // Get following count
-      const following = await getFollowing();
-      console.log("Following data:", following);
-      setFollowingCount(following.length);
+      setLoadingMoreCategories(true);
+      const { results, next } = await fetchCategories(categoriesNext);
+      const loadedIds = new Set(categories.map(cat => cat.id));
+      setCategories([...categories, ...results.filter(cat => !loadedIds.has(cat.id))]);
+      setImageCache(prevCache => {
+        const newCache = { ...prevCache };
+        results.forEach(category => {
+          if (category.images) {
+            newCache[category.id] = category.images;
+          }
+        });
+        return newCache;
+      });
+      setCategoriesNext(next);
     } catch (err) {
-      console.error("Failed to load user stats:", err);
+      console.error("Failed to load more collections:", err);
+    } finally {
+      setLoadingMoreCategories(false);
     }
   };
 
@@ -124,6 +142,9 @@ const App = () => {
     try {
       const freshUser = await getUserProfile(user.id || user.user_id);
       loginUser(freshUser); 
+      // The profile carries the follow counts, so the lists are never fetched
+      setFollowerCount(freshUser.follower_count ?? 0);
+      setFollowingCount(freshUser.following_count ?? 0);
     } catch (err) {
       console.error("Failed to refresh user profile:", err);
     }
@@ -135,7 +156,6 @@ const App = () => {
       refreshedProfile.current = true; 
       loadFreshUserProfile();
       loadCategories();
-      loadUserStats();
     }
 }, [user]);
 
@@ -190,6 +210,7 @@ const App = () => {
       await logout();
       logoutUser();
       setCategories([]);
+      setCategoriesNext(null);
       setSelectedCategory("");
       setSelectedCategoryData(null);
       setImageCache({});
@@ -198,6 +219,7 @@ const App = () => {
       // Even if the server request fails, log the user out on the client side
       logoutUser();
       setCategories([]);
+      setCategoriesNext(null);
       setSelectedCategory("");
       setSelectedCategoryData(null);
       setImageCache({});
@@ -213,6 +235,7 @@ const App = () => {
       // Log the user out
       logoutUser();
       setCategories([]);
+      setCategoriesNext(null);
       setSelectedCategory("");
       setSelectedCategoryData(null);
       setImageCache({});
@@ -352,9 +375,20 @@ const App = () => {
         onTagClick={handleTagClick}
       />
 
+      {categoriesNext && (
+        <button 
+          className="load-more-button" 
+          onClick={loadMoreCategories}
+          disabled={loadingMoreCategories}
+        >
+          {loadingMoreCategories ? "Loading..." : "Load more collections"}
+        </button>
+      )}
+
       {/* Image Grid Component */}
       <ImageGrid 
         categoryId={selectedCategoryData?.id}
+        categoryName={selectedCategoryData?.name}
         images={selectedCategoryData ? imageCache[selectedCategoryData.id] || [] : []}
         categoryPlaceholder={selectedCategoryData?.placeholder_presigned_url}
         onImagesDeleted={handleImagesDeleted} 
@@ -364,6 +398,7 @@ const App = () => {
       {selectedCategoryData && (
         <WishlistGrid 
           categoryId={selectedCategoryData?.id}
+          categoryName={selectedCategoryData?.name}
           images={selectedCategoryData ? imageCache[selectedCategoryData.id] || [] : []}
           onImagesDeleted={handleImagesDeleted}
           onImagesUpdated={() => loadCategories()}
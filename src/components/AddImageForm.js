@@ -1,5 +1,5 @@
 import React, { useState } from "react";
-import { uploadImage } from "../services/api";
+import { uploadImage, suggestTags } from "../services/api";
 import "./Modal.css";
 import "./Tags.css";
 import { useEffect } from "react"; // Required for dynamic updates if needed
@@ -21,6 +21,7 @@ const AddImageForm = ({ categories, selectedCategory, onClose, onSuccess }) => {
   const [showTags, setShowTags] = useState(false);
   const [tags, setTags] = useState([]);
   const [newTag, setNewTag] = useState("");
+  const [suggestions, setSuggestions] = useState([]);
   const [isWishlist, setIsWishlist] = useState(false);
   const [purchaseUrl, setPurchaseUrl] = useState("");
 
@@ -120,6 +121,19 @@ const AddImageForm = ({ categories, selectedCategory, onClose, onSuccess }) => {
     setError("");
   };
 
+  // Suggest existing tags as the user types, so near-duplicates get reused
+  useEffect(() => {
+    const prefix = newTag.trim();
+    if (!prefix) {
+      setSuggestions([]);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      setSuggestions(await suggestTags(prefix));
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [newTag]);
+
   const handleRemoveTag = (tagToRemove) => {
     setTags(tags.filter(tag => tag !== tagToRemove));
   };
@@ -367,7 +381,13 @@ const AddImageForm = ({ categories, selectedCategory, onClose, onSuccess }) => {
                     onChange={(e) => setNewTag(e.target.value)}
                     onKeyDown={handleKeyDown}
                     placeholder="Enter tag and press Enter"
+                    list="tag-suggestions"
                   />
+                  <datalist id="tag-suggestions">
+                    {suggestions.map((suggestion) => (
+                      <option key={suggestion.name} value={suggestion.name} />
+                    ))}
+                  </datalist>
                   <button 
                     type="button" 
                     className="add-tag-button"
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
-import { getUserProfile, fetchCategories, fetchProfileStats } from "../services/api";
+import { getUserProfile, fetchCategories, fetchDashboard } from "../services/api";
 import { useUser } from "../context/UserContext";
 import CategoryList from "./CategoryList";
 import ImageGrid from "./ImageGrid";
@@ -12,6 +12,8 @@ const AuthUserProfile = () => {
   const navigate = useNavigate();
   const [profile, setProfile] = useState(null);
   const [categories, setCategories] = useState([]);
+  const [categoriesNext, setCategoriesNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedCategory, setSelectedCategory] = useState("");
   const [selectedCategoryData, setSelectedCategoryData] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -33,16 +35,17 @@ const AuthUserProfile = () => {
             const profileData = await getUserProfile(user.user_id || user.id);
             setProfile(profileData);
 
-            const categoryData = await fetchCategories();
+            const { results: categoryData, next } = await fetchCategories();
             setCategories(categoryData);
+            setCategoriesNext(next);
 
             if (categoryData.length > 0) {
                 setSelectedCategory(categoryData[0].name);
                 setSelectedCategoryData(categoryData[0]);
             }
 
-            // Fetch profile stats
-            const profileStats = await fetchProfileStats(user.user_id || user.id);
+            // Profile stats come from the cached dashboard
+            const profileStats = await fetchDashboard();
             setProfileStats(profileStats); // Ensure this state variable exists
 
         } catch (err) {
@@ -63,6 +66,19 @@ const AuthUserProfile = () => {
     }
   };
 
+  const loadMoreCategories = async () => {
+    try {
+      setLoadingMore(true);
+      const { results, next } = await fetchCategories(categoriesNext);
+      setCategories(prev => [...prev, ...results]);
+      setCategoriesNext(next);
+    } catch (err) {
+      console.error("Failed to load more collections:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleBack = () => {
     navigate(-1);
   };
@@ -151,8 +167,15 @@ const AuthUserProfile = () => {
             onSelectCategory={handleCategorySelect}
           />
 
+          {categoriesNext && (
+            <button className="load-more-button" onClick={loadMoreCategories} disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more collections"}
+            </button>
+          )}
+
           <ImageGrid 
             categoryId={selectedCategoryData?.id}
+            categoryName={selectedCategoryData?.name}
             images={selectedCategoryData?.images || []}
             categoryPlaceholder={selectedCategoryData?.placeholder_presigned_url}
           />
@@ -1,11 +1,12 @@
-import React, { useState } from "react";
+import React, { useState, useEffect } from "react";
 import "./Modal.css";
 import "./Tags.css";
-import { updateCategoryTags } from "../services/api";
+import { updateCategoryTags, suggestTags } from "../services/api";
 
 const EditTagsForm = ({ category, onClose, onSuccess }) => {
   const [tags, setTags] = useState(category.tags || []);
   const [newTag, setNewTag] = useState("");
+  const [suggestions, setSuggestions] = useState([]);
   const [error, setError] = useState("");
   const [loading, setLoading] = useState(false);
 
@@ -23,6 +24,19 @@ const EditTagsForm = ({ category, onClose, onSuccess }) => {
     setError("");
   };
 
+  // Suggest existing tags as the user types, so near-duplicates get reused
+  useEffect(() => {
+    const prefix = newTag.trim();
+    if (!prefix) {
+      setSuggestions([]);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      setSuggestions(await suggestTags(prefix));
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [newTag]);
+
   const handleRemoveTag = (tagToRemove) => {
     setTags(tags.filter(tag => tag !== tagToRemove));
   };
@@ -69,7 +83,13 @@ const EditTagsForm = ({ category, onClose, onSuccess }) => {
                 onChange={(e) => setNewTag(e.target.value)}
                 onKeyDown={handleKeyDown}
                 placeholder="Enter tag and press Enter"
+                list="tag-suggestions"
               />
+              <datalist id="tag-suggestions">
+                {suggestions.map((suggestion) => (
+                  <option key={suggestion.name} value={suggestion.name} />
+                ))}
+              </datalist>
               <button 
                 type="button" 
                 className="add-tag-button"
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import "./FinancialEval.css";
 import { useNavigate } from "react-router-dom";
 import SetGoalModal from "../components/SetGoalModal";
-import { fetchFinancialData, getUserGoals } from "../services/api"; // Add getUserGoals
+import { fetchDashboard } from "../services/api";
 import { BarChart, Bar, XAxis, YAxis, Tooltip, ReferenceLine } from "recharts"; // Charting Library
 import { useUser } from "../context/UserContext";
 
@@ -25,30 +25,24 @@ const FinancialEval = () => {
     console.log("User from context:", user);
 
     useEffect(() => {
-        // Load financial data
-        const loadFinancialData = async () => {
+        // Financial data and goals arrive in one dashboard request
+        const loadDashboard = async () => {
             try {
-                const data = await fetchFinancialData();
-                setFinancialData(data);
-            } catch (error) {
-                console.error("Failed to load financial data:", error);
-            }
-        };
-
-        // Load user goals
-        const loadUserGoals = async () => {
-            try {
-                const goals = await getUserGoals(userId);
-                if (goals.length > 0) {
-                    setCurrentGoal(goals[0]); // Assume displaying the most recent goal
+                const data = await fetchDashboard();
+                setFinancialData({
+                    totalSpending: data.totalSpending,
+                    collections: data.collections,
+                    monthlySpending: data.monthlySpending,
+                });
+                if (data.goals.length > 0) {
+                    setCurrentGoal(data.goals[0]); // Assume displaying the most recent goal
                 }
             } catch (error) {
-                console.error("Failed to load user goals:", error);
+                console.error("Failed to load dashboard:", error);
             }
         };
 
-        loadFinancialData();
-        loadUserGoals();
+        loadDashboard();
     }, [userId]);
 
     return (
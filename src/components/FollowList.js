@@ -3,24 +3,25 @@ import { Link } from "react-router-dom";
 import { getFollowers, getFollowing, followUser, unfollowUser } from "../services/api";
 import "./FollowList.css";
 
+// One page of followers or followed users; pass the previous page's `next` for more
+const fetchFollowPage = (type, userId, pageUrl) =>
+  type === "followers" ? getFollowers(userId, pageUrl) : getFollowing(userId, pageUrl);
+
 const FollowList = ({ type }) => {
   const [users, setUsers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   useEffect(() => {
     const loadUsers = async () => {
       try {
         setLoading(true);
         
-        let data;
-        if (type === "followers") {
-          data = await getFollowers();
-        } else {
-          data = await getFollowing();
-        }
-        
-        setUsers(data);
+        const { results, next } = await fetchFollowPage(type, null, null);
+        setUsers(results);
+        setNextPage(next);
         setLoading(false);
       } catch (err) {
         console.error(`Error loading ${type}:`, err);
@@ -32,6 +33,19 @@ const FollowList = ({ type }) => {
     loadUsers();
   }, [type]);
   
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const { results, next } = await fetchFollowPage(type, null, nextPage);
+      setUsers(prev => [...prev, ...results]);
+      setNextPage(next);
+    } catch (err) {
+      console.error(`Error loading more ${type}:`, err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+  
   const handleFollowToggle = async (userId, currentlyFollowing) => {
     try {
       if (currentlyFollowing) {
@@ -115,6 +129,12 @@ const FollowList = ({ type }) => {
           </div>
         ))}
       </div>
+      
+      {nextPage && (
+        <button className="load-more-button" onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? "Loading..." : "Load more"}
+        </button>
+      )}
     </div>
   );
 };
@@ -4,24 +4,25 @@ import { getFollowers, getFollowing, followUser, unfollowUser } from "../service
 import "./Modal.css";
 import "./FollowList.css";
 
+// One page of followers or followed users; pass the previous page's `next` for more
+const fetchFollowPage = (type, userId, pageUrl) =>
+  type === "followers" ? getFollowers(userId, pageUrl) : getFollowing(userId, pageUrl);
+
 const FollowListModal = ({ type, onClose, userId = null }) => {
   const [users, setUsers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   useEffect(() => {
     const loadUsers = async () => {
       try {
         setLoading(true);
         
-        let data;
-        if (type === "followers") {
-          data = await getFollowers(userId);
-        } else {
-          data = await getFollowing(userId);
-        }
-        
-        setUsers(data);
+        const { results, next } = await fetchFollowPage(type, userId, null);
+        setUsers(results);
+        setNextPage(next);
         setLoading(false);
       } catch (err) {
         console.error(`Error loading ${type}:`, err);
@@ -33,6 +34,19 @@ const FollowListModal = ({ type, onClose, userId = null }) => {
     loadUsers();
   }, [type, userId]);
   
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const { results, next } = await fetchFollowPage(type, userId, nextPage);
+      setUsers(prev => [...prev, ...results]);
+      setNextPage(next);
+    } catch (err) {
+      console.error(`Error loading more ${type}:`, err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+  
   const handleFollowToggle = async (userId, currentlyFollowing) => {
     try {
       if (currentlyFollowing) {
@@ -73,47 +87,55 @@ const FollowListModal = ({ type, onClose, userId = null }) => {
     }
     
     return (
-      <div className="follow-list-container">
-        {users.map(user => (
-          <div key={user.id} className="follow-item">
-            <Link to={`/profile/${user.id}`} className="user-link" onClick={onClose}>
-              <div className="user-info-wrapper">
-                {user.profile_picture_url && (
-                  <img 
-                    src={user.profile_picture_url} 
-                    alt={user.first_name} 
-                    className="user-list-avatar"
-                  />
-                )}
-                <div className="user-info">
-                  <span className="user-name">
-                    {user.display_name || `${user.first_name} ${user.last_name}`}
-                  </span>
-                  <span className="user-username">@{user.username}</span>
+      <>
+        <div className="follow-list-container">
+          {users.map(user => (
+            <div key={user.id} className="follow-item">
+              <Link to={`/profile/${user.id}`} className="user-link" onClick={onClose}>
+                <div className="user-info-wrapper">
+                  {user.profile_picture_url && (
+                    <img 
+                      src={user.profile_picture_url} 
+                      alt={user.first_name} 
+                      className="user-list-avatar"
+                    />
+                  )}
+                  <div className="user-info">
+                    <span className="user-name">
+                      {user.display_name || `${user.first_name} ${user.last_name}`}
+                    </span>
+                    <span className="user-username">@{user.username}</span>
+                  </div>
                 </div>
-              </div>
-            </Link>
+              </Link>
             
-            {type === "followers" && (
-              <button 
-                className={`follow-button ${user.is_following ? 'following' : ''}`}
-                onClick={() => handleFollowToggle(user.id, user.is_following)}
-              >
-                {user.is_following ? "Following" : "Follow"}
-              </button>
-            )}
+              {type === "followers" && (
+                <button 
+                  className={`follow-button ${user.is_following ? 'following' : ''}`}
+                  onClick={() => handleFollowToggle(user.id, user.is_following)}
+                >
+                  {user.is_following ? "Following" : "Follow"}
+                </button>
+              )}
             
-            {type === "following" && (
-              <button 
-                className="unfollow-button"
-                onClick={() => handleFollowToggle(user.id, true)}
-              >
-                Unfollow
-              </button>
-            )}
-          </div>
-        ))}
-      </div>
+              {type === "following" && (
+                <button 
+                  className="unfollow-button"
+                  onClick={() => handleFollowToggle(user.id, true)}
+                >
+                  Unfollow
+                </button>
+              )}
+            </div>
+          ))}
+        </div>
+      
+        {nextPage && (
+          <button className="load-more-button" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? "Loading..." : "Load more"}
+          </button>
+        )}
+      </>
     );
   };
   
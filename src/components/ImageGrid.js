@@ -4,11 +4,10 @@ import { bulkDeleteImages } from '../services/api';
 import ConfirmationModal from './ConfirmationModal';
 import EditImageDetailsForm from './EditImageDetailsForm';
 import ImageModal from './ImageModal';
-import { fetchCategories } from '../services/api';
 import "./Tags.css";
 import TagSearchModal from "./TagSearchModal";
 
-const ImageGrid = ({ categoryId, images: initialImages, categoryPlaceholder, onImagesDeleted, onImagesUpdated, viewOnly = false, onTagClick}) => {
+const ImageGrid = ({ categoryId, categoryName, images: initialImages, categoryPlaceholder, onImagesDeleted, onImagesUpdated, viewOnly = false, onTagClick}) => {
   const [images, setImages] = useState(initialImages || []);
   const [isConnected, setIsConnected] = useState(false);
   const socketRef = useRef(null);
@@ -21,7 +20,6 @@ const ImageGrid = ({ categoryId, images: initialImages, categoryPlaceholder, onI
   const [imageToEdit, setImageToEdit] = useState(null);
   const [selectedImage, setSelectedImage] = useState(null);
   const [imageModalOpen, setImageModalOpen] = useState(false);
-  const [categories, setCategories] = useState([]);
   const [tagSearchModalOpen, setTagSearchModalOpen] = useState(false);
   const [selectedTag, setSelectedTag] = useState("");
   
@@ -30,14 +28,12 @@ const ImageGrid = ({ categoryId, images: initialImages, categoryPlaceholder, onI
     const processedImages = (initialImages || [])
       .filter(image => !image.is_wishlist) // Step 1: Exclude wishlist items
       .map(image => {
-        const matchedCategory = categories && categories.length > 0 ? 
-          categories.find(cat => cat.id === image.category) : null;
         return {
           ...image,
           public_url: image.path ? 
             `https://csce482-collections-bucket.s3.amazonaws.com/${image.path}` : 
             null,
-          category_name: matchedCategory ? matchedCategory.name : 'Unknown'
+          category_name: categoryName || 'Unknown'
         };
       });
       
@@ -47,22 +43,8 @@ const ImageGrid = ({ categoryId, images: initialImages, categoryPlaceholder, onI
     setIsSelectionMode(false);
       
     console.log("Updated images:", processedImages);
-  }, [initialImages, categoryId, categories]);
+  }, [initialImages, categoryId, categoryName]);
 
-  // loading category name ahead of time 
-  useEffect(() => {
-    const loadCategories = async () => {
-      try {
-        const data = await fetchCategories();
-        setCategories(data);
-      } catch (error) {
-        console.error("Failed to fetch categories:", error);
-      }
-    };
-  
-    loadCategories();
-  }, []);
-  
   // ... existing WebSocket code ...
   const handleTagClick = (e, tag) => {
     // Check if e is an Event object before calling stopPropagation
@@ -8,6 +8,8 @@ const TagSearchModal = ({ tag, onClose }) => {
   const [results, setResults] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   useEffect(() => {
     // Log the tag value for debugging
@@ -23,8 +25,9 @@ const TagSearchModal = ({ tag, onClose }) => {
         }
         
         setLoading(true);
-        const data = await searchByTag(tag);
+        const { results: data, next } = await searchByTag(tag);
         setResults(data);
+        setNextPage(next);
         setLoading(false);
       } catch (err) {
         console.error(`Error searching for tag "${tag}":`, err);
@@ -38,6 +41,19 @@ const TagSearchModal = ({ tag, onClose }) => {
     }
   }, [tag]);
   
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const { results: data, next } = await searchByTag(tag, nextPage);
+      setResults(prev => [...prev, ...data]);
+      setNextPage(next);
+    } catch (err) {
+      console.error(`Error loading more results for tag "${tag}":`, err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+  
   // Handle closing by clicking outside the modal
   const handleOverlayClick = (e) => {
     if (e.target.className === "modal-overlay") {
@@ -63,47 +79,55 @@ const TagSearchModal = ({ tag, onClose }) => {
     }
     
     return (
-      <div className="follow-list-container">
-        {results.map((result, index) => (
-          <div key={`${result.type}-${result.id}-${index}`} className="follow-item">
-            <Link to={`/profile/${result.user.id}`} className="user-link" onClick={onClose}>
-              <div className="user-info-wrapper">
-                {result.user.profile_picture_url && (
+      <>
+        <div className="follow-list-container">
+          {results.map((result, index) => (
+            <div key={`${result.type}-${result.id}-${index}`} className="follow-item">
+              <Link to={`/profile/${result.user.id}`} className="user-link" onClick={onClose}>
+                <div className="user-info-wrapper">
+                  {result.user.profile_picture_url && (
+                    <img 
+                      src={result.user.profile_picture_url} 
+                      alt={result.user.first_name} 
+                      className="user-list-avatar"
+                    />
+                  )}
+                  <div className="user-info">
+                    <span className="user-name">
+                      {result.user.display_name || `${result.user.first_name} ${result.user.last_name}`}
+                    </span>
+                    <span className="user-username">@{result.user.username}</span>
+                  </div>
+                </div>
+              </Link>
+            
+              <div className="tag-result-preview">
+                {result.image_url && (
                   <img 
-                    src={result.user.profile_picture_url} 
-                    alt={result.user.first_name} 
-                    className="user-list-avatar"
+                    src={result.image_url} 
+                    alt={result.title} 
+                    className="tag-result-thumbnail"
                   />
                 )}
-                <div className="user-info">
-                  <span className="user-name">
-                    {result.user.display_name || `${result.user.first_name} ${result.user.last_name}`}
-                  </span>
-                  <span className="user-username">@{result.user.username}</span>
-                </div>
-              </div>
-            </Link>
-            
-            <div className="tag-result-preview">
-              {result.image_url && (
-                <img 
-                  src={result.image_url} 
-                  alt={result.title} 
-                  className="tag-result-thumbnail"
-                />
-              )}
-              <div className="tag-result-info">
-                <div className="tag-result-type">
-                  {result.type === 'category' ? 'Collection' : 'Image'}
-                </div>
-                <div className="tag-result-name" title={result.title}>
-                  {result.title}
+                <div className="tag-result-info">
+                  <div className="tag-result-type">
+                    {result.type === 'category' ? 'Collection' : 'Image'}
+                  </div>
+                  <div className="tag-result-name" title={result.title}>
+                    {result.title}
+                  </div>
                 </div>
               </div>
             </div>
-          </div>
-        ))}
-      </div>
+          ))}
+        </div>
+      
+        {nextPage && (
+          <button className="load-more-button" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? "Loading..." : "Load more"}
+          </button>
+        )}
+      </>
     );
   };
   
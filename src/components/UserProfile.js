@@ -14,6 +14,8 @@ const UserProfile = () => {
   const [profile, setProfile] = useState(null);
   const user = {}; // Replace with actual user object or context if available
   const [categories, setCategories] = useState([]);
+  const [categoriesNext, setCategoriesNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedCategory, setSelectedCategory] = useState("");
   const [selectedCategoryData, setSelectedCategoryData] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -35,8 +37,9 @@ const UserProfile = () => {
         setFollowing(profileData.is_following);
         
         // Fetch user's categories
-        const categoriesData = await getUserCategories(userId, userId !== user?.id);
+        const { results: categoriesData, next } = await getUserCategories(userId, userId !== user?.id);
         setCategories(categoriesData);
+        setCategoriesNext(next);
         
         // Select first category if exists
         if (categoriesData.length > 0) {
@@ -65,6 +68,19 @@ const UserProfile = () => {
     }
   };
 
+  const loadMoreCategories = async () => {
+    try {
+      setLoadingMore(true);
+      const { results, next } = await getUserCategories(userId, userId !== user?.id, categoriesNext);
+      setCategories(prev => [...prev, ...results]);
+      setCategoriesNext(next);
+    } catch (err) {
+      console.error("Failed to load more collections:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleFollowToggle = async () => {
     try {
       setFollowLoading(true);
@@ -175,8 +191,15 @@ const UserProfile = () => {
             viewOnly={true}
           />
 
+          {categoriesNext && (
+            <button className="load-more-button" onClick={loadMoreCategories} disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more collections"}
+            </button>
+          )}
+
           <ImageGrid 
             categoryId={selectedCategoryData?.id}
+            categoryName={selectedCategoryData?.name}
             images={selectedCategoryData?.images || []}
             categoryPlaceholder={selectedCategoryData?.placeholder_presigned_url}
             viewOnly={true}
@@ -187,6 +210,7 @@ const UserProfile = () => {
       {selectedCategoryData && (
         <WishlistGrid 
           categoryId={selectedCategoryData?.id}
+          categoryName={selectedCategoryData?.name}
           images={selectedCategoryData?.images || []}
           categoryPlaceholder={selectedCategoryData?.placeholder_presigned_url}
           viewOnly={true}
@@ -42,9 +42,8 @@ const UserSearch = () => {
     
     try {
       setLoading(true);
-      // Ensure the query is properly encoded in the URL
-      const encodedQuery = encodeURIComponent(query.trim());
-      const data = await searchUsers(encodedQuery);
+      // searchUsers encodes the query itself
+      const data = await searchUsers(query.trim());
       setResults(data);
       setShowResults(true);
       setLoading(false);
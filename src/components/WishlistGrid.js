@@ -5,11 +5,11 @@ import { bulkDeleteImages, transferToCollection } from '../services/api';
 import ConfirmationModal from './ConfirmationModal';
 import EditImageDetailsForm from './EditImageDetailsForm';
 import WishlistModal from './WishlistModal';
-import { fetchCategories } from '../services/api';
 import "./Tags.css";
 
 const WishlistGrid = ({ 
   categoryId,  
+  categoryName,
   images, 
   onImagesDeleted, 
   onImagesUpdated, 
@@ -26,7 +26,6 @@ const WishlistGrid = ({
   const [showTransferConfirmation, setShowTransferConfirmation] = useState(false);
   const [wishlistModalOpen, setWishlistModalOpen] = useState(false);
   const [modalImage, setModalImage] = useState(null);
-  const [categories, setCategories] = useState([]);
   const [wishlistImages, setWishlistImages] = useState([]);
   
   // Filter to only show wishlist items
@@ -34,13 +33,12 @@ const WishlistGrid = ({
     const processedImages = (images || [])
       .filter(img => img.is_wishlist)
       .map(img => {
-        const matchedCategory = categories.find(cat => cat.id === img.category);
         return {
           ...img,
           public_url: img.path 
             ? `https://csce482-collections-bucket.s3.amazonaws.com/${img.path}` 
             : null,
-          category_name: matchedCategory ? matchedCategory.name : 'Unknown'
+          category_name: categoryName || 'Unknown'
         };
       });
   
@@ -49,21 +47,8 @@ const WishlistGrid = ({
     setIsSelectionMode(false);
   
     console.log("Processed wishlist images:", processedImages);
-  }, [images, categoryId, categories]);
+  }, [images, categoryId, categoryName]);
 
-  useEffect(() => {
-    const loadCategories = async () => {
-      try {
-        const data = await fetchCategories();
-        setCategories(data);
-      } catch (error) {
-        console.error("Failed to fetch categories:", error);
-      }
-    };
-  
-    loadCategories();
-  }, []);
-  
   if (!wishlistImages || wishlistImages.length === 0) {
     return (
       <div className="no-images">
@@ -1,8 +1,23 @@
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
 
-export const fetchCategories = async () => {
+// List endpoints are paginated: each page is a JSON array and the next page,
+// if any, is advertised in the Link header (rel="next"). The list helpers
+// return one page as { results, next }; pass `next` back to load the page
+// after it when the user asks for more.
+const fetchPage = async (url, options) => {
+  const response = await fetch(url, options);
+  if (!response.ok) {
+    throw new Error(`HTTP error! Status: ${response.status}`);
+  }
+  const results = await response.json();
+  const link = response.headers ? response.headers.get('Link') : null;
+  const match = link && link.match(/<([^>]+)>;\s*rel="next"/);
+  return { results, next: match ? match[1] : null };
+};
+
+export const fetchCategories = async (pageUrl = null) => {
   try {
-    const response = await fetch(`${API_URL}/categories/`, {
+    return await fetchPage(pageUrl || `${API_URL}/categories/`, {
       method: 'GET',
       credentials: 'include',  // Important: This sends cookies with the request
       headers: {
@@ -10,10 +25,6 @@ export const fetchCategories = async () => {
         'Content-Type': 'application/json',
       },
     });
-    if (!response.ok) {
-      throw new Error(`HTTP error! Status: ${response.status}`);
-    }
-    return await response.json();
   } catch (error) {
     console.error("Error fetching categories:", error);
     throw error;
@@ -265,15 +276,14 @@ export const getUserStats = async (userId) => {
 export const searchUsers = async (query) => {
   try {
     const encodedQuery = encodeURIComponent(query);
-    const response = await fetch(`${API_URL}/profiles/?search=${encodedQuery}`, {
+    // First page only: the results drop down while typing
+    const response = await fetch(`${API_URL}/users/search/?q=${encodedQuery}&page_size=20`, {
       method: 'GET',
       credentials: 'include'
     });
-    
     if (!response.ok) {
-      throw new Error(`HTTP error! Status: ${response.status}`);
+      throw new Error(`Failed to search users: ${response.status}`);
     }
-    
     return await response.json();
   } catch (error) {
     console.error("Error searching users:", error);
@@ -299,22 +309,16 @@ export const getUserProfile = async (userId) => {
   }
 };
 
-export const getUserCategories = async (userId, publicOnly = false) => {
+export const getUserCategories = async (userId, publicOnly = false, pageUrl = null) => {
   try {
     const url = publicOnly ? 
       `${API_URL}/profiles/${userId}/categories/?public_only=true` : 
       `${API_URL}/profiles/${userId}/categories/`;
       
-    const response = await fetch(url, {
+    return await fetchPage(pageUrl || url, {
       method: 'GET',
       credentials: 'include'
     });
-    
-    if (!response.ok) {
-      throw new Error(`HTTP error! Status: ${response.status}`);
-    }
-    
-    return await response.json();
   } catch (error) {
     console.error("Error fetching user categories:", error);
     throw error;
@@ -375,46 +379,34 @@ export const unfollowUser = async (userId) => {
   }
 };
 
-export const getFollowers = async (userId = null) => {
+export const getFollowers = async (userId = null, pageUrl = null) => {
   try {
     // If userId is provided, get followers for that user, otherwise get current user's followers
     const endpoint = userId ? 
       `${API_URL}/profiles/${userId}/followers/` : 
       `${API_URL}/follows/followers/`;
     
-    const response = await fetch(endpoint, {
+    return await fetchPage(pageUrl || endpoint, {
       method: 'GET',
       credentials: 'include'
     });
-    
-    if (!response.ok) {
-      throw new Error(`HTTP error! Status: ${response.status}`);
-    }
-    
-    return await response.json();
   } catch (error) {
     console.error("Error fetching followers:", error);
     throw error;
   }
 };
 
-export const getFollowing = async (userId = null) => {
+export const getFollowing = async (userId = null, pageUrl = null) => {
   try {
     // If userId is provided, get following for that user, otherwise get current user's following
     const endpoint = userId ? 
       `${API_URL}/profiles/${userId}/following/` : 
       `${API_URL}/follows/following/`;
     
-    const response = await fetch(endpoint, {
+    return await fetchPage(pageUrl || endpoint, {
       method: 'GET',
       credentials: 'include'
     });
-    
-    if (!response.ok) {
-      throw new Error(`HTTP error! Status: ${response.status}`);
-    }
-    
-    return await response.json();
   } catch (error) {
     console.error("Error fetching following:", error);
     throw error;
@@ -695,6 +687,35 @@ export const fetchProfileStats = async () => {
   }
 };
 
+// Financial data, profile stats and goals of the logged-in user in one request
+export const fetchDashboard = async () => {
+  try {
+      const response = await fetch(`${API_URL}/dashboard/`, {
+          method: 'GET',
+          credentials: 'include',
+          headers: {
+              'Accept': 'application/json',
+          },
+      });
+
+      if (!response.ok) {
+          throw new Error(`HTTP error! Status: ${response.status}`);
+      }
+
+      const data = await response.json();
+      return {
+          ...data,
+          monthlySpending: (data.monthlySpending || []).map(item => ({
+              ...item,
+              amount: parseFloat(item.amount).toFixed(2),
+          })),
+      };
+  } catch (error) {
+      console.error("Error fetching dashboard:", error);
+      throw error;
+  }
+};
+
 export const fetchFinancialData = async () => {
   try {
       const response = await fetch(`${API_URL}/financial-data/`, {
@@ -773,22 +794,33 @@ export const getUserGoals = async (userId) => {
   }
 };
 
-export const searchByTag = async (tag) => {
+export const searchByTag = async (tag, pageUrl = null) => {
   try {
     const encodedTag = encodeURIComponent(tag);
-    const response = await fetch(`${API_URL}/search/by-tag/?tag=${encodedTag}`, {
+    return await fetchPage(pageUrl || `${API_URL}/search/by-tag/?tag=${encodedTag}`, {
+      method: 'GET',
+      credentials: 'include'
+    });
+  } catch (error) {
+    console.error("Error searching by tag:", error);
+    throw error;
+  }
+};
+
+// Most used existing tags starting with prefix, as [{ name, count }]
+export const suggestTags = async (prefix) => {
+  try {
+    const response = await fetch(`${API_URL}/tags/suggest/?prefix=${encodeURIComponent(prefix)}`, {
       method: 'GET',
       credentials: 'include'
     });
-    
     if (!response.ok) {
-      throw new Error(`HTTP error! Status: ${response.status}`);
+      throw new Error(`Failed to fetch tag suggestions: ${response.status}`);
     }
-    
     return await response.json();
   } catch (error) {
-    console.error("Error searching by tag:", error);
-    throw error;
+    console.error("Error fetching tag suggestions:", error);
+    return [];
   }
 };
 
@@ -52,9 +52,16 @@ describe('App Component', () => {
     });
     
     // Mock empty categories list
-    api.fetchCategories.mockResolvedValue([]);
-    api.getFollowers.mockResolvedValue([]);
-    api.getFollowing.mockResolvedValue([]);
+    api.fetchCategories.mockResolvedValue({ results: [], next: null });
+    api.getUserProfile.mockResolvedValue({
+      id: 1,
+      username: 'testuser',
+      email: 'test@example.com',
+      first_name: 'Test',
+      last_name: 'User',
+      follower_count: 0,
+      following_count: 0
+    });
     
     render(
       <UserProvider>
@@ -43,7 +43,7 @@ describe('UserProfile Component', () => {
     
     // Mock API responses
     api.getUserProfile.mockResolvedValue(mockProfile);
-    api.getUserCategories.mockResolvedValue(mockCategories);
+    api.getUserCategories.mockResolvedValue({ results: mockCategories, next: null });
     api.followUser.mockResolvedValue({ id: 1, follower: 1, followed: 2 });
     api.unfollowUser.mockResolvedValue(true);
   });
@@ -112,7 +112,7 @@ describe('UserProfile Component', () => {
 
   test('shows no collections message when user has no categories', async () => {
     // Mock empty categories
-    api.getUserCategories.mockResolvedValue([]);
+    api.getUserCategories.mockResolvedValue({ results: [], next: null });
     
     render(
       <BrowserRouter>